@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asyncio API - non-blocking counterparts of the search and design system
+entry points for hosts that run an event loop.
+
+Index loading and scoring run on a thread pool, so the loop stays free while
+a knowledge base loads or scores. Concurrent identical reads share one
+in-flight computation; operations that write files always run on their own.
+Cancelling a caller only abandons its own wait; the computation is cancelled
+once every caller waiting on it is gone.
+
+Usage:
+    from aio import asearch, agenerate_design_system
+    result = await asearch("glassmorphism", "style")
+    text = await agenerate_design_system("SaaS dashboard", "My Project")
+"""
+
+import asyncio
+import copy
+import functools
+import threading
+import weakref
+
+from core import MAX_RESULTS, KnowledgeBase, get_knowledge_base
+
+
+# ============ CONFIGURATION ============
+EXECUTOR_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def set_executor(executor) -> None:
+    """Use executor (any concurrent.futures.Executor) for offloaded work; None restores the default pool."""
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="ui-pro-max-aio")
+        return _executor
+
+
+# ============ REQUEST COALESCING ============
+class _InFlight:
+    """One offloaded computation and the number of coroutines awaiting it."""
+
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+# event loop -> {request key: _InFlight}
+_inflight = weakref.WeakKeyDictionary()
+
+
+async def _run(key, fn, *args):
+    """
+    Run fn(*args) on the executor, sharing the call with concurrent identical
+    requests; a None key (writes) is never shared.
+
+    Every caller gets its own copy of the result, so one caller mutating it
+    cannot affect another.
+    """
+    loop = asyncio.get_running_loop()
+    pending = _inflight.setdefault(loop, {})
+    entry = pending.get(key) if key is not None else None
+    if entry is None:
+        entry = _InFlight(loop.run_in_executor(_get_executor(), functools.partial(fn, *args)))
+        if key is not None:
+            pending[key] = entry
+
+            def _forget(_, entry=entry):
+                if pending.get(key) is entry:
+                    del pending[key]
+
+            entry.future.add_done_callback(_forget)
+
+    entry.waiters += 1
+    try:
+        result = await asyncio.shield(entry.future)
+    finally:
+        entry.waiters -= 1
+        if entry.waiters == 0 and not entry.future.done():
+            # Last interested caller was cancelled: drop work that has not started
+            entry.future.cancel()
+            if key is not None and pending.get(key) is entry:
+                del pending[key]
+    return copy.deepcopy(result)
+
+
+# ============ ASYNC API ============
+async def asearch(query: str, domain: str = None, max_results: int = MAX_RESULTS,
+                  kb: KnowledgeBase = None, filters: list = None, sort_by: str = None, fuzzy: bool = False) -> dict:
+    """Async core.search (domain "all" searches every domain and stack)."""
+    kb = kb or get_knowledge_base()
+    key = ("search", kb, query, domain, max_results, tuple(filters) if filters else None, sort_by, fuzzy)
+    return await _run(key, kb.search, query, domain, max_results, filters, sort_by, fuzzy)
+
+
+async def asearch_stack(query: str, stack: str, max_results: int = MAX_RESULTS,
+                        kb: KnowledgeBase = None, filters: list = None, fuzzy: bool = False) -> dict:
+    """Async core.search_stack."""
+    kb = kb or get_knowledge_base()
+    key = ("search_stack", kb, query, stack, max_results, tuple(filters) if filters else None, fuzzy)
+    return await _run(key, kb.search_stack, query, stack, max_results, filters, fuzzy)
+
+
+async def asearch_page(cursor: str, kb: KnowledgeBase = None) -> dict:
+    """Async core.search_page."""
+    kb = kb or get_knowledge_base()
+    return await _run(("search_page", kb, cursor), kb.search_page, cursor)
+
+
+async def apreload(domains: list = None, stacks: list = None, kb: KnowledgeBase = None) -> None:
+    """Load indexes (default: all) without blocking the loop."""
+    kb = kb or get_knowledge_base()
+    key = ("preload", kb, tuple(domains) if domains is not None else None, tuple(stacks) if stacks is not None else None)
+    await _run(key, kb.preload, domains, stacks)
+
+
+async def agenerate_design_system(query: str, project_name: str = None, output_format: str = "ascii",
+                                  persist: bool = False, page: str = None, output_dir: str = None,
+                                  kb: KnowledgeBase = None) -> str:
+    """Async design_system.generate_design_system (never shared when it persists)."""
+    from design_system import generate_design_system
+
+    kb = kb or get_knowledge_base()
+    key = None if persist else ("generate_design_system", kb, query, project_name, output_format, page, output_dir)
+    return await _run(key, functools.partial(generate_design_system, query, project_name, output_format,
+                                             persist, page, output_dir, kb))
+
+
+async def apersist_design_system(design_system: dict, page: str = None, output_dir: str = None,
+                                 page_query: str = None, kb: KnowledgeBase = None) -> dict:
+    """Async design_system.persist_design_system (never shared: the files may change between calls)."""
+    from design_system import persist_design_system
+
+    kb = kb or get_knowledge_base()
+    return await _run(None, persist_design_system, design_system, page, output_dir, page_query, kb)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Executor - runs a stream of operations in one process so every
+operation shares the same loaded indexes instead of paying a cold start.
+
+Input is JSON Lines, one operation per line (blank lines are skipped):
+    {"op": "search", "query": "glassmorphism", "domain": "style", "max_results": 3}
+    {"op": "search", "query": "glasmorphism", "domain": "style", "fuzzy": true}
+    {"op": "search", "query": "touch", "domain": "ux", "filters": ["Severity=High", "Platform~mobile"]}
+    {"op": "search", "query": "", "domain": "google-fonts", "filters": ["Date Added>=2023"], "sort_by": "Trending Rank"}
+    {"op": "search_stack", "query": "list performance", "stack": "react-native"}
+    {"op": "search_page", "cursor": "<cursor from a full page of search or search_stack results>"}
+    {"op": "generate_design_system", "query": "SaaS dashboard", "project_name": "Acme", "format": "markdown"}
+    {"op": "persist", "query": "SaaS dashboard", "project_name": "Acme", "page": "dashboard", "output_dir": "out"}
+
+Output is JSON Lines, one result per operation in input order, flushed as
+soon as the operation finishes. An optional "id" is echoed back:
+    {"id": 1, "op": "search", "ok": true, "result": {...}}
+    {"id": 2, "op": "persist", "ok": false, "error": "..."}
+
+Usage:
+    python search.py --batch ops.jsonl
+    cat ops.jsonl | python search.py --batch -
+"""
+
+import json
+import sys
+
+from core import CSV_CONFIG, MAX_RESULTS, search, search_page, search_stack
+
+
+OPERATIONS = ("search", "search_stack", "search_page", "generate_design_system", "persist")
+
+
+def _require_query(op: dict) -> str:
+    """Return the operation's query or raise ValueError."""
+    query = op.get("query")
+    if not isinstance(query, str):
+        raise ValueError("'query' must be a string")
+    return query
+
+
+def _optional_str(op: dict, key: str):
+    """Return the operation's string field `key` (None when absent) or raise ValueError."""
+    value = op.get(key)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"'{key}' must be a string")
+    return value
+
+
+def _max_results(op: dict) -> int:
+    """Return the operation's max_results (below 1 means no results) or raise ValueError."""
+    value = op.get("max_results", MAX_RESULTS)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError("'max_results' must be an integer")
+    return value
+
+
+def _filters(op: dict):
+    """Return the operation's filters (None when absent) or raise ValueError."""
+    filters = op.get("filters")
+    if filters is not None and (not isinstance(filters, list) or not all(isinstance(f, str) for f in filters)):
+        raise ValueError("'filters' must be a list of 'Column=Value', 'Column~words' or 'Column<Value' strings")
+    return filters
+
+
+def _sort_by(op: dict):
+    """Return the operation's sort_by (None when absent) or raise ValueError."""
+    sort_by = op.get("sort_by")
+    if sort_by is not None and not isinstance(sort_by, str):
+        raise ValueError("'sort_by' must be a 'Column' or '-Column' string")
+    return sort_by
+
+
+def _flag(op: dict, key: str) -> bool:
+    """Return the operation's boolean field `key` (False when absent) or raise ValueError."""
+    value = op.get(key, False)
+    if not isinstance(value, bool):
+        raise ValueError(f"'{key}' must be true or false")
+    return value
+
+
+def run_operation(op: dict):
+    """
+    Execute a single operation and return its result.
+
+    Raises ValueError for malformed operations; search errors (unknown stack,
+    missing file) are returned in the result dict just like the CLI does.
+    """
+    if not isinstance(op, dict):
+        raise ValueError("operation must be a JSON object")
+    name = op.get("op")
+
+    if name == "search":
+        domain = _optional_str(op, "domain")
+        if domain is not None and domain not in CSV_CONFIG and domain != "all":
+            raise ValueError(f"Unknown domain: {domain}. Available: {', '.join(CSV_CONFIG)}, all")
+        return search(_require_query(op), domain, _max_results(op), _filters(op), _sort_by(op), _flag(op, "fuzzy"))
+
+    if name == "search_stack":
+        return search_stack(_require_query(op), _optional_str(op, "stack"), _max_results(op), _filters(op),
+                            _flag(op, "fuzzy"))
+
+    if name == "search_page":
+        cursor = op.get("cursor")
+        if not isinstance(cursor, str):
+            raise ValueError("'cursor' must be a string from a search or search_stack result")
+        return search_page(cursor)
+
+    if name == "generate_design_system":
+        from design_system import generate_design_system
+        output_format = op.get("format", "ascii")
+        if output_format not in ("ascii", "markdown"):
+            raise ValueError("'format' must be 'ascii' or 'markdown'")
+        return generate_design_system(
+            _require_query(op),
+            _optional_str(op, "project_name"),
+            output_format,
+            persist=_flag(op, "persist"),
+            page=_optional_str(op, "page"),
+            output_dir=_optional_str(op, "output_dir")
+        )
+
+    if name == "persist":
+        from design_system import DesignSystemGenerator, persist_design_system
+        query = _require_query(op)
+        design_system = DesignSystemGenerator().generate(query, _optional_str(op, "project_name"))
+        return persist_design_system(design_system, _optional_str(op, "page"), _optional_str(op, "output_dir"), query)
+
+    raise ValueError(f"Unknown op: {name!r}. Available: {', '.join(OPERATIONS)}")
+
+
+def execute(op) -> dict:
+    """Run an operation and wrap its outcome in a response envelope."""
+    response = {}
+    if isinstance(op, dict):
+        if "id" in op:
+            response["id"] = op["id"]
+        response["op"] = op.get("op")
+    try:
+        result = run_operation(op)
+    except (ValueError, OSError) as e:
+        response["ok"] = False
+        response["error"] = str(e)
+        return response
+
+    if isinstance(result, dict) and "error" in result:
+        response["ok"] = False
+        response["error"] = result["error"]
+    else:
+        response["ok"] = True
+    response["result"] = result
+    return response
+
+
+def run_batch(lines, out=None) -> int:
+    """
+    Execute JSON Lines operations from an iterable of lines, streaming one
+    JSON response per line to `out` (default stdout).
+
+    Returns the number of failed operations.
+    """
+    out = out or sys.stdout
+    failures = 0
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            op = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {"line": line_no, "ok": False, "error": f"Invalid JSON: {e}"}
+        else:
+            response = execute(op)
+        if not response["ok"]:
+            failures += 1
+        out.write(json.dumps(response, ensure_ascii=False) + "\n")
+        out.flush()
+    return failures
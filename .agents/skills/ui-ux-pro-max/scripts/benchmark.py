@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark Suite - times indexing, search, classification, design system
+generation and formatting on the shipped CSVs and on synthetic corpora
+scaled up from them.
+
+Synthetic rows are sampled column by column from the real data: columns with
+repeated values (Category, Severity...) draw whole values, free-text columns
+draw a real cell length and then tokens by their real frequencies. The RNG is
+seeded, so a given scale always produces the same corpus.
+
+Caches (index.bin, the on-disk index cache, the result cache) are disabled so
+every number measures real work, and every benchmark runs once untimed first.
+Import times of the entry modules are taken in fresh interpreters and checked
+against an import-time budget. Typo tolerance is checked not to change the
+ranking of any query with an exact term, and the top results of every domain
+with fuzzy matching off are recorded so --baseline also fails on any ranking
+change.
+
+Usage:
+    python benchmark.py                                   # scales 1, 10, 100, 1000
+    python benchmark.py --scales 1,10 --json bench.json
+    python benchmark.py --baseline bench.json --threshold 0.2   # exit 1 on regressions
+    python benchmark.py --scales 1 --import-budget 30           # exit 1 on slow imports
+"""
+
+import argparse
+import csv
+import json
+import platform
+import random
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import core
+from core import BM25, CSV_CONFIG, DATA_DIR, MAX_RESULTS, REASONING_FILE, KnowledgeBase, ResultCache
+from design_system import (SEARCH_CONFIG, DesignSystemGenerator, format_ascii_box, format_master_md,
+                           generate_design_system, persist_design_system)
+
+
+# ============ CONFIGURATION ============
+BENCH_DOMAINS = list(CSV_CONFIG)
+QUERY_DOMAINS = list(SEARCH_CONFIG)  # sampled query terms come from the domains the design system generator reads
+MAX_BENCH_ROWS = 250_000  # a domain is left out of scales that would give it more rows (google-fonts at x1000)
+DEFAULT_SCALES = (1, 10, 100, 1000)
+DEFAULT_THRESHOLD = 0.25
+SEED = 1234
+MIN_TIME = 0.2  # keep repeating a benchmark until this many seconds...
+MAX_ROUNDS = 5  # ...or this many rounds
+QUERY_COUNT = 50
+BRIEF_COUNT = 20
+# What each entry point imports before doing any work: the CLI imports search,
+# then batch for an in-process operation and design_system for -ds
+IMPORT_MODULES = {
+    "core": ("core",),
+    "design_system": ("design_system",),
+    "search": ("search", "batch"),
+    "search -ds": ("search", "batch", "design_system"),
+}
+IMPORT_ROUNDS = 5
+DEFAULT_IMPORT_BUDGET_MS = 50.0
+
+FIXED_QUERIES = [
+    "SaaS dashboard", "fintech crypto dark", "e-commerce luxury", "healthcare accessible calm",
+    "glassmorphism", "minimalism clean", "playful kids education", "restaurant warm elegant",
+    "real-time analytics chart", "landing page hero conversion",
+]
+
+
+# ============ SYNTHETIC CORPORA ============
+class _ColumnModel:
+    """Value distribution of one CSV column."""
+
+    def __init__(self, values):
+        self.categorical = len(set(values)) * 2 <= len(values)
+        if self.categorical:
+            self.values = values
+        else:
+            self.lengths = [len(value.split()) for value in values]
+            self.tokens = [token for value in values for token in value.split()]
+
+    def sample(self, rng):
+        if self.categorical:
+            return rng.choice(self.values)
+        length = rng.choice(self.lengths)
+        return " ".join(rng.choices(self.tokens, k=length)) if self.tokens and length else ""
+
+
+def _read_csv(filepath):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames or [], list(reader)
+
+
+def write_scaled_csv(source, target, scale, seed=SEED):
+    """Write a synthetic CSV with scale times the rows of source; returns the row count."""
+    fieldnames, rows = _read_csv(source)
+    models = {col: _ColumnModel([row.get(col) or "" for row in rows]) for col in fieldnames}
+    rng = random.Random(f"{seed}:{Path(source).name}:{scale}")
+    count = len(rows) * scale
+    with open(target, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        for _ in range(count):
+            writer.writerow([models[col].sample(rng) for col in fieldnames])
+    return count
+
+
+def scaled_domains(scale):
+    """BENCH_DOMAINS that stay within MAX_BENCH_ROWS at scale."""
+    return [domain for domain in BENCH_DOMAINS
+            if scale == 1 or len(_read_csv(DATA_DIR / CSV_CONFIG[domain]["file"])[1]) * scale <= MAX_BENCH_ROWS]
+
+
+def scaled_data_dir(scale, root):
+    """Data directory holding scaled_domains(scale) at scale (the real one for scale 1)."""
+    if scale == 1:
+        return DATA_DIR
+    data_dir = Path(root) / f"x{scale}"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for domain in scaled_domains(scale):
+        write_scaled_csv(DATA_DIR / CSV_CONFIG[domain]["file"], data_dir / CSV_CONFIG[domain]["file"], scale)
+    (data_dir / REASONING_FILE).write_bytes((DATA_DIR / REASONING_FILE).read_bytes())
+    return data_dir
+
+
+def bench_queries(seed=SEED):
+    """Realistic queries plus token samples from the shipped search columns."""
+    rng = random.Random(seed)
+    bm25 = BM25()
+    vocabulary = []
+    for domain in QUERY_DOMAINS:
+        config = CSV_CONFIG[domain]
+        _, rows = _read_csv(DATA_DIR / config["file"])
+        for row in rows:
+            vocabulary.extend(bm25.tokenize(" ".join(str(row.get(col, "")) for col in config["search_cols"])))
+    sampled = [" ".join(rng.choices(vocabulary, k=rng.randint(1, 4))) for _ in range(QUERY_COUNT - len(FIXED_QUERIES))]
+    return FIXED_QUERIES + sampled
+
+
+# ============ TIMING ============
+def _time(fn):
+    """(rounds, min, median) wall-clock seconds of fn(), after one untimed warm-up call."""
+    fn()
+    times = []
+    while True:
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        if len(times) >= MAX_ROUNDS or sum(times) >= MIN_TIME:
+            return len(times), min(times), statistics.median(times)
+
+
+def import_times(modules=IMPORT_MODULES, rounds=IMPORT_ROUNDS):
+    """
+    Cumulative import seconds of each entry in modules ({name: modules imported
+    together}), one fresh interpreter per round (python -X importtime). Bytecode
+    goes to a private cache that a discarded first round fills, so numbers match
+    an installed copy.
+    """
+    scripts = Path(__file__).resolve().parent
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    times = {}
+    with tempfile.TemporaryDirectory(prefix="ui-pro-max-pyc-") as pycache:
+        for name, imported in modules.items():
+            samples = []
+            for _ in range(rounds + 1):
+                proc = subprocess.run([sys.executable, "-X", "importtime", "-X", f"pycache_prefix={pycache}",
+                                       "-c", f"import {', '.join(imported)}"],
+                                      cwd=scripts, env=env, capture_output=True, text=True, check=True)
+                # "import time: self [us] | cumulative | <indent>module"; top-level modules are unindented
+                # (one already imported by an earlier module has no line of its own)
+                total = 0
+                for line in proc.stderr.splitlines():
+                    fields = line.split("|")
+                    if len(fields) == 3 and fields[2][1:] in imported:
+                        total += int(fields[1])
+                samples.append(total / 1e6)
+            times[name] = samples[1:]
+    return times
+
+
+def _record(results, name, fn, ops=1, domain="-", scale=1, rows=None):
+    rounds, best, median = _time(fn)
+    return _add_result(results, name, rounds, best, median, ops, domain, scale, rows)
+
+
+def _add_result(results, name, rounds, best, median, ops=1, domain="-", scale=1, rows=None):
+    result = {
+        "name": name,
+        "domain": domain,
+        "scale": scale,
+        "rows": rows,
+        "ops": ops,
+        "rounds": rounds,
+        "min_s": best,
+        "median_s": median,
+        "per_op_s": median / ops,
+    }
+    results.append(result)
+    print(f"  {name:<24}{domain:<14}x{scale:<6}{result['per_op_s'] * 1e3:>12.4f} ms/op", file=sys.stderr, flush=True)
+    return result
+
+
+# ============ BENCHMARKS ============
+def run_benchmarks(scales=DEFAULT_SCALES, queries=None):
+    """Run every benchmark at every scale and return the result records."""
+    queries = queries or bench_queries()
+    results = []
+
+    for module, samples in import_times().items():
+        _add_result(results, "import", len(samples), min(samples), statistics.median(samples), domain=module)
+
+    _record(results, "detect_domain", lambda: [core.detect_domain(q) for q in queries], len(queries))
+
+    with tempfile.TemporaryDirectory(prefix="ui-pro-max-bench-") as tmp:
+        for scale in scales:
+            print(f"scale x{scale}", file=sys.stderr, flush=True)
+            data_dir = scaled_data_dir(scale, tmp)
+            kb = KnowledgeBase(data_dir, ResultCache(max_entries=0))
+
+            for domain in scaled_domains(scale):
+                config = CSV_CONFIG[domain]
+                filepath = data_dir / config["file"]
+                _, rows = _read_csv(filepath)
+                documents = [" ".join(str(row.get(col, "")) for col in config["search_cols"]) for row in rows]
+                bm25 = BM25()
+                bm25.fit(documents)
+
+                _record(results, "bm25.fit", lambda: BM25().fit(documents), 1, domain, scale, len(rows))
+                _record(results, "bm25.score", lambda: [bm25.score(q) for q in queries],
+                        len(queries), domain, scale, len(rows))
+                _record(results, "bm25.top_k", lambda: [bm25.top_k(q, MAX_RESULTS) for q in queries],
+                        len(queries), domain, scale, len(rows))
+                _record(results, "index.load", lambda: KnowledgeBase(data_dir).domain_index(domain),
+                        1, domain, scale, len(rows))
+                _record(results, "_search_csv", lambda: [core._search_csv(filepath, config["search_cols"],
+                                                                          config["output_cols"], q, MAX_RESULTS)
+                                                         for q in queries],
+                        len(queries), domain, scale, len(rows))
+                # End to end: the search() API, response building included
+                _record(results, "search", lambda: [kb.search(q, domain) for q in queries],
+                        len(queries), domain, scale, len(rows))
+
+            _record(results, "search", lambda: [kb.search(q) for q in queries], len(queries), "auto", scale)
+            generator = DesignSystemGenerator(kb)
+            briefs = queries[:BRIEF_COUNT]
+            _record(results, "generate", lambda: [generator.generate(q) for q in briefs], len(briefs), "-", scale)
+            _record(results, "generate_design_system",
+                    lambda: [generate_design_system(q, f"Bench {i}", kb=kb) for i, q in enumerate(briefs)],
+                    len(briefs), "-", scale)
+
+            if scale == scales[0]:
+                # Formatting and persistence do not depend on corpus size
+                designs = [generator.generate(q, f"Bench {i}") for i, q in enumerate(briefs)]
+                _record(results, "format_ascii_box", lambda: [format_ascii_box(d) for d in designs], len(designs))
+                _record(results, "format_master_md", lambda: [format_master_md(d) for d in designs], len(designs))
+                out_dir = Path(tmp) / "persist"
+                _record(results, "persist_design_system",
+                        lambda: [persist_design_system(d, None, str(out_dir), kb=kb) for d in designs],
+                        len(designs))
+
+    return results
+
+
+# ============ RANKING CHECKS ============
+def fuzzy_ranking_changes(queries):
+    """
+    Queries whose ranking on the shipped CSVs differs with fuzzy matching on
+    and off although one of their tokens is indexed; typo tolerance must only
+    rescue queries that would otherwise match nothing.
+    """
+    kb = KnowledgeBase()
+    changed = []
+    for domain in BENCH_DOMAINS:
+        bm25, _ = kb.domain_index(domain)
+        for query in queries:
+            if not any(token in bm25.postings for token in bm25.tokenize(query)):
+                continue
+            if bm25.score(query, fuzzy=True) != bm25.score(query):
+                changed.append(f"{domain}: {query}")
+    return changed
+
+
+def rankings(queries):
+    """Top results of search() with fuzzy matching off on the shipped CSVs, as {"domain|query": [first column]}."""
+    kb = KnowledgeBase(result_cache=ResultCache(max_entries=0))
+    ranked = {}
+    for domain in BENCH_DOMAINS:
+        for query in queries:
+            response = kb.search(query, domain, MAX_RESULTS, fuzzy=False)
+            ranked[f"{domain}|{query}"] = [next(iter(row.values()), None) for row in response.get("results", [])]
+    return ranked
+
+
+def ranking_changes(current, baseline):
+    """Keys of rankings that differ from a baseline run's (queries missing from either are skipped)."""
+    return [key for key, ranked in current.items() if key in baseline and baseline[key] != ranked]
+
+
+# ============ BASELINE COMPARISON ============
+def _key(result):
+    return f"{result['name']}|{result['domain']}|x{result['scale']}"
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Per-op median ratio against a baseline run; a ratio above 1 + threshold is a regression."""
+    previous = {_key(r): r for r in baseline.get("results", [])}
+    comparison = []
+    for result in results:
+        base = previous.get(_key(result))
+        if base is None or not base["per_op_s"]:
+            continue
+        ratio = result["per_op_s"] / base["per_op_s"]
+        comparison.append({
+            "key": _key(result),
+            "baseline_per_op_s": base["per_op_s"],
+            "per_op_s": result["per_op_s"],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold,
+        })
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UI Pro Max benchmark suite")
+    parser.add_argument("--scales", type=str, default=",".join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated corpus scale factors (1 = shipped CSVs)")
+    parser.add_argument("--engine", choices=["python", "numpy", "auto"], default="python",
+                        help="Scoring engine for search benchmarks (default: python)")
+    parser.add_argument("--json", type=str, default=None, metavar="FILE", help="Write results as JSON to FILE ('-' for stdout)")
+    parser.add_argument("--baseline", type=str, default=None, metavar="FILE", help="Compare against a previous --json output")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed slowdown before a benchmark counts as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET_MS, metavar="MS",
+                        help=f"Fail when importing {', '.join(IMPORT_MODULES)} (as the CLI does) takes longer (default: {DEFAULT_IMPORT_BUDGET_MS:g} ms)")
+    args = parser.parse_args(argv)
+
+    try:
+        scales = sorted({int(scale) for scale in args.scales.split(",") if scale.strip()})
+    except ValueError:
+        parser.error("--scales must be comma-separated integers")
+    if not scales or scales[0] < 1:
+        parser.error("--scales must be positive integers")
+
+    # Measure the engine itself, not the caches in front of it
+    core.INDEX_CACHE_DIR = None
+    core.COMPILED_INDEX_FILE = None
+    core.SEARCH_ENGINE = args.engine
+    core.configure_result_cache(max_entries=0)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "engine": args.engine,
+        "numpy": core._numpy() is not None,
+        "scales": scales,
+        "results": run_benchmarks(scales),
+    }
+
+    report["import_budget_ms"] = args.import_budget
+    over_budget = [r for r in report["results"] if r["name"] == "import" and r["min_s"] * 1000 > args.import_budget]
+    for result in over_budget:
+        print(f"import {result['domain']} took {result['min_s'] * 1000:.1f} ms (budget {args.import_budget:g} ms)",
+              file=sys.stderr)
+    failed = bool(over_budget)
+
+    # Typos in half the tokens of every query, next to exact terms
+    rng = random.Random(SEED)
+    queries = bench_queries()
+    queries += [" ".join(word[:-1] if rng.random() < 0.5 else word for word in q.split()) for q in queries]
+    report["fuzzy_ranking_changes"] = fuzzy_ranking_changes(queries)
+    for change in report["fuzzy_ranking_changes"]:
+        print(f"typo tolerance changed the exact-match ranking of {change}", file=sys.stderr)
+    failed = failed or bool(report["fuzzy_ranking_changes"])
+    report["rankings"] = rankings(bench_queries())
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report["threshold"] = args.threshold
+        report["comparison"] = compare(report["results"], baseline, args.threshold)
+        for entry in report["comparison"]:
+            flag = "REGRESSION" if entry["regression"] else ""
+            print(f"{entry['key']:<44}{entry['ratio']:>8.2f}x {flag}", file=sys.stderr)
+        failed = failed or any(entry["regression"] for entry in report["comparison"])
+        report["ranking_changes"] = ranking_changes(report["rankings"], baseline.get("rankings", {}))
+        for key in report["ranking_changes"]:
+            print(f"ranking changed from the baseline for {key}", file=sys.stderr)
+        failed = failed or bool(report["ranking_changes"])
+
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,21 +4,87 @@
 UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
+# Every CLI call imports this module, so modules only some paths need (hashlib,
+# binascii, mmap) are imported inside the functions that use them, and locks
+# come from _thread, which threading itself wraps.
+import _thread
 import csv
+import heapq
+import json
+import os
 import re
+import sys
+import time
+import zlib
+from array import array
 from pathlib import Path
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, islice
 from math import log
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict
+
+# Optional: the pure-Python engine covers everything. Imported on first use by
+# _numpy(), since importing numpy costs more than a whole cold search.
+np = None
+_numpy_missing = False
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
 MAX_RESULTS = 3
+REASONING_FILE = "ui-reasoning.csv"
+
+# Built indexes are cached next to DATA_DIR as one-source files in the
+# index.bin format, the latest one per CSV name; set to None to disable
+INDEX_CACHE_DIR = DATA_DIR.parent / ".index-cache"
+
+# Output of `search.py --compile`; used instead of parsing CSVs when present
+COMPILED_INDEX_FILE = DATA_DIR.parent / "index.bin"
+
+# Scoring engine: "auto" uses NumPy for query batches when it is installed,
+# "numpy" also uses it for single queries, "python" never does
+SEARCH_ENGINE = "auto"
+NUMPY_MIN_BATCH = 8
+NUMPY_CHUNK_QUERIES = 64
+
+# Typo tolerance, opt-in per call (fuzzy=True, search.py --fuzzy): when no
+# query token is in the vocabulary, each token of FUZZY_MIN_LENGTH letters or
+# more expands to the nearest indexed terms of that length (edit distance 1,
+# or 2 from FUZZY_LONG_TOKEN letters), each weighted FUZZY_WEIGHT per edit. A
+# query with any exact term is never expanded, so its ranking is the same as
+# without typo tolerance. Short words are left alone: one edit turns too many
+# of them into other real words ("firm" -> "form", "saas" -> "sans").
+FUZZY_MIN_LENGTH = 5
+FUZZY_LONG_TOKEN = 8
+FUZZY_WEIGHT = 0.5
+FUZZY_MAX_TERMS = 3
+
+# Phrase search: indexes record token positions, and each "quoted phrase" in a
+# query also scores as one term (weighted PHRASE_WEIGHT) in the documents that
+# contain its words in sequence
+PHRASE_SEARCH = True
+PHRASE_WEIGHT = 1.0
+
+# In-process LRU cache of search()/search_stack() responses
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_MAX_BYTES = 4 * 1024 * 1024
 
+# Cursor pagination: the full ranked list behind a search cursor is built by the
+# first page request, not by the search issuing the cursor, and kept this long
+# (a later page after expiry re-ranks once), at most this many at a time
+CURSOR_TTL_SECONDS = 300
+CURSOR_CACHE_MAX_ENTRIES = 32
+# One-shot processes (search.py --cursor) also keep them here for the next page
+CURSOR_CACHE_DIR = INDEX_CACHE_DIR / "cursors"
+
+# CSV_CONFIG facet_cols hold categorical values for "=" and "~" filters;
+# numeric_cols map a column to "int" or "date" (YYYY-MM-DD) for range
+# filters and sort_by
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
         "search_cols": ["Style Category", "Keywords", "Best For", "Type", "AI Prompt Keywords"],
-        "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Light Mode ✓", "Dark Mode ✓", "Performance", "Accessibility", "Framework Compatibility", "Complexity", "AI Prompt Keywords", "CSS/Technical Keywords", "Implementation Checklist", "Design System Variables"]
+        "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Light Mode ✓", "Dark Mode ✓", "Performance", "Accessibility", "Framework Compatibility", "Complexity", "AI Prompt Keywords", "CSS/Technical Keywords", "Implementation Checklist", "Design System Variables"],
+        "facet_cols": ["Type", "Complexity"]
     },
     "color": {
         "file": "colors.csv",
@@ -28,7 +94,8 @@ CSV_CONFIG = {
     "chart": {
         "file": "charts.csv",
         "search_cols": ["Data Type", "Keywords", "Best Chart Type", "When to Use", "When NOT to Use", "Accessibility Notes"],
-        "output_cols": ["Data Type", "Keywords", "Best Chart Type", "Secondary Options", "When to Use", "When NOT to Use", "Data Volume Threshold", "Color Guidance", "Accessibility Grade", "Accessibility Notes", "A11y Fallback", "Library Recommendation", "Interactive Level"]
+        "output_cols": ["Data Type", "Keywords", "Best Chart Type", "Secondary Options", "When to Use", "When NOT to Use", "Data Volume Threshold", "Color Guidance", "Accessibility Grade", "Accessibility Notes", "A11y Fallback", "Library Recommendation", "Interactive Level"],
+        "facet_cols": ["Accessibility Grade", "Interactive Level"]
     },
     "landing": {
         "file": "landing.csv",
@@ -43,32 +110,39 @@ CSV_CONFIG = {
     "ux": {
         "file": "ux-guidelines.csv",
         "search_cols": ["Category", "Issue", "Description", "Platform"],
-        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
+        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"],
+        "facet_cols": ["Category", "Platform", "Severity"]
     },
     "typography": {
         "file": "typography.csv",
         "search_cols": ["Font Pairing Name", "Category", "Mood/Style Keywords", "Best For", "Heading Font", "Body Font"],
-        "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"]
+        "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"],
+        "facet_cols": ["Category"]
     },
     "icons": {
         "file": "icons.csv",
         "search_cols": ["Category", "Icon Name", "Keywords", "Best For"],
-        "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"]
+        "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"],
+        "facet_cols": ["Category", "Library", "Style"]
     },
     "react": {
         "file": "react-performance.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
-        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
+        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"],
+        "facet_cols": ["Category", "Severity"]
     },
     "web": {
         "file": "app-interface.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
-        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
+        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"],
+        "facet_cols": ["Category", "Severity"]
     },
     "google-fonts": {
         "file": "google-fonts.csv",
         "search_cols": ["Family", "Category", "Stroke", "Classifications", "Keywords", "Subsets", "Designers"],
-        "output_cols": ["Family", "Category", "Stroke", "Classifications", "Styles", "Variable Axes", "Subsets", "Designers", "Popularity Rank", "Google Fonts URL"]
+        "output_cols": ["Family", "Category", "Stroke", "Classifications", "Styles", "Variable Axes", "Subsets", "Designers", "Popularity Rank", "Google Fonts URL"],
+        "facet_cols": ["Category", "Stroke", "Classifications", "Subsets"],
+        "numeric_cols": {"Popularity Rank": "int", "Trending Rank": "int", "Date Added": "date", "Last Modified": "date"}
     }
 }
 
@@ -94,73 +168,2804 @@ STACK_CONFIG = {
 # Common columns for all stacks
 _STACK_COLS = {
     "search_cols": ["Category", "Guideline", "Description", "Do", "Don't"],
-    "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"]
+    "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"],
+    "facet_cols": ["Category", "Severity"]
 }
 
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
 
+def _all_sources():
+    """
+    (name, file, search_cols, output_cols, facet_cols, numeric_cols) of every
+    domain and stack, stacks named 'stack:<stack>'
+    """
+    sources = [(domain, config["file"], config["search_cols"], config["output_cols"], config.get("facet_cols", []),
+                config.get("numeric_cols", {})) for domain, config in CSV_CONFIG.items()]
+    sources += [(f"stack:{stack}", config["file"], _STACK_COLS["search_cols"], _STACK_COLS["output_cols"],
+                 _STACK_COLS["facet_cols"], {}) for stack, config in STACK_CONFIG.items()]
+    return sources
+
+
+# ============ PROFILING ============
+# Spans time the stages of a search or generation (CSV reads, tokenisation,
+# fitting, scoring, formatting, writes). They record nothing unless a profile()
+# block or a hook is active; until then span() hands back one shared no-op
+# context manager. Spans nest, so a stage's time includes the stages it calls.
+_profiles = []
+_profile_hooks = []
+_profile_lock = _thread.allocate_lock()
+_profiling = False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record_span(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def span(stage):
+    """Context manager timing one stage while profiling is on"""
+    return _Span(stage) if _profiling else _NULL_SPAN
+
+
+def _record_span(stage, seconds):
+    for profile_ in list(_profiles):
+        profile_.add(stage, seconds)
+    for hook in list(_profile_hooks):
+        try:
+            hook(stage, seconds)
+        except Exception:
+            pass  # a failing metrics sink must not fail the search
+
+
+def _update_profiling():
+    global _profiling
+    _profiling = bool(_profiles or _profile_hooks)
+
+
+class Profile:
+    """Call count and total seconds per stage, collected inside a profile() block"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = _thread.allocate_lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            calls, total = self.stages.get(stage, (0, 0.0))
+            self.stages[stage] = (calls + 1, total + seconds)
+
+    def report(self):
+        """{stage: {"calls", "ms"}}, slowest stage first"""
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: -item[1][1])
+        return {stage: {"calls": calls, "ms": round(total * 1000, 3)} for stage, (calls, total) in stages}
+
+
+class _ProfileBlock:
+    __slots__ = ("collected",)
+
+    def __enter__(self):
+        self.collected = Profile()
+        with _profile_lock:
+            _profiles.append(self.collected)
+            _update_profiling()
+        return self.collected
+
+    def __exit__(self, *exc):
+        with _profile_lock:
+            _profiles.remove(self.collected)
+            _update_profiling()
+        return False
+
+
+def profile():
+    """Collect span timings from every thread while the block runs: `with profile() as p: ...; p.report()`"""
+    return _ProfileBlock()
+
+
+def add_profile_hook(hook):
+    """Call hook(stage, seconds) for every finished span, e.g. to forward timings to a metrics system"""
+    with _profile_lock:
+        _profile_hooks.append(hook)
+        _update_profiling()
+
+
+def remove_profile_hook(hook):
+    """Stop calling a hook registered with add_profile_hook()"""
+    with _profile_lock:
+        _profile_hooks.remove(hook)
+        _update_profiling()
+
+
+def _numpy():
+    """The numpy module, imported on first use; None when it is not installed"""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np
+
+
+# ============ FUZZY MATCHING ============
+def _trigrams(word):
+    """Distinct character trigrams of a word padded with two spaces on each side"""
+    padded = f"  {word}  "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _osa_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps cost one edit), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                distance = min(distance, before[j - 2] + 1)
+            current[j] = distance
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class TrigramIndex:
+    """
+    Character-trigram index over a vocabulary, used to find the terms within a
+    small edit distance of a misspelled token without comparing it to every term.
+
+    One edit changes at most four of a word's padded trigrams, so a term within
+    distance d shares at least len(trigrams) - 4d of them with the token; only
+    terms passing that count (and the length difference) are compared.
+    """
+
+    def __init__(self, terms):
+        """terms: (term, document frequency) pairs; ids are their positions"""
+        self.terms = []
+        self.doc_freqs = []
+        grams = defaultdict(list)
+        for tid, (term, df) in enumerate(terms):
+            self.terms.append(term)
+            self.doc_freqs.append(df)
+            for gram in _trigrams(term):
+                grams[gram].append(tid)
+        self.grams = dict(grams)
+        self._expansions = {}  # token -> expand() result; typos repeat across queries
+
+    def nearest(self, token, max_distance):
+        """
+        Ids of the closest terms of FUZZY_MIN_LENGTH letters or more within
+        max_distance (most frequent first) and their distance
+        """
+        grams = _trigrams(token)
+        required = len(grams) - 4 * max_distance
+        shared = Counter(chain.from_iterable(self.grams.get(gram, ()) for gram in grams))
+
+        best, matches = max_distance + 1, []
+        for tid, count in shared.items():
+            if count < required or len(self.terms[tid]) < FUZZY_MIN_LENGTH:
+                continue
+            distance = _osa_distance(token, self.terms[tid], min(best, max_distance))
+            if distance < best:
+                best, matches = distance, [tid]
+            elif distance == best and distance <= max_distance:
+                matches.append(tid)
+        matches.sort(key=lambda tid: (-self.doc_freqs[tid], self.terms[tid]))
+        return matches[:FUZZY_MAX_TERMS], best
+
+    def expand(self, token):
+        """(term id, weight) pairs replacing an unknown query token; [] when nothing is close"""
+        if len(token) < FUZZY_MIN_LENGTH:
+            return []
+        expansion = self._expansions.get(token)
+        if expansion is None:
+            matches, distance = self.nearest(token, 1 if len(token) < FUZZY_LONG_TOKEN else 2)
+            expansion = [(tid, FUZZY_WEIGHT ** distance) for tid in matches]
+            if len(self._expansions) >= 4096:
+                self._expansions.clear()
+            self._expansions[token] = expansion
+        return expansion
+
+
+# ============ PHRASE MATCHING ============
+# Patterns only some queries need are kept as strings: re compiles and caches
+# them on first use instead of at import
+_PHRASE = r'"([^"]*)"'
+
+
+def _phrase_matches(located):
+    """
+    [(doc_id, occurrences)] of the documents whose tokens contain a phrase.
+
+    located holds one (postings, positions) pair per phrase word, in phrase
+    order, where positions[i] lists the token positions of postings[i]. The
+    rarest word drives the scan and the others are probed by binary search, so
+    only documents holding every word have their position lists intersected.
+    """
+    order = sorted(range(len(located)), key=lambda i: len(located[i][0]))
+    first = order[0]
+    matches = []
+    for (doc, _), where in zip(*located[first]):
+        starts = {pos - first for pos in where}
+        for i in order[1:]:
+            plist, positions = located[i]
+            c = bisect_left(plist, (doc,))
+            if c == len(plist) or plist[c][0] != doc:
+                break
+            starts.intersection_update(pos - i for pos in positions[c])
+            if not starts:
+                break
+        else:
+            matches.append((doc, len(starts)))
+    return matches
+
+
 # ============ BM25 IMPLEMENTATION ============
 class BM25:
     """BM25 ranking algorithm for text search"""
 
-    def __init__(self, k1=1.5, b=0.75):
+    def __init__(self, k1=1.5, b=0.75, positions=False):
         self.k1 = k1
         self.b = b
-        self.corpus = []
         self.doc_lengths = []
+        self.norms = []
         self.avgdl = 0
         self.idf = {}
         self.doc_freqs = defaultdict(int)
+        self.postings = {}
+        self.positions = {} if positions else None  # term -> token positions, parallel to its postings
+        self.impacts = {}
+        self.max_impact = {}
         self.N = 0
+        self.removed = set()  # tombstoned doc ids; ids are never reused
+        self.version = 0  # bumped by every incremental update
+        self._total_length = 0
+        self._doc_terms = None  # doc_id -> terms, built on the first removal or update
+        self._fuzzy = None  # (version, TrigramIndex), built for the first unknown query token
 
     def tokenize(self, text):
         """Lowercase, split, remove punctuation, filter short words"""
         text = re.sub(r'[^\w\s]', ' ', str(text).lower())
         return [w for w in text.split() if len(w) > 2]
 
+    def _count_terms(self, doc):
+        """Term frequencies of a document, in first-occurrence order"""
+        term_freqs = defaultdict(int)
+        for word in self.tokenize(doc):
+            term_freqs[word] += 1
+        return term_freqs
+
+    def _locate_terms(self, doc):
+        """Token positions of each term of a document, in first-occurrence order"""
+        term_positions = defaultdict(list)
+        for pos, word in enumerate(self.tokenize(doc)):
+            term_positions[word].append(pos)
+        return term_positions
+
     def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
+        """Build BM25 index (postings, doc lengths, idf, optional positions) from documents"""
+        positional = self.positions is not None
+        with span("tokenize"):
+            # With positions, each document maps its terms to position lists instead of counts
+            corpus = [(self._locate_terms if positional else self._count_terms)(doc) for doc in documents]
+        self.__init__(self.k1, self.b, positional)
+        self.N = len(corpus)
         if self.N == 0:
             return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
+        if positional:
+            self.doc_lengths = [sum(map(len, term_positions.values())) for term_positions in corpus]
+        else:
+            self.doc_lengths = [sum(term_freqs.values()) for term_freqs in corpus]
+        self._total_length = sum(self.doc_lengths)
+        self.avgdl = self._total_length / self.N
+
+        # Postings: term -> [(doc_id, tf)] in doc_id order
+        postings = defaultdict(list)
+        if positional:
+            # Positions: term -> position tuple per posting. Most terms occur once
+            # near the start of a document, so equal tuples are shared
+            positions = defaultdict(list)
+            shared = {}
+            for idx, term_positions in enumerate(corpus):
+                for word, where in term_positions.items():
+                    postings[word].append((idx, len(where)))
+                    where = tuple(where)
+                    positions[word].append(shared.setdefault(where, where))
+            self.positions = dict(positions)
+        else:
+            for idx, term_freqs in enumerate(corpus):
+                for word, tf in term_freqs.items():
+                    postings[word].append((idx, tf))
+        self.postings = dict(postings)
+
+        for word, plist in self.postings.items():
+            self.doc_freqs[word] = len(plist)
+
+        # k1 and b are fixed, so each (term, doc) contribution can be precomputed
+        for word in self.postings:
+            self.term_impacts(word)
+
+    @classmethod
+    def concat(cls, indexes):
+        """
+        Index equal to fit() over the documents of several indexes in order,
+        merged from their postings without re-tokenizing anything.
+
+        Returns the merged index and the first doc id of each part. Positions
+        are merged too when every part has them.
+        """
+        merged = cls(positions=all(index.positions is not None for index in indexes))
+        postings = defaultdict(list)
+        positions = defaultdict(list)
+        offsets = []
+        for index in indexes:
+            offset = len(merged.doc_lengths)
+            offsets.append(offset)
+            for term, plist in index.term_postings():
+                postings[term].extend([(offset + idx, tf) for idx, tf in plist])
+            if merged.positions is not None:
+                for term, where in index.term_positions():
+                    positions[term].extend(where)
+            merged.doc_lengths.extend(index.doc_lengths)
+            merged.removed.update(offset + idx for idx in index.removed)
+            merged.N += index.N
+
+        merged.postings = dict(postings)
+        if merged.positions is not None:
+            merged.positions = dict(positions)
+        for word, plist in merged.postings.items():
+            merged.doc_freqs[word] = len(plist)
+        merged._total_length = sum(merged.doc_lengths)
+        merged.avgdl = merged._total_length / merged.N if merged.N else 0
+        return merged, offsets
+
+    def term_postings(self):
+        """(term, [(doc_id, tf)]) for every indexed term"""
+        return self.postings.items()
+
+    def term_positions(self):
+        """(term, token positions of each posting) for every indexed term"""
+        return self.positions.items()
+
+    def copy(self):
+        """Independent copy that can be updated while this index keeps serving queries"""
+        clone = BM25.__new__(BM25)
+        clone.__dict__.update(self.__dict__)
+        clone.doc_lengths = list(self.doc_lengths)
+        clone.norms = list(self.norms)
+        clone.idf = dict(self.idf)
+        clone.doc_freqs = defaultdict(int, self.doc_freqs)
+        clone.postings = {term: list(plist) for term, plist in self.postings.items()}
+        if self.positions is not None:
+            clone.positions = {term: list(where) for term, where in self.positions.items()}
+        clone.impacts = dict(self.impacts)  # impact lists are replaced, never mutated
+        clone.max_impact = dict(self.max_impact)
+        clone.removed = set(self.removed)
+        clone._doc_terms = None
+        clone._fuzzy = None
+        clone.__dict__.pop("_numpy_engine", None)
+        return clone
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_doc_terms"] = None  # derived from postings, rebuilt on demand
+        state["_fuzzy"] = None
+        state.pop("_numpy_engine", None)
+        return state
+
+    # ---- Derived statistics ----
+    def doc_norms(self):
+        """Length normalisation term of the BM25 denominator, per document"""
+        if len(self.norms) != len(self.doc_lengths):
+            self.norms = [self.k1 * (1 - self.b + self.b * dl / self.avgdl) for dl in self.doc_lengths]
+        return self.norms
+
+    def _posting_impacts(self, plist):
+        """(idf, impacts) of a postings list [(doc_id, tf)] under the current statistics"""
+        freq = len(plist)
+        idf = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+        norms = self.doc_norms()
+        return idf, [idf * (tf * (self.k1 + 1)) / (tf + norms[idx]) for idx, tf in plist]
+
+    def term_impacts(self, term):
+        """
+        (impacts, max_impact) of an indexed term, one impact per posting.
+
+        Computed on first use after fit() or an update and cached until the
+        next update, so an edit only pays for the terms later queries touch.
+        """
+        impacts = self.impacts.get(term)
+        if impacts is None:
+            idf, impacts = self._posting_impacts(self.postings[term])
+            self.idf[term] = idf
+            self.max_impact[term] = max(impacts)
+            self.impacts[term] = impacts
+        return impacts, self.max_impact[term]
+
+    def _stats_changed(self):
+        """Drop every statistic that depends on N or the average doc length"""
+        self.version += 1
+        self.avgdl = self._total_length / self.N if self.N else 0
+        self.norms = []
+        self.idf = {}
+        self.impacts = {}
+        self.max_impact = {}
+
+    # ---- Incremental updates ----
+    def _terms_of(self, idx):
+        """Terms indexed for a document"""
+        if self._doc_terms is None:
+            doc_terms = [[] for _ in self.doc_lengths]
+            for word, plist in self.postings.items():
+                for doc, _ in plist:
+                    doc_terms[doc].append(word)
+            self._doc_terms = doc_terms
+        return self._doc_terms[idx]
+
+    def _check_live(self, idx):
+        if not 0 <= idx < len(self.doc_lengths) or idx in self.removed:
+            raise IndexError(f"No document {idx} in the index")
+
+    def _index_document(self, idx, doc):
+        """Add a document's postings (and positions) under doc_id idx"""
+        if self.positions is None:
+            located, term_freqs = None, self._count_terms(doc)
+        else:
+            located = self._locate_terms(doc)
+            term_freqs = {word: len(where) for word, where in located.items()}
+        for word, tf in term_freqs.items():
+            plist = self.postings.get(word)
+            if plist is None:
+                plist = self.postings[word] = []
+                if located is not None:
+                    self.positions[word] = []
+            c = len(plist) if not plist or plist[-1][0] < idx else bisect_left(plist, (idx,))
+            plist.insert(c, (idx, tf))
+            if located is not None:
+                self.positions[word].insert(c, tuple(located[word]))
+            self.doc_freqs[word] += 1
+        self.doc_lengths[idx] = sum(term_freqs.values())
+        self._total_length += self.doc_lengths[idx]
+        if self._doc_terms is not None:
+            self._doc_terms[idx] = list(term_freqs)
+
+    def _unindex_document(self, idx):
+        """Remove a document's postings"""
+        for word in self._terms_of(idx):
+            plist = self.postings[word]
+            c = bisect_left(plist, (idx,))
+            del plist[c]
+            if self.positions is not None:
+                del self.positions[word][c]
+            self.doc_freqs[word] -= 1
+            if not plist:
+                del self.postings[word]
+                del self.doc_freqs[word]
+                if self.positions is not None:
+                    del self.positions[word]
+        self._total_length -= self.doc_lengths[idx]
+        self.doc_lengths[idx] = 0
+        self._doc_terms[idx] = []
+
+    def add_documents(self, documents):
+        """Append documents to a fitted index and return their doc ids"""
+        ids = []
+        for doc in documents:
+            idx = len(self.doc_lengths)
+            self.doc_lengths.append(0)
+            if self._doc_terms is not None:
+                self._doc_terms.append([])
+            self._index_document(idx, doc)
+            ids.append(idx)
+        if ids:
+            self.N += len(ids)
+            self._stats_changed()
+        return ids
+
+    def remove_document(self, idx):
+        """Remove a document; its doc id is left as a tombstone and never reused"""
+        self._check_live(idx)
+        self._unindex_document(idx)
+        self.removed.add(idx)
+        self.N -= 1
+        self._stats_changed()
+
+    def update_document(self, idx, doc):
+        """Replace the text of a document, keeping its doc id"""
+        self._check_live(idx)
+        self._unindex_document(idx)
+        self._index_document(idx, doc)
+        self._stats_changed()
+
+    def fuzzy_index(self):
+        """TrigramIndex over the current vocabulary"""
+        if self._fuzzy is None or self._fuzzy[0] != self.version:
+            terms = list(self.postings)
+            self._fuzzy = (self.version, TrigramIndex((term, len(self.postings[term])) for term in terms))
+        return self._fuzzy[1]
+
+    def query_terms(self, query, fuzzy=False):
+        """
+        Indexed query terms with their weights (repeat counts), in query order.
+
+        With fuzzy, a query none of whose tokens is in the vocabulary
+        contributes their nearest terms at a discounted weight instead of nothing.
+        """
+        weights = {}
+        tokens = self.tokenize(query)
+        for token in tokens:
+            if token in self.postings:
+                weights[token] = weights.get(token, 0) + 1
+        if not weights and fuzzy:
+            index = self.fuzzy_index()
+            for token in tokens:
+                for tid, weight in index.expand(token):
+                    term = index.terms[tid]
+                    weights[term] = weights.get(term, 0) + weight
+        return list(weights.items())
+
+    def query_phrases(self, query):
+        """Quoted phrases of two or more words in a query, as token tuples; [] without positions"""
+        if self.positions is None or '"' not in query:
+            return []
+        phrases = []
+        for text in re.findall(_PHRASE, query):
+            words = tuple(self.tokenize(text))
+            if len(words) > 1 and words not in phrases:
+                phrases.append(words)
+        return phrases
+
+    def _located(self, word):
+        """(postings, positions) of an indexed word, or None"""
+        plist = self.postings.get(word)
+        return None if plist is None else (plist, self.positions[word])
+
+    def _phrase_lists(self, query):
+        """
+        (weight, postings, impacts, max_impact) of each quoted phrase occurring
+        in some document, scored as a term whose tf is its occurrence count.
+        """
+        term_lists = []
+        for words in self.query_phrases(query):
+            located = [self._located(word) for word in words]
+            plist = _phrase_matches(located) if None not in located else []
+            if plist:
+                impacts = self._posting_impacts(plist)[1]
+                term_lists.append((PHRASE_WEIGHT, plist, impacts, max(impacts)))
+        return term_lists
+
+    def term_lists(self, query, allowed=None, fuzzy=False):
+        """
+        (weight, postings, impacts, max_impact) per query term, then per quoted
+        phrase; with an allowed bitset, only the postings of documents in it.
+        """
+        term_lists = [(weight, self.postings[term], *self.term_impacts(term))
+                      for term, weight in self.query_terms(query, fuzzy)]
+        term_lists.extend(self._phrase_lists(query))
+        return term_lists if allowed is None else _restrict(term_lists, allowed)
+
+    def score(self, query, fuzzy=False):
+        """Score documents containing a query term, best first (ties by doc order)"""
+        scores = {}
+        for weight, plist, impacts, _ in self.term_lists(query, fuzzy=fuzzy):
+            for (idx, _), impact in zip(plist, impacts):
+                scores[idx] = scores.get(idx, 0) + weight * impact
+
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+    def top_k(self, query, k, allowed=None, fuzzy=False):
+        """Best k (doc_id, score) pairs, ranked exactly like score(), among the allowed documents"""
+        return _max_score_top_k(self.term_lists(query, allowed, fuzzy), k)
+
+    def top_k_batch(self, queries, k, fuzzy=False):
+        """top_k() for each query"""
+        return [self.top_k(query, k, fuzzy=fuzzy) for query in queries]
+
+
+# Slack for comparing summed upper bounds against exact scores
+_SCORE_EPS = 1e-9
+
+
+def _restrict(term_lists, allowed):
+    """
+    term_lists keeping only the postings of documents whose bit is set in allowed.
+
+    Each term keeps its max_impact, which still bounds what is left; terms left
+    without postings are dropped. Scores of the remaining documents are summed
+    from the same impacts in the same order, so they are unchanged.
+    """
+    restricted = []
+    for weight, plist, impacts, max_impact in term_lists:
+        kept = [c for c, (idx, _) in enumerate(plist) if allowed >> idx & 1]
+        if kept:
+            restricted.append((weight, [plist[c] for c in kept], [impacts[c] for c in kept], max_impact))
+    return restricted
+
+
+def _max_score_top_k(term_lists, k):
+    """
+    MaxScore top-k retrieval over doc-ordered postings with precomputed impacts.
+
+    term_lists holds one (weight, postings, impacts, max_impact) tuple per query
+    term, in query order. Terms are ranked by their upper bound (weight *
+    max_impact); once the k-th best score exceeds the summed bounds of the
+    weakest terms, those terms stop producing candidates and are only probed
+    for documents found through the remaining ones. Candidates whose partial
+    score plus the outstanding bounds cannot beat the k-th score are dropped
+    before they are fully scored.
+
+    Documents are visited in doc_id order, so a later document that ties the
+    k-th score can never displace it, matching the (score desc, doc_id asc)
+    ranking of BM25.score().
+    """
+    n = len(term_lists)
+    if k <= 0 or n == 0:
+        return []
+    if n == 1:
+        # No bound to exploit: a bounded heap over the single postings list
+        weight, plist, impacts, _ = term_lists[0]
+        best = heapq.nlargest(k, ((weight * impact, -idx) for (idx, _), impact in zip(plist, impacts)))
+        return [(-neg_doc, score) for score, neg_doc in best]
+
+    order = sorted(range(n), key=lambda i: term_lists[i][0] * term_lists[i][3])
+    # bounds[p] = summed upper bound of the p weakest terms
+    bounds = [0.0]
+    for i in order:
+        bounds.append(bounds[-1] + term_lists[i][0] * term_lists[i][3])
 
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+    cursors = [0] * n
+    contrib = [0.0] * n
+    heap = []
+    theta = 0.0
+    essential = 0  # order[:essential] only get probed, never drive candidates
 
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+    while True:
+        doc = None
+        for pos in range(essential, n):
+            plist = term_lists[order[pos]][1]
+            c = cursors[pos]
+            if c < len(plist) and (doc is None or plist[c][0] < doc):
+                doc = plist[c][0]
+        if doc is None:
+            break
 
-    def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
+        touched = []
+        partial = 0.0
+        for pos in range(essential, n):
+            i = order[pos]
+            weight, plist, impacts, _ = term_lists[i]
+            c = cursors[pos]
+            if c < len(plist) and plist[c][0] == doc:
+                contrib[i] = weight * impacts[c]
+                partial += contrib[i]
+                touched.append(i)
+                cursors[pos] = c + 1
 
-        for idx, doc in enumerate(self.corpus):
+        full = len(heap) == k
+        pos = essential - 1
+        while pos >= 0:
+            if full and partial + bounds[pos + 1] < theta - _SCORE_EPS:
+                break
+            i = order[pos]
+            weight, plist, impacts, _ = term_lists[i]
+            c = bisect_left(plist, (doc,), cursors[pos])
+            cursors[pos] = c
+            if c < len(plist) and plist[c][0] == doc:
+                contrib[i] = weight * impacts[c]
+                partial += contrib[i]
+                touched.append(i)
+            pos -= 1
+
+        if pos < 0:
+            # Sum in query order so scores are bit-identical to BM25.score()
             score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
+            for value in contrib:
+                score += value
+            entry = (score, -doc)
+            if not full:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            if len(heap) == k:
+                theta = heap[0][0]
+                while essential < n and bounds[essential + 1] < theta - _SCORE_EPS:
+                    essential += 1
+
+        for i in touched:
+            contrib[i] = 0.0
+
+    return [(-neg_doc, score) for score, neg_doc in sorted(heap, reverse=True)]
+
+
+class NumpyBM25:
+    """
+    Batched BM25 scoring over a sparse matrix of precomputed impacts.
+
+    The matrix is kept in CSR form with one row per term (the CSC layout of
+    the document-term matrix), so a batch of queries becomes one sparse
+    product that only reads the postings of the terms it uses. Impacts are
+    accumulated per (query, doc) in query-term order, so scores and rankings
+    are identical to BM25.top_k().
+    """
+
+    def __init__(self, bm25):
+        if _numpy() is None:
+            raise ImportError("NumpyBM25 requires numpy")
+        self.bm25 = bm25
+        self.version = bm25.version
+        self.N = len(bm25.doc_lengths)  # doc id space, removed documents included
+        self.term_ids = {term: tid for tid, term in enumerate(bm25.postings)}
+
+        lengths = [len(plist) for plist in bm25.postings.values()]
+        self.indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.fromiter((idx for plist in bm25.postings.values() for idx, _ in plist),
+                                   dtype=np.int64, count=int(self.indptr[-1]))
+        self.data = np.fromiter((impact for term in bm25.postings for impact in bm25.term_impacts(term)[0]),
+                                dtype=np.float64, count=int(self.indptr[-1]))
+
+    def top_k(self, query, k, fuzzy=False):
+        """Best k (doc_id, score) pairs for a single query"""
+        return self.top_k_batch([query], k, fuzzy)[0]
+
+    def top_k_batch(self, queries, k, fuzzy=False):
+        """Best k (doc_id, score) pairs for each query, scored in chunks"""
+        # The matrix holds no positions: queries with quoted phrases go to the BM25 index
+        results = [self.bm25.top_k(query, k, fuzzy=fuzzy) if self.bm25.query_phrases(query) else None
+                   for query in queries]
+        pending = [j for j, ranked in enumerate(results) if ranked is None]
+        parsed = [[(self.term_ids[term], weight) for term, weight in self.bm25.query_terms(queries[j], fuzzy)]
+                  for j in pending]
+        scored = []
+        for start in range(0, len(parsed), NUMPY_CHUNK_QUERIES):
+            scored.extend(self._score_chunk(parsed[start:start + NUMPY_CHUNK_QUERIES], k))
+        for j, ranked in zip(pending, scored):
+            results[j] = ranked
+        return results
+
+    def _score_chunk(self, parsed, k):
+        """Score a chunk of queries with one gather + scatter-add and select top-k"""
+        pairs = [(j, tid, weight) for j, terms in enumerate(parsed) for tid, weight in terms]
+        if k <= 0 or not pairs:
+            return [[] for _ in parsed]
+
+        query_idx = np.array([j for j, _, _ in pairs], dtype=np.int64)
+        term_idx = np.array([tid for _, tid, _ in pairs], dtype=np.int64)
+        weights = np.array([weight for _, _, weight in pairs], dtype=np.float64)
+
+        # Gather the postings of every (query, term) pair in query-term order
+        starts = self.indptr[term_idx]
+        counts = self.indptr[term_idx + 1] - starts
+        offsets = np.cumsum(counts) - counts
+        entries = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+        keys = np.repeat(query_idx, counts) * self.N + self.indices[entries]
+        values = np.repeat(weights, counts) * self.data[entries]
+
+        # bincount adds sequentially, matching the pure-Python summation order
+        scores = np.bincount(keys, weights=values, minlength=len(parsed) * self.N)
+        scores = scores.reshape(len(parsed), self.N)
+
+        kk = min(k, self.N)
+        shortlist = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        results = []
+        for j, row in enumerate(scores):
+            kth = row[shortlist[j]].min()
+            # Everything tied with the k-th score competes on doc order
+            candidates = np.flatnonzero(row >= kth) if kth > 0 else np.flatnonzero(row > 0)
+            top = candidates[np.lexsort((candidates, -row[candidates]))[:k]]
+            results.append([(int(idx), float(row[idx])) for idx in top])
+        return results
+
+
+def _engine(bm25, batch_size=1):
+    """Scoring engine for a fitted index, falling back to pure Python"""
+    if isinstance(bm25, MappedIndex):
+        return bm25
+    if SEARCH_ENGINE == "python" or bm25.N == 0:
+        return bm25
+    if (SEARCH_ENGINE == "numpy" or batch_size >= NUMPY_MIN_BATCH) and _numpy() is not None:
+        # Built once per index version; building it costs a pass over every posting
+        engine = getattr(bm25, "_numpy_engine", None)
+        if engine is None or engine.version != bm25.version:
+            engine = NumpyBM25(bm25)
+            bm25._numpy_engine = engine
+        return engine
+    return bm25
+
+
+# ============ ROW STORE ============
+_NEWLINE = re.compile(rb"\r\n?|\n")
+
+
+class _CsvLines:
+    """
+    Text lines of raw CSV bytes from a byte offset on, tracking the offset reached.
+
+    Line endings are normalised to \\n like a text-mode file, so csv.reader sees
+    exactly what csv.DictReader over open(path, encoding='utf-8') would.
+    """
+
+    __slots__ = ("raw", "pos")
+
+    def __init__(self, raw, pos=0):
+        self.raw = raw
+        self.pos = pos
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = self.pos
+        if start >= len(self.raw):
+            raise StopIteration
+        match = _NEWLINE.search(self.raw, start)
+        if match is None:
+            self.pos = len(self.raw)
+            return self.raw[start:].decode("utf-8")
+        self.pos = match.end()
+        return self.raw[start:match.start()].decode("utf-8") + "\n"
+
+
+def _scan_csv(raw, search_cols, facet_cols=()):
+    """
+    One streaming pass over a CSV: (header, search documents, record byte offsets,
+    {facet column: value of each record}).
+
+    Only the search columns of each record are joined into its document and no
+    per-row dict is built. Documents equal the DictReader-based join: missing
+    columns contribute "" and short records "None". Missing facet values are "".
+    """
+    # Lines are split and decoded in C; reader.line_num then maps each record
+    # back to the byte offset of its first line. csv drops \r\n terminators
+    # itself, so only line breaks inside quoted fields still need normalising.
+    raw_lines = raw.splitlines(keepends=True)
+    line_starts = list(accumulate(map(len, raw_lines), initial=0))
+    reader = csv.reader(map(bytes.decode, raw_lines))
+    header = next(reader, [])
+    position = {name: i for i, name in enumerate(header)}
+    picks = [position.get(col) for col in search_cols]
+    facet_picks = [(position.get(col), []) for col in facet_cols]
+
+    documents = []
+    offsets = array("Q")
+    while True:
+        start = line_starts[reader.line_num]
+        record = next(reader, None)
+        if record is None:
+            break
+        if not record:
+            continue  # blank line, skipped like csv.DictReader does
+        offsets.append(start)
+        width = len(record)
+        document = " ".join("" if i is None else record[i] if i < width else "None" for i in picks)
+        if "\r" in document:
+            document = document.replace("\r\n", "\n").replace("\r", "\n")
+        documents.append(document)
+        for i, values in facet_picks:
+            values.append(record[i] if i is not None and i < width else "")
+    return header, documents, offsets, {col: values for col, (_, values) in zip(facet_cols, facet_picks)}
+
+
+class CsvRows:
+    """
+    Output rows of one CSV, decoded on demand from the file's raw bytes.
+
+    Loading keeps the bytes plus the offset of every record, so only the rows
+    a search returns are ever parsed, and only into the output columns. The
+    bytes take less memory than the interned columns this store replaced
+    (1.4 MB against 1.9 MB with every index resident), so values are not interned.
+    """
+
+    __slots__ = ("columns", "_picks", "_raw", "_offsets")
+
+    def __init__(self, raw, offsets, header, output_cols):
+        position = {name: i for i, name in enumerate(header)}
+        self.columns = tuple(col for col in output_cols if col in position)
+        self._picks = tuple(position[col] for col in self.columns)
+        self._raw = raw
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._offsets)
+        if not 0 <= index < len(self._offsets):
+            raise IndexError("row index out of range")
+        record = next(csv.reader(_CsvLines(self._raw, self._offsets[index])))
+        width = len(record)
+        return {col: record[i] if i < width else None for col, i in zip(self.columns, self._picks)}
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self._offsets)))
+
+    def nbytes(self):
+        """Approximate resident size in bytes"""
+        return (sys.getsizeof(self) + sys.getsizeof(self._raw) + sys.getsizeof(self._offsets)
+                + sum(sys.getsizeof(col) for col in self.columns))
+
+    def dict_rows_nbytes(self):
+        """Approximate size of the same rows as a list of dicts straight from csv.DictReader"""
+        return _dict_rows_nbytes(self, self.columns)
+
+
+def _dict_rows_nbytes(rows, columns):
+    """Approximate size of rows as a list of dicts sharing their header keys"""
+    size = sys.getsizeof([None] * len(rows)) + sum(sys.getsizeof(col) for col in columns)
+    for row in rows:
+        row = dict(row)
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+    return size
+
+
+# ============ FACETS ============
+# Compiled by re on first use, like _PHRASE
+_FILTER = r"(?s)\s*([^=~<>]+?)\s*(<=|>=|[=~<>])\s*(.*?)\s*$"
+_DATE = r"(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$"
+_NUMERIC_KINDS = ("int", "date")
+
+
+class FilterError(ValueError):
+    """A search filter or sort column is malformed or not indexed"""
+
+
+def parse_filters(filters):
+    """
+    (column, op, value) triples from "Column=Value" strings, which match a whole
+    value, "Column~words" strings, which match values containing every word, and
+    "Column<Value" (<, <=, >, >=) range strings on numeric columns.
+    """
+    parsed = []
+    for spec in filters or ():
+        match = re.match(_FILTER, spec) if isinstance(spec, str) else None
+        if match is None or not match.group(3):
+            raise FilterError(f"Bad filter {spec!r}: expected Column=Value, Column~words or Column<Value")
+        parsed.append(match.groups())
+    return parsed
+
+
+def _parse_sort(sort_by):
+    """(column, descending) from "Column" (ascending) or "-Column" (descending)"""
+    if not isinstance(sort_by, str) or not sort_by.strip(" -"):
+        raise FilterError(f"Bad sort {sort_by!r}: expected Column or -Column")
+    sort_by = sort_by.strip()
+    return sort_by.lstrip("-").strip(), sort_by.startswith("-")
+
+
+def _numeric_bounds(kind, text):
+    """
+    Inclusive (low, high) keys a value covers, or None if it does not parse.
+    Dates key as YYYYMMDD integers, so "2023" covers the whole year and
+    "2023-05" the whole month.
+    """
+    text = text.strip()
+    if kind == "int":
+        try:
+            value = int(text)
+        except ValueError:
+            return None
+        return value, value
+    match = re.match(_DATE, text)
+    if match is None:
+        return None
+    year, month, day = (int(part) if part else None for part in match.groups())
+    if month is not None and not 1 <= month <= 12 or day is not None and not 1 <= day <= 31:
+        return None
+    low = year * 10000 + (month or 1) * 100 + (day or 1)
+    high = year * 10000 + (month or 12) * 100 + (day or 31)
+    return low, high
+
+
+class SortedColumn:
+    """
+    Rows of one numeric or date column ordered by value, for range filters and sort_by.
 
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+    keys holds the parsed values ascending and ids the row of each key; rows
+    whose value is blank or does not parse follow in ids after the last key,
+    so no range includes them and sorting puts them last. A range is two
+    binary searches whatever the number of rows.
+    """
 
-            scores.append((idx, score))
+    __slots__ = ("kind", "keys", "ids")
+
+    def __init__(self, kind, keys, ids):
+        self.kind = kind
+        self.keys = keys
+        self.ids = ids
+
+    @classmethod
+    def from_values(cls, kind, values):
+        """SortedColumn of the given kind ("int" or "date") over each row's raw value"""
+        if kind not in _NUMERIC_KINDS:
+            raise ValueError(f"Unknown numeric column type {kind!r}: expected one of {', '.join(_NUMERIC_KINDS)}")
+        parsed = [(_numeric_bounds(kind, value), idx) for idx, value in enumerate(values)]
+        present = sorted((bounds[0], idx) for bounds, idx in parsed if bounds is not None)
+        ids = array("I", (idx for _, idx in present))
+        ids.extend(idx for bounds, idx in parsed if bounds is None)
+        return cls(kind, array("q", (key for key, _ in present)), ids)
+
+    def range(self, op, value):
+        """(start, stop) slice of ids whose values satisfy op ("=", "<", "<=", ">" or ">=") value"""
+        bounds = _numeric_bounds(self.kind, value)
+        if bounds is None:
+            raise FilterError(f"Bad {self.kind} value {value!r}" + (": expected YYYY[-MM[-DD]]" if self.kind == "date" else ""))
+        low, high = bounds
+        keys = self.keys
+        if op == "=":
+            return bisect_left(keys, low), bisect_right(keys, high)
+        if op == "<":
+            return 0, bisect_left(keys, low)
+        if op == "<=":
+            return 0, bisect_right(keys, high)
+        if op == ">":
+            return bisect_right(keys, high), len(keys)
+        if op == ">=":
+            return bisect_left(keys, low), len(keys)
+        raise FilterError(f"Filter op {op!r} does not apply to {self.kind} columns")
+
+    def bits(self, start, stop, n):
+        """Bitset of the rows in ids[start:stop], built from the smaller side of the slice"""
+        if 2 * (stop - start) <= n:
+            return _bitset(self.ids[start:stop], n)
+        return ((1 << n) - 1) ^ _bitset(chain(self.ids[:start], self.ids[stop:]), n)
+
+    def order(self, descending=False):
+        """(row id, key) pairs by value, then (row id, None) for the rows without one"""
+        present = self.ids[:len(self.keys)]
+        pairs = zip(reversed(present), reversed(self.keys)) if descending else zip(present, self.keys)
+        return chain(pairs, ((idx, None) for idx in self.ids[len(self.keys):]))
+
+    def format(self, key):
+        """Text of a key as order() yields it: "" for None, YYYY-MM-DD for dates"""
+        if key is None:
+            return ""
+        if self.kind == "date":
+            return f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+        return str(key)
+
+
+def _facet_words(value):
+    """Lowercase words of a facet value ("Serif + Sans" -> serif, sans)"""
+    return re.findall(r"\w+", value.lower())
+
+
+def _bitset(ids, n):
+    """Python int with bit i set for every row id i below n"""
+    bits = bytearray((n + 7) // 8)
+    for idx in ids:
+        bits[idx >> 3] |= 1 << (idx & 7)
+    return int.from_bytes(bits, "little")
+
+
+# int.bit_count() is Python 3.10+
+_popcount = getattr(int, "bit_count", None) or (lambda bits: bin(bits).count("1"))
+
+
+class Facets:
+    """
+    Row bitsets of a CSV's categorical (facet) columns, built with its index,
+    plus a SortedColumn per numeric column.
+
+    Every distinct value of a facet column gets a Python int with bit i set for
+    each row i holding it. A "=" filter is one lookup and an AND; a "~" filter
+    ANDs, per word, the OR of the values containing that word. Counting a value inside a
+    match set is an AND plus a popcount, whatever the number of rows.
+    """
+
+    def __init__(self, n, values, labels, numbers=None):
+        """
+        n: number of rows; values: {column: {lowercased value: bitset}};
+        labels: {column: {lowercased value: value as shown}};
+        numbers: {numeric column: SortedColumn}
+        """
+        self.n = n
+        self.all = (1 << n) - 1
+        self.values = values
+        self.labels = labels
+        self.numbers = numbers or {}
+        self.words = {}  # column -> {word: [lowercased values containing it]}
+        for column, column_values in values.items():
+            words = defaultdict(list)
+            for key in column_values:
+                for word in dict.fromkeys(_facet_words(key)):
+                    words[word].append(key)
+            self.words[column] = dict(words)
+        self._names = {column.lower(): column for column in chain(values, self.numbers)}
+
+    @classmethod
+    def from_columns(cls, columns, n, numeric_cols=None):
+        """
+        Facets of n rows from {column: value of each row}, where the columns
+        named in numeric_cols ({column: "int" or "date"}) become SortedColumns.
+        A facet value listing several items ("latin | cyrillic") counts as each
+        of them; blanks are left out.
+        """
+        numeric_cols = numeric_cols or {}
+        numbers = {column: SortedColumn.from_values(kind, columns[column]) for column, kind in numeric_cols.items()}
+        values, labels = {}, {}
+        for column, column_values in columns.items():
+            if column in numbers:
+                continue
+            rows, column_labels = defaultdict(list), {}
+            for idx, value in enumerate(column_values):
+                for item in value.split("|"):
+                    item = item.strip()
+                    if item:
+                        key = item.lower()
+                        rows[key].append(idx)
+                        column_labels.setdefault(key, item)
+            values[column] = {key: _bitset(ids, n) for key, ids in rows.items()}
+            labels[column] = column_labels
+        return cls(n, values, labels, numbers)
+
+    def column(self, name):
+        """Facet or numeric column called name (in any case), or None"""
+        return self._names.get(name.strip().lower())
+
+    def match(self, filters):
+        """Bitset of the rows passing every parsed (column, op, value) filter"""
+        bits = self.all
+        for name, op, value in filters:
+            column = self.column(name)
+            if column is None:
+                raise FilterError(f"No facet {name!r}. Available: {', '.join(self._names.values()) or 'none'}")
+            if column in self.numbers:
+                numbers = self.numbers[column]
+                bits &= numbers.bits(*numbers.range(op, value), self.n)
+                continue
+            if op not in ("=", "~"):
+                raise FilterError(f"Filter op {op!r} needs a numeric column; {column} is categorical")
+            values = self.values[column]
+            if op == "=":
+                bits &= values.get(value.strip().lower(), 0)
+                continue
+            for word in _facet_words(value):
+                word_bits = 0
+                for key in self.words[column].get(word, ()):
+                    word_bits |= values[key]
+                bits &= word_bits
+        return bits
+
+    def sorted_column(self, sort_by):
+        """(column, SortedColumn, descending) for a sort_by spec ("Column" or "-Column" on a numeric column)"""
+        name, descending = _parse_sort(sort_by)
+        column = self.column(name)
+        if column not in self.numbers:
+            raise FilterError(f"Cannot sort by {name!r}. Sortable: {', '.join(self.numbers) or 'none'}")
+        return column, self.numbers[column], descending
+
+    def counts(self, bits):
+        """{column: {value: rows of bits holding it}} per facet column, most frequent first"""
+        counts = {}
+        for column, values in self.values.items():
+            labels = self.labels[column]
+            present = [(labels[key], _popcount(bits & value_bits)) for key, value_bits in values.items()]
+            counts[column] = dict(sorted((item for item in present if item[1]), key=lambda item: (-item[1], item[0])))
+        return counts
+
+
+# ============ INDEX CACHE ============
+def _fingerprint(filepath):
+    """Return (size, mtime_ns) of a data file"""
+    st = filepath.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def _content_hash(raw):
+    """Hash raw CSV bytes"""
+    import hashlib
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _cache_source_file(filepath):
+    """The CSV path a cache file records, so it is never read for another CSV"""
+    return str(Path(filepath).resolve())
+
+
+def _cache_path(filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+    """Cache file for one (CSV, search columns, output columns, facet columns, numeric columns) combination"""
+    key = "\x1f".join([_cache_source_file(filepath)] + list(search_cols) + ["\x1e"] + list(output_cols)
+                       + ["\x1e"] + list(facet_cols)
+                       + ["\x1e"] + [f"{column}:{kind}" for column, kind in (numeric_cols or {}).items()])
+    # A name clash is harmless: the file records its CSV path and columns, checked on read
+    return INDEX_CACHE_DIR / f"{Path(filepath).stem}-{zlib.crc32(key.encode('utf-8')):08x}.idx"
+
+
+def _read_cache(cache_file, filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+    """Return a cached entry if it still matches the CSV on disk, else None"""
+    try:
+        compiled = CompiledIndex(cache_file)
+    except (OSError, ValueError):
+        # Missing, truncated or foreign cache files are simply rebuilt
+        return None
+
+    source_file = _cache_source_file(filepath)
+    source = compiled.find(source_file, search_cols, output_cols, facet_cols, numeric_cols)
+    if source is None or "digests" not in source["sections"]:
+        return None
+    if ("positions" in source["sections"]) != PHRASE_SEARCH:
+        return None  # built with the other PHRASE_SEARCH setting
+    mapped = compiled.open(source_file, filepath, search_cols, output_cols, facet_cols, numeric_cols)
+    if mapped is None:
+        return None
+
+    size, mtime_ns = _fingerprint(filepath)
+    if source["mtime_ns"] != mtime_ns:
+        # Touched but unchanged (git checkout, copy): record the new mtime
+        _write_file(cache_file, compiled.restamped([dict(source, mtime_ns=mtime_ns)]))
+    return {
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha1": source["sha1"],
+        "bm25": mapped[0],
+        "rows": mapped[1],
+        "facets": mapped[2],
+        "digests": compiled.section(source, "digests").tobytes(),
+    }
+
+
+def _write_cache(cache_file, filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None, entry=None):
+    """Atomically write an index entry as a one-source compiled index; failures (read-only installs) are ignored"""
+    body = _Sections()
+    source = _compile_source(body, Path(filepath).stem, _cache_source_file(filepath), search_cols, output_cols, facet_cols,
+                             dict(numeric_cols or {}), entry)
+    source["sections"]["digests"] = body.add(array("B", entry["digests"]))
+    if _write_file(cache_file, _compiled_prefix([source]) + body.data):
+        _prune_cache(cache_file)
+
+
+def _prune_cache(cache_file):
+    """Remove the other cache files of cache_file's CSV stem (older formats, other paths or columns)"""
+    stem, _, _ = cache_file.stem.rpartition("-")
+    try:
+        siblings = list(cache_file.parent.iterdir())
+    except OSError:
+        return
+    for path in siblings:
+        # Only names _cache_path() gives out: "<stem>-<hex>.idx"
+        name_stem, _, suffix = path.stem.rpartition("-")
+        if (path.suffix == ".idx" and name_stem == stem and path != cache_file
+                and suffix and all(c in "0123456789abcdef" for c in suffix)):
+            _unlink(path)
+
+
+def _write_file(path, data):
+    """Atomically replace path with data; returns False when that failed (read-only installs)"""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{_thread.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        _unlink(tmp)
+        return False
+    return True
+
+
+def _unlink(path):
+    """Remove a file if it is still there"""
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def _read_rows(filepath, search_cols, facet_cols=(), numeric_cols=None):
+    """(size, mtime_ns, raw bytes, header, search documents, record offsets, facet and numeric values) of a CSV"""
+    with span("csv.read"):
+        size, mtime_ns = _fingerprint(filepath)
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        header, documents, offsets, facet_values = _scan_csv(raw, search_cols,
+                                                             list(facet_cols) + list(numeric_cols or ()))
+    return size, mtime_ns, raw, header, documents, offsets, facet_values
+
+
+def _doc_digests(documents):
+    """8-byte digest of each document's search text, concatenated"""
+    import hashlib
+    return b"".join(hashlib.blake2b(doc.encode("utf-8"), digest_size=8).digest() for doc in documents)
+
+
+def _build_index(filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+    """Parse a CSV and build its BM25 index, facet bitsets, sorted numeric columns and lazily decoded output rows"""
+    size, mtime_ns, raw, header, documents, offsets, facet_values = _read_rows(filepath, search_cols, facet_cols,
+                                                                               numeric_cols)
+
+    bm25 = BM25(positions=PHRASE_SEARCH)
+    with span("bm25.fit"):
+        bm25.fit(documents)
+
+    rows = CsvRows(raw, offsets, header, output_cols)
+
+    return {
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha1": _content_hash(raw),
+        "bm25": bm25,
+        "rows": rows,
+        "facets": Facets.from_columns(facet_values, len(documents), numeric_cols),
+        "digests": _doc_digests(documents),
+    }
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+
+def _update_index(entry, filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+    """
+    Bring an index up to date with its edited CSV, re-indexing only rows whose
+    search text changed plus appended rows.
+
+    Returns None when rows were removed (doc ids would shift) or most rows
+    changed, where a full rebuild is as cheap. The entry's own BM25 is left
+    untouched so in-flight searches keep a consistent view. Facets are rebuilt,
+    which costs one pass over the already parsed facet values plus a sort of
+    each numeric column.
+    """
+    size, mtime_ns, raw, header, documents, offsets, facet_values = _read_rows(filepath, search_cols, facet_cols,
+                                                                               numeric_cols)
+    digests = _doc_digests(documents)
+
+    old_digests = entry["digests"]
+    old_count = len(old_digests) // 8
+    if entry["bm25"].removed or len(documents) < old_count:
+        return None
+    changed = [idx for idx in range(old_count) if digests[idx * 8:idx * 8 + 8] != old_digests[idx * 8:idx * 8 + 8]]
+    if 2 * (len(changed) + len(documents) - old_count) > len(documents):
+        return None
+
+    with span("bm25.update"):
+        # A cached index is mapped read-only; updates go to an in-memory copy
+        bm25 = entry["bm25"].copy() if isinstance(entry["bm25"], BM25) else BM25.concat([entry["bm25"]])[0]
+        for idx in changed:
+            bm25.update_document(idx, documents[idx])
+        bm25.add_documents(documents[old_count:])
+
+    return {
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha1": _content_hash(raw),
+        "bm25": bm25,
+        "rows": CsvRows(raw, offsets, header, output_cols),
+        "facets": Facets.from_columns(facet_values, len(documents), numeric_cols),
+        "digests": digests,
+    }
+
+
+def _load_entry(filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+    """Read an index from the on-disk cache, rebuilding (and caching) it when stale"""
+    if INDEX_CACHE_DIR is None:
+        return _build_index(filepath, search_cols, output_cols, facet_cols, numeric_cols)
+    cache_file = _cache_path(filepath, search_cols, output_cols, facet_cols, numeric_cols)
+    with span("cache.read"):
+        entry = _read_cache(cache_file, filepath, search_cols, output_cols, facet_cols, numeric_cols)
+    if entry is None:
+        entry = _build_index(filepath, search_cols, output_cols, facet_cols, numeric_cols)
+        with span("cache.write"):
+            _write_cache(cache_file, filepath, search_cols, output_cols, facet_cols, numeric_cols, entry)
+    return entry
+
+
+# ============ COMPILED INDEX ============
+# index.bin layout (native byte order, recorded in the header):
+#   magic (8 bytes) | format version (u32) | header length (u32) | JSON header
+#   | 8-byte aligned array sections
+# The header lists every compiled source with its CSV fingerprint, BM25
+# parameters and the (offset, count, typecode) of its sections:
+#   vocab_offsets/vocab  sorted UTF-8 terms, looked up by binary search
+#   term_offsets         start of each term's postings (df = next - this)
+#   max_impact           per-term upper bound used by MaxScore
+#   doc_deltas/tfs       postings doc ids (delta encoded per term) and tfs
+#   impacts              precomputed BM25 contribution of each posting
+#   doc_lengths          tokens per document
+#   position_offsets/positions  token positions of each posting (PHRASE_SEARCH only)
+#   facet_bits           row bitset of each facet value listed under "facets",
+#                        (N + 7) // 8 little-endian bytes each, in header order
+#   sort_keys/sort_ids   per numeric column listed under "numbers": its sorted
+#                        keys, then N row ids (keyed rows first), in header order
+#   row_offsets/rows     output rows, one JSON array each, decoded on demand
+COMPILED_INDEX_MAGIC = b"UIPMIDX\0"
+COMPILED_INDEX_VERSION = 4
+_COMPILED_PREFIX_SIZE = 16  # magic, then format version and header length as little-endian u32s
+
+
+class CompileError(ValueError):
+    """A CSV does not match its CSV_CONFIG/STACK_CONFIG entry"""
+
+
+def _check_sources(data_dir, sources):
+    """Raise CompileError listing every missing CSV or configured column"""
+    problems = []
+    for name, filename, search_cols, output_cols, facet_cols, numeric_cols in sources:
+        filepath = data_dir / filename
+        if not filepath.exists():
+            problems.append(f"{name}: {filepath} does not exist")
+            continue
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            headers = next(csv.reader(f), [])
+        for kind, cols in (("search_cols", search_cols), ("output_cols", output_cols), ("facet_cols", facet_cols),
+                           ("numeric_cols", numeric_cols)):
+            missing = [col for col in cols if col not in headers]
+            if missing:
+                problems.append(f"{name}: {kind} not in {filename} headers: {', '.join(missing)}")
+        unknown = [f"{col} ({kind})" for col, kind in numeric_cols.items() if kind not in _NUMERIC_KINDS]
+        if unknown:
+            problems.append(f"{name}: numeric_cols types must be {' or '.join(_NUMERIC_KINDS)}: {', '.join(unknown)}")
+    if problems:
+        raise CompileError("Cannot compile index:\n  " + "\n  ".join(problems))
+
+
+class _Sections:
+    """Body of an index file: array sections, each 8-byte aligned"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def add(self, values):
+        """Append an array and return its [offset, count, typecode] header record"""
+        self.data.extend(b"\0" * (-len(self.data) % 8))
+        section = [len(self.data), len(values), values.typecode]
+        self.data.extend(values.tobytes())
+        return section
+
+
+def _compile_source(body, name, filename, search_cols, output_cols, facet_cols, numeric_cols, entry):
+    """Append the sections of one built index to body and return its header record"""
+    bm25, rows, facets = entry["bm25"], entry["rows"], entry["facets"]
+
+    terms = sorted(bm25.postings, key=lambda term: term.encode("utf-8"))
+    vocab = bytearray()
+    vocab_offsets = array("Q", [0])
+    term_offsets = array("Q", [0])
+    doc_deltas, tfs, impacts = array("I"), array("I"), array("d")
+    position_offsets, positions = array("Q", [0]), array("I")
+    for term in terms:
+        vocab.extend(term.encode("utf-8"))
+        vocab_offsets.append(len(vocab))
+        previous = 0
+        for idx, tf in bm25.postings[term]:
+            doc_deltas.append(idx - previous)
+            tfs.append(tf)
+            previous = idx
+        impacts.extend(bm25.term_impacts(term)[0])
+        term_offsets.append(len(tfs))
+        if bm25.positions is not None:
+            for where in bm25.positions[term]:
+                positions.extend(where)
+                position_offsets.append(len(positions))
+
+    row_blob = bytearray()
+    row_offsets = array("Q", [0])
+    for row in rows:
+        row_blob.extend(json.dumps([row[col] for col in rows.columns], ensure_ascii=False).encode("utf-8"))
+        row_offsets.append(len(row_blob))
+
+    facet_bits = bytearray()
+    width = (facets.n + 7) // 8
+    for values in facets.values.values():
+        for bits in values.values():
+            facet_bits.extend(bits.to_bytes(width, "little"))
+    sort_keys, sort_ids = array("q"), array("I")
+    for numbers in facets.numbers.values():
+        sort_keys.extend(numbers.keys)
+        sort_ids.extend(numbers.ids)
+
+    sections = {
+        "vocab_offsets": body.add(vocab_offsets),
+        "vocab": body.add(array("B", vocab)),
+        "term_offsets": body.add(term_offsets),
+        "max_impact": body.add(array("d", (bm25.term_impacts(term)[1] for term in terms))),
+        "doc_deltas": body.add(doc_deltas),
+        "tfs": body.add(tfs),
+        "impacts": body.add(impacts),
+        "doc_lengths": body.add(array("I", bm25.doc_lengths)),
+        "row_offsets": body.add(row_offsets),
+        "rows": body.add(array("B", row_blob)),
+        "facet_bits": body.add(array("B", facet_bits)),
+        "sort_keys": body.add(sort_keys),
+        "sort_ids": body.add(sort_ids),
+    }
+    if bm25.positions is not None:
+        sections["position_offsets"] = body.add(position_offsets)
+        sections["positions"] = body.add(positions)
+
+    return {
+        "name": name,
+        "file": filename,
+        "search_cols": list(search_cols),
+        "output_cols": list(output_cols),
+        "facet_cols": list(facet_cols),
+        "numeric_cols": dict(numeric_cols),
+        "columns": list(rows.columns),
+        "facets": {column: [facets.labels[column][key] for key in values]
+                   for column, values in facets.values.items()},
+        "numbers": {column: [numbers.kind, len(numbers.keys)] for column, numbers in facets.numbers.items()},
+        "size": entry["size"],
+        "mtime_ns": entry["mtime_ns"],
+        "sha1": entry["sha1"],
+        "N": bm25.N,
+        "avgdl": bm25.avgdl,
+        "k1": bm25.k1,
+        "b": bm25.b,
+        "sections": sections,
+    }
+
+
+def _compiled_prefix(sources):
+    """Magic, version and JSON header of an index file, padded to where its sections start"""
+    header = json.dumps({"byteorder": sys.byteorder, "sources": sources}).encode("utf-8")
+    prefix = (COMPILED_INDEX_MAGIC + COMPILED_INDEX_VERSION.to_bytes(4, "little") + len(header).to_bytes(4, "little")
+              + header)
+    return prefix + b"\0" * (-len(prefix) % 8)
+
+
+def compile_index(output=None, data_dir=None):
+    """
+    Compile every CSV_CONFIG and STACK_CONFIG source into one binary index file.
+
+    Every search_cols/output_cols/facet_cols/numeric_cols entry must be a header of its CSV; otherwise
+    CompileError is raised and nothing is written. Returns a summary dict.
+    """
+    data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+    output = Path(output) if output is not None else COMPILED_INDEX_FILE
+    sources = _all_sources()
+    _check_sources(data_dir, sources)
+
+    body = _Sections()
+    compiled = []
+    for name, filename, search_cols, output_cols, facet_cols, numeric_cols in sources:
+        entry = _build_index(data_dir / filename, search_cols, output_cols, facet_cols, numeric_cols)
+        compiled.append(_compile_source(body, name, filename, search_cols, output_cols, facet_cols, numeric_cols,
+                                        entry))
+    prefix = _compiled_prefix(compiled)
+
+    tmp = output.with_name(f"{output.name}.{os.getpid()}.tmp")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(prefix)
+            f.write(body.data)
+        os.replace(tmp, output)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+    return {
+        "file": str(output),
+        "bytes": len(prefix) + len(body.data),
+        "sources": {source["name"]: source["N"] for source in compiled},
+    }
+
+
+class CompiledIndex:
+    """Read-only, memory-mapped view of an index.bin file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fingerprint = _fingerprint(self.path)
+        import mmap
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic = self._mm[:8]
+        version = int.from_bytes(self._mm[8:12], "little")
+        header_len = int.from_bytes(self._mm[12:_COMPILED_PREFIX_SIZE], "little")
+        if magic != COMPILED_INDEX_MAGIC or version != COMPILED_INDEX_VERSION:
+            raise ValueError(f"{self.path} is not a compiled index (version {COMPILED_INDEX_VERSION})")
+        start = _COMPILED_PREFIX_SIZE
+        header = json.loads(bytes(self._mm[start:start + header_len]).decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{self.path} was compiled on a {header['byteorder']}-endian host")
+        self._base = start + header_len + (-(start + header_len) % 8)
+        self._sources = {(source["file"], tuple(source["search_cols"]), tuple(source["output_cols"]),
+                          tuple(source["facet_cols"]), tuple(source["numeric_cols"].items())): source
+                         for source in header["sources"]}
+
+    def section(self, source, name):
+        """Zero-copy typed memoryview of one section"""
+        offset, count, typecode = source["sections"][name]
+        start = self._base + offset
+        return self._view[start:start + count * array(typecode).itemsize].cast(typecode)
+
+    def facets(self, source):
+        """Facets of a source, with bitsets read from its facet_bits section and zero-copy sorted columns"""
+        n = source["N"]
+        width = (n + 7) // 8
+        blob = self.section(source, "facet_bits")
+        values, labels, pos = {}, {}, 0
+        for column, column_labels in source["facets"].items():
+            values[column], labels[column] = {}, {}
+            for label in column_labels:
+                key = label.lower()
+                values[column][key] = int.from_bytes(blob[pos:pos + width], "little")
+                labels[column][key] = label
+                pos += width
+        keys, ids = self.section(source, "sort_keys"), self.section(source, "sort_ids")
+        numbers, key_pos, id_pos = {}, 0, 0
+        for column, (kind, count) in source["numbers"].items():
+            numbers[column] = SortedColumn(kind, keys[key_pos:key_pos + count], ids[id_pos:id_pos + n])
+            key_pos += count
+            id_pos += n
+        return Facets(n, values, labels, numbers)
+
+    def find(self, filename, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+        """Header record of a compiled source, or None"""
+        return self._sources.get((filename, tuple(search_cols), tuple(output_cols), tuple(facet_cols),
+                                  tuple((numeric_cols or {}).items())))
+
+    def restamped(self, sources):
+        """Bytes of this file with its header's source records replaced; the sections are kept as they are"""
+        return _compiled_prefix(sources) + self._view[self._base:]
+
+    def open(self, filename, filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+        """
+        (MappedIndex, MappedRows, Facets) for a CSV, or None if it is not compiled or has changed.
+
+        filename is the CSV's path relative to the data directory, as in CSV_CONFIG.
+        """
+        filepath = Path(filepath)
+        source = self.find(filename, search_cols, output_cols, facet_cols, numeric_cols)
+        if source is None or not filepath.exists():
+            return None
+        size, mtime_ns = _fingerprint(filepath)
+        if size != source["size"]:
+            return None
+        if mtime_ns != source["mtime_ns"]:
+            with open(filepath, 'rb') as f:
+                if _content_hash(f.read()) != source["sha1"]:
+                    return None
+        return MappedIndex(self, source), MappedRows(self, source), self.facets(source)
+
+
+class MappedIndex:
+    """BM25 index whose postings are read straight out of a CompiledIndex"""
+
+    tokenize = BM25.tokenize
+    doc_norms = BM25.doc_norms
+    _posting_impacts = BM25._posting_impacts
+    query_phrases = BM25.query_phrases
+    _phrase_lists = BM25._phrase_lists
+    removed = frozenset()
+    positions = None
+    _fuzzy = None
+
+    def __init__(self, compiled, source):
+        self.N = source["N"]
+        self.avgdl = source["avgdl"]
+        self.k1 = source["k1"]
+        self.b = source["b"]
+        self._vocab = compiled.section(source, "vocab")
+        self._vocab_offsets = compiled.section(source, "vocab_offsets")
+        self._term_offsets = compiled.section(source, "term_offsets")
+        self._max_impact = compiled.section(source, "max_impact")
+        self._doc_deltas = compiled.section(source, "doc_deltas")
+        self._tfs = compiled.section(source, "tfs")
+        self._impacts = compiled.section(source, "impacts")
+        self.doc_lengths = compiled.section(source, "doc_lengths")
+        self.norms = []
+        if "positions" in source["sections"]:
+            self._position_offsets = compiled.section(source, "position_offsets")
+            self.positions = compiled.section(source, "positions")
+
+    def term_id(self, term):
+        """Position of term in the sorted vocabulary, or None"""
+        key = term.encode("utf-8")
+        vocab, offsets = self._vocab, self._vocab_offsets
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if vocab[offsets[mid]:offsets[mid + 1]].tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(offsets) - 1 and vocab[offsets[lo]:offsets[lo + 1]].tobytes() == key:
+            return lo
+        return None
+
+    def fuzzy_index(self):
+        """TrigramIndex over the mapped vocabulary (ids equal term ids)"""
+        if self._fuzzy is None:
+            vocab, offsets, term_offsets = self._vocab, self._vocab_offsets, self._term_offsets
+            self._fuzzy = TrigramIndex((vocab[offsets[tid]:offsets[tid + 1]].tobytes().decode("utf-8"),
+                                        term_offsets[tid + 1] - term_offsets[tid])
+                                       for tid in range(len(offsets) - 1))
+        return self._fuzzy
+
+    def query_terms(self, query, fuzzy=False):
+        """Indexed query terms (as term ids) with their weights, in query order, like BM25.query_terms()"""
+        weights = {}
+        tokens = self.tokenize(query)
+        for token in tokens:
+            tid = self.term_id(token)
+            if tid is not None:
+                weights[tid] = weights.get(tid, 0) + 1
+        if not weights and fuzzy:
+            index = self.fuzzy_index()
+            for token in tokens:
+                for tid, weight in index.expand(token):
+                    weights[tid] = weights.get(tid, 0) + weight
+        return list(weights.items())
+
+    def postings(self, tid):
+        """[(doc_id, tf)] and the matching impacts of one term"""
+        start, end = self._term_offsets[tid], self._term_offsets[tid + 1]
+        plist = list(zip(accumulate(self._doc_deltas[start:end]), self._tfs[start:end]))
+        return plist, self._impacts[start:end]
+
+    def _located(self, word):
+        """(postings, positions) of an indexed word, or None, like BM25._located()"""
+        tid = self.term_id(word)
+        if tid is None:
+            return None
+        offsets, positions = self._position_offsets, self.positions
+        where = [positions[offsets[c]:offsets[c + 1]]
+                 for c in range(self._term_offsets[tid], self._term_offsets[tid + 1])]
+        return self.postings(tid)[0], where
+
+    def term_postings(self):
+        """(term, [(doc_id, tf)]) for every indexed term, in vocabulary order"""
+        vocab, offsets = self._vocab, self._vocab_offsets
+        for tid in range(len(offsets) - 1):
+            yield vocab[offsets[tid]:offsets[tid + 1]].tobytes().decode("utf-8"), self.postings(tid)[0]
+
+    def term_positions(self):
+        """(term, token positions of each posting) for every indexed term, in vocabulary order"""
+        vocab, offsets, term_offsets = self._vocab, self._vocab_offsets, self._term_offsets
+        position_offsets, positions = self._position_offsets, self.positions
+        for tid in range(len(offsets) - 1):
+            yield (vocab[offsets[tid]:offsets[tid + 1]].tobytes().decode("utf-8"),
+                   [tuple(positions[position_offsets[c]:position_offsets[c + 1]])
+                    for c in range(term_offsets[tid], term_offsets[tid + 1])])
+
+    def score(self, query, fuzzy=False):
+        """Score documents containing a query term, best first (ties by doc order)"""
+        scores = {}
+        for weight, plist, impacts, _ in self.term_lists(query, fuzzy=fuzzy):
+            for (idx, _), impact in zip(plist, impacts):
+                scores[idx] = scores.get(idx, 0) + weight * impact
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+    def term_lists(self, query, allowed=None, fuzzy=False):
+        """Per-term and per-phrase (weight, postings, impacts, max_impact), like BM25.term_lists()"""
+        term_lists = [(weight, *self.postings(tid), self._max_impact[tid])
+                      for tid, weight in self.query_terms(query, fuzzy)]
+        term_lists.extend(self._phrase_lists(query))
+        return term_lists if allowed is None else _restrict(term_lists, allowed)
+
+    def top_k(self, query, k, allowed=None, fuzzy=False):
+        """Best k (doc_id, score) pairs, ranked exactly like BM25.top_k()"""
+        return _max_score_top_k(self.term_lists(query, allowed, fuzzy), k)
+
+    def top_k_batch(self, queries, k, fuzzy=False):
+        """top_k() for each query"""
+        return [self.top_k(query, k, fuzzy=fuzzy) for query in queries]
+
+
+class MappedRows:
+    """Output rows of a CompiledIndex source, decoded one at a time"""
+
+    def __init__(self, compiled, source):
+        self.columns = tuple(source["columns"])
+        self._offsets = compiled.section(source, "row_offsets")
+        self._blob = compiled.section(source, "rows")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        raw = self._blob[self._offsets[index]:self._offsets[index + 1]]
+        return dict(zip(self.columns, json.loads(raw.tobytes().decode("utf-8"))))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def nbytes(self):
+        """Mapped (page cache, not heap) bytes behind these rows"""
+        return self._blob.nbytes + self._offsets.nbytes
+
+    def dict_rows_nbytes(self):
+        """Approximate size of the same rows as a list of dicts straight from csv.DictReader"""
+        return _dict_rows_nbytes(self, self.columns)
+
+
+_compiled_indexes = {}
+_compiled_lock = _thread.allocate_lock()
+
+
+def _compiled_index(path):
+    """Shared CompiledIndex for path, reopened when the file is recompiled; None if absent"""
+    if path is None:
+        return None
+    path = Path(path)
+    try:
+        fingerprint = _fingerprint(path)
+    except OSError:
+        return None
+    with _compiled_lock:
+        cached = _compiled_indexes.get(path)
+        if cached is None or cached[0] != fingerprint:
+            try:
+                compiled = CompiledIndex(path)
+            except (OSError, ValueError):
+                compiled = None  # unreadable or foreign: fall back to the CSVs
+            cached = (fingerprint, compiled)
+            _compiled_indexes[path] = cached
+    return cached[1]
+
+
+# ============ RESULT CACHE ============
+def _sizeof(obj):
+    """Approximate deep size in bytes of a JSON-like response"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_sizeof(v) for v in obj)
+    return size
+
+
+def _copy_response(response):
+    """Copy a response deeply enough that callers cannot mutate a cached one"""
+    copied = dict(response)
+    copied["results"] = [dict(row) for row in response["results"]]
+    if "hits" in response:
+        copied["hits"] = dict(response["hits"])
+    if response.get("filters") is not None:
+        copied["filters"] = list(response["filters"])
+    if response.get("facets") is not None:
+        copied["facets"] = {column: dict(counts) for column, counts in response["facets"].items()}
+    return copied
+
+
+class ResultCache:
+    """LRU cache of search responses, bounded by entry count and approximate bytes.
+
+    Each entry remembers the fingerprint of the CSV it was computed from and is
+    dropped as soon as that file changes.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (fingerprint, nbytes, response)
+        self._bytes = 0
+        self._lock = _thread.allocate_lock()
+
+    def get(self, key, fingerprint):
+        """Cached copy of the response for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != fingerprint:
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy_response(entry[2])
+
+    def put(self, key, fingerprint, response):
+        """Store a response, evicting least recently used entries over budget"""
+        nbytes = _sizeof(response)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            if self.max_entries <= 0 or nbytes > self.max_bytes:
+                return
+            self._entries[key] = (fingerprint, nbytes, _copy_response(response))
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _discard(self, key):
+        self._bytes -= self._entries.pop(key)[1]
+
+    def resize(self, max_entries=None, max_bytes=None):
+        """Change the budgets; the cache is emptied"""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """Hit/miss counters and current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Bumped whenever the cursor state layout changes
+CURSOR_VERSION = 1
+
+
+class CursorError(ValueError):
+    """A search cursor is malformed or its CSV changed since it was issued"""
+
+
+# URL-safe base64 (RFC 4648 section 5) from binascii, which the base64 module
+# wraps at over twice the import cost; a full page issues a cursor on every search
+_URLSAFE = bytes.maketrans(b"+/", b"-_")
+_URLSAFE_DECODE = bytes.maketrans(b"-_", b"+/")
+
+
+def _encode_cursor(state):
+    """Opaque URL-safe token for a cursor state dict"""
+    import binascii
+    data = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return binascii.b2a_base64(data, newline=False).translate(_URLSAFE).rstrip(b"=").decode("ascii")
+
+
+def _decode_cursor(cursor):
+    """Cursor state dict from a token, or raise CursorError"""
+    import binascii
+    try:
+        token = cursor.encode("ascii").translate(_URLSAFE_DECODE)
+        state = json.loads(binascii.a2b_base64(token + b"=" * (-len(token) % 4)).decode("utf-8"))
+    except (AttributeError, TypeError, ValueError):
+        raise CursorError("Bad cursor: not issued by search()/search_stack()") from None
+    if not isinstance(state, dict) or state.get("v") != CURSOR_VERSION:
+        raise CursorError("Bad cursor: not issued by search()/search_stack() of this version")
+    filters, sort_by = state.get("filters"), state.get("sort_by")
+    if not (isinstance(state.get("name"), str) and isinstance(state.get("query"), str)
+            and (filters is None or isinstance(filters, list) and all(isinstance(f, str) for f in filters))
+            and (sort_by is None or isinstance(sort_by, str))
+            and isinstance(state.get("fuzzy", False), bool)
+            and all(isinstance(state.get(field), int) and state[field] >= minimum
+                    for field, minimum in (("size", 1), ("offset", 0)))
+            and isinstance(state.get("fingerprint"), list)):
+        raise CursorError("Bad cursor: missing or malformed fields")
+    return state
+
+
+class RankedListCache:
+    """
+    Short-lived LRU cache of full ranked result lists, the state behind search cursors.
+
+    Entries expire ttl seconds after they were built and, like ResultCache
+    entries, are dropped as soon as their CSV's fingerprint changes. With a
+    directory, the ranked ids also outlive the process as JSON files
+    (save()/load()), so a one-shot CLI call can page on from the list an
+    earlier --cursor call ranked; expired files are deleted as they are found.
+    """
+
+    def __init__(self, max_entries=CURSOR_CACHE_MAX_ENTRIES, ttl=CURSOR_TTL_SECONDS, directory=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self._entries = OrderedDict()  # key -> (fingerprint, expires, value)
+        self._lock = _thread.allocate_lock()
+
+    def get(self, key, fingerprint):
+        """The ranked list stored for key, or None when absent, expired or stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != fingerprint or entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key, fingerprint, value):
+        """Store a ranked list, evicting expired then least recently used entries"""
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(key, None)
+            if self.max_entries <= 0:
+                return
+            self._entries[key] = (fingerprint, now + self.ttl, value)
+            for stale in [k for k, (_, expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        # A name clash is harmless: load() checks the key saved in the file
+        return Path(self.directory) / f"{zlib.crc32(repr(key).encode('utf-8')):08x}.json"
+
+    def load(self, key, fingerprint):
+        """(ranked, counts) saved in directory for key, or None when absent, expired or stale"""
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                saved = json.loads(f.read().decode("utf-8"))
+        except (OSError, ValueError):
+            # Missing, truncated or foreign files are simply ranked again
+            return None
+        if (not isinstance(saved, dict) or saved.get("version") != CURSOR_VERSION or saved.get("key") != repr(key)
+                or saved.get("fingerprint") != list(fingerprint) or not isinstance(saved.get("ranked"), list)):
+            return None
+        if saved.get("expires", 0) <= time.time():
+            _unlink(path)
+            return None
+        return [tuple(pair) for pair in saved["ranked"]], saved.get("counts")
+
+    def save(self, key, fingerprint, ranked, counts):
+        """Write a ranked list to directory (if any), pruning expired ones; failures are ignored"""
+        if self.directory is None or self.max_entries <= 0:
+            return
+        now = time.time()
+        saved = {"version": CURSOR_VERSION, "key": repr(key), "fingerprint": list(fingerprint),
+                 "expires": now + self.ttl, "ranked": ranked, "counts": counts}
+        _write_file(self._path(key), json.dumps(saved, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        try:
+            saved = sorted(Path(self.directory).glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+        except OSError:
+            return
+        for i, path in enumerate(saved):
+            try:
+                if i >= self.max_entries or path.stat().st_mtime <= now - self.ttl:
+                    path.unlink()
+            except OSError:
+                pass
+
+
+# ============ KNOWLEDGE BASE ============
+class KnowledgeBase:
+    """
+    Session object owning every loaded domain/stack index and the reasoning table.
+
+    Indexes are loaded lazily per domain on first use (a color-only session never
+    reads google-fonts.csv) and reloaded when their CSV changes on disk. Build one
+    and reuse it for many queries; the module-level search functions and the
+    design system generator share a default instance from get_knowledge_base().
+    """
+
+    def __init__(self, data_dir=None, result_cache=None, compiled_index=None):
+        self.data_dir = Path(data_dir) if data_dir is not None else DATA_DIR
+        if compiled_index is None and self.data_dir == DATA_DIR:
+            compiled_index = COMPILED_INDEX_FILE
+        self.compiled_index = compiled_index
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        self.ranked_lists = RankedListCache()
+        self._indexes = {}
+        self._load_locks = {}
+        self._reasoning = None
+        self._unified = None
+        self._lock = _thread.allocate_lock()
+
+    # ---- Loading ----
+    def load(self, filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+        """(bm25, rows) for a CSV, from memory, the compiled index, the on-disk cache or a fresh build"""
+        loaded = self._load(filepath, search_cols, output_cols, facet_cols, numeric_cols)
+        return loaded["bm25"], loaded["rows"]
+
+    def _load(self, filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+        """
+        Resident index state (bm25, rows, facets, ...) of a CSV, loaded or reloaded as needed.
+        numeric_cols is a {column: kind} dict or the (column, kind) pairs of one.
+        """
+        numeric_cols = dict(numeric_cols or {})
+        key = (str(filepath), tuple(search_cols), tuple(output_cols), tuple(facet_cols), tuple(numeric_cols.items()))
+        loaded = self._indexes.get(key)
+        if loaded is not None and loaded["fingerprint"] == _fingerprint(filepath):
+            return loaded
+
+        # Serialise (re)loads per file so concurrent callers build each index only
+        # once, while different files still load in parallel
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, _thread.allocate_lock())
+        with load_lock:
+            loaded = self._indexes.get(key)
+            if loaded is None or loaded["fingerprint"] != _fingerprint(filepath):
+                with span("index.load"):
+                    loaded = self._reload(loaded, filepath, search_cols, output_cols, facet_cols, numeric_cols)
+                self._indexes[key] = loaded
+        return loaded
+
+    def _reload(self, loaded, filepath, search_cols, output_cols, facet_cols=(), numeric_cols=None):
+        """Fresh index state for a new or changed CSV, updated incrementally when possible"""
+        entry = None
+        if loaded is not None and loaded["digests"] is not None:
+            entry = _update_index(loaded, filepath, search_cols, output_cols, facet_cols, numeric_cols)
+            if entry is not None and INDEX_CACHE_DIR is not None:
+                _write_cache(_cache_path(filepath, search_cols, output_cols, facet_cols, numeric_cols), filepath,
+                             search_cols, output_cols, facet_cols, numeric_cols, entry)
+
+        if entry is None:
+            compiled = _compiled_index(self.compiled_index)
+            if compiled is not None and Path(filepath).is_relative_to(self.data_dir):
+                filename = Path(filepath).relative_to(self.data_dir).as_posix()
+                mapped = compiled.open(filename, filepath, search_cols, output_cols, facet_cols, numeric_cols)
+                if mapped is not None:
+                    # Read-only: an edit to this CSV later triggers a full rebuild
+                    return {"fingerprint": _fingerprint(filepath), "bm25": mapped[0], "rows": mapped[1],
+                            "facets": mapped[2], "digests": None}
+            entry = _load_entry(filepath, search_cols, output_cols, facet_cols, numeric_cols)
+
+        return {
+            "fingerprint": (entry["size"], entry["mtime_ns"]),
+            "bm25": entry["bm25"],
+            "rows": entry["rows"],
+            "facets": entry["facets"],
+            "digests": entry["digests"],
+        }
+
+    def refresh(self):
+        """Re-index every resident CSV that changed on disk; returns their paths"""
+        refreshed = []
+        for key in list(self._indexes):
+            filepath = key[0]
+            loaded = self._indexes.get(key)
+            if loaded is not None and Path(filepath).exists() and loaded["fingerprint"] != _fingerprint(Path(filepath)):
+                self._load(Path(filepath), *key[1:])
+                refreshed.append(filepath)
+        return refreshed
+
+    def unified_index(self):
+        """
+        (bm25, parts) over every domain and stack CSV present, as one corpus.
+
+        parts lists (first doc id, source name, file, rows, facets) per CSV in
+        _all_sources() order. The index is merged from the per-CSV indexes and
+        rebuilt whenever one of them is reloaded.
+        """
+        loaded = []
+        for name, filename, search_cols, output_cols, facet_cols, numeric_cols in _all_sources():
+            filepath = self.data_dir / filename
+            if filepath.exists():
+                loaded.append((name, filename, self._load(filepath, search_cols, output_cols, facet_cols, numeric_cols)))
+
+        unified = self._unified
+        if unified is None or len(unified[0]) != len(loaded) or \
+                any(a is not b["bm25"] for a, (_, _, b) in zip(unified[0], loaded)):
+            with span("index.merge"):
+                bm25, offsets = BM25.concat([part["bm25"] for _, _, part in loaded])
+            parts = [(offset, name, filename, part["rows"], part["facets"])
+                     for offset, (name, filename, part) in zip(offsets, loaded)]
+            unified = (tuple(part["bm25"] for _, _, part in loaded), bm25, parts)
+            self._unified = unified
+        return unified[1], unified[2]
+
+    def domain_index(self, domain):
+        """(bm25, rows) for a CSV_CONFIG domain"""
+        config = CSV_CONFIG[domain]
+        return self.load(self.data_dir / config["file"], config["search_cols"], config["output_cols"],
+                         config.get("facet_cols", ()), config.get("numeric_cols"))
+
+    def stack_index(self, stack):
+        """(bm25, rows) for a STACK_CONFIG stack"""
+        return self.load(self.data_dir / STACK_CONFIG[stack]["file"], _STACK_COLS["search_cols"], _STACK_COLS["output_cols"],
+                         _STACK_COLS["facet_cols"])
+
+    def reasoning(self):
+        """Rows of the reasoning table, reloaded when the file changes"""
+        filepath = self.data_dir / REASONING_FILE
+        if not filepath.exists():
+            return []
+        fingerprint = _fingerprint(filepath)
+        cached = self._reasoning
+        if cached is None or cached[0] != fingerprint:
+            with span("reasoning.load"):
+                cached = (fingerprint, _load_csv(filepath))
+            self._reasoning = cached
+        return cached[1]
+
+    def preload(self, domains=None, stacks=None):
+        """Load the given domain and stack indexes (default: all) plus the reasoning table"""
+        for domain in (CSV_CONFIG if domains is None else domains):
+            if (self.data_dir / CSV_CONFIG[domain]["file"]).exists():
+                self.domain_index(domain)
+        for stack in (STACK_CONFIG if stacks is None else stacks):
+            if (self.data_dir / STACK_CONFIG[stack]["file"]).exists():
+                self.stack_index(stack)
+        self.reasoning()
+
+    def loaded_files(self):
+        """Data files whose indexes are resident, relative to data_dir"""
+        names = set()
+        for filepath, *_ in self._indexes:
+            try:
+                names.add(Path(filepath).relative_to(self.data_dir).as_posix())
+            except ValueError:
+                names.add(filepath)
+        return sorted(names)
+
+    def memory_report(self):
+        """Bytes held by each resident domain/stack's rows, as stored vs one dict per row"""
+        report = {}
+        for name, filename, search_cols, output_cols, facet_cols, numeric_cols in _all_sources():
+            loaded = self._indexes.get((str(self.data_dir / filename), tuple(search_cols), tuple(output_cols),
+                                        tuple(facet_cols), tuple(numeric_cols.items())))
+            if loaded is None:
+                continue
+            rows = loaded["rows"]
+            report[name] = {
+                "file": filename,
+                "rows": len(rows),
+                "row_bytes": rows.nbytes(),
+                "dict_rows_bytes": rows.dict_rows_nbytes(),
+            }
+        return report
+
+    # ---- Searching ----
+    def _search_file(self, filepath, search_cols, output_cols, queries, max_results, facet_cols=(), numeric_cols=None,
+                     fuzzy=False):
+        """Top result rows for each query against one CSV"""
+        if not filepath.exists():
+            return [[] for _ in queries]
+
+        bm25, rows = self.load(filepath, search_cols, output_cols, facet_cols, numeric_cols)
+        with span("search.score"):
+            ranked_lists = _engine(bm25, len(queries)).top_k_batch(queries, max_results, fuzzy)
+
+        # Get top results with score > 0
+        with span("search.rows"):
+            return [[dict(rows[idx]) for idx, score in ranked if score > 0] for ranked in ranked_lists]
+
+    def _rank(self, loaded, query, filters, sort_by, limit=None, fuzzy=False):
+        """
+        (ranked, sort, matched) for one query against a loaded CSV: the best
+        limit (default: all) (row id, sort key) pairs among the rows passing
+        filters, the (column, SortedColumn) ordering them or None, and the
+        bitset of every matching row (None without filters or sort_by).
+
+        Without sort_by rows rank by score and their keys are None. With it the
+        matching rows come in the order of that numeric column, and a query
+        without any searchable word (blank, "a", punctuation) matches every
+        row passing the filters.
+        """
+        bm25, facets = loaded["bm25"], loaded["facets"]
+        filters = parse_filters(filters)
+        allowed = facets.match(filters) if filters else None
+        sort = facets.sorted_column(sort_by) if sort_by else None
+        with span("search.score"):
+            # Postings outside the filtered rows are dropped before any scoring
+            term_lists = bm25.term_lists(query, allowed, fuzzy)
+            if sort is None:
+                ranked = [(idx, None) for idx, score in _max_score_top_k(term_lists, bm25.N if limit is None else limit)
+                          if score > 0]
+        if not (filters or sort):
+            return ranked, None, None
+        if sort is not None and not bm25.tokenize(query):
+            matched = facets.all if allowed is None else allowed
+        else:
+            matched = _bitset({idx for _, plist, _, _ in term_lists for idx, _ in plist}, facets.n)
+
+        if sort is not None:
+            column, numbers, descending = sort
+            with span("search.sort"):
+                # Walk the column's sorted row ids until enough of them match
+                ranked = list(islice(((idx, key) for idx, key in numbers.order(descending) if matched >> idx & 1),
+                                     None if limit is None else max(limit, 0)))
+            sort = (column, numbers)
+        return ranked, sort, matched
+
+    def _search_filtered(self, filepath, search_cols, output_cols, facet_cols, numeric_cols, query, max_results, filters,
+                         sort_by=None, fuzzy=False):
+        """
+        (top result rows, facet counts) for one query against the rows of a CSV
+        passing every filter; counts cover all matching rows, not just the top
+        ones. With sort_by, rows are ordered as in _rank() and carry the column's value.
+        """
+        loaded = self._load(filepath, search_cols, output_cols, facet_cols, numeric_cols)
+        ranked, sort, matched = self._rank(loaded, query, filters, sort_by, max_results, fuzzy)
+        return _ranked_rows(loaded["rows"], ranked, sort), loaded["facets"].counts(matched)
+
+    def _cached(self, key, fingerprint, compute):
+        """Serve a response from the result cache or compute and store it"""
+        response = self.result_cache.get(key, fingerprint)
+        if response is None:
+            response = compute()
+            self.result_cache.put(key, fingerprint, response)
+        return response
+
+    def _unified_allowed(self, parts, filters):
+        """Unified doc id bitset of the rows passing filters in every source that has their facets"""
+        allowed, filtered = 0, False
+        for offset, _, _, _, facets in parts:
+            if all(facets.column(name) for name, _, _ in filters):
+                allowed |= facets.match(filters) << offset
+                filtered = True
+        if not filtered:
+            names = ", ".join(dict.fromkeys(name for name, _, _ in filters))
+            raise FilterError(f"No domain or stack has facets {names}")
+        return allowed
+
+    def _search_all(self, queries, max_results, filters=None, fuzzy=False):
+        """search_all() responses for several queries, scored as one batch"""
+        bm25, parts = self.unified_index()
+        starts = [offset for offset, _, _, _, _ in parts]
+        allowed = self._unified_allowed(parts, parse_filters(filters)) if filters else None
+        with span("search.score"):
+            if allowed is None:
+                ranked_lists = _engine(bm25, len(queries)).top_k_batch(queries, max_results, fuzzy)
+            else:
+                ranked_lists = [bm25.top_k(query, max_results, allowed, fuzzy) for query in queries]
+
+        responses = []
+        for query, ranked in zip(queries, ranked_lists):
+            results = []
+            for idx, score in ranked:
+                if score > 0:
+                    offset, name, _, rows, _ = parts[bisect_right(starts, idx) - 1]
+                    results.append({"Domain": name, **rows[idx - offset]})
+
+            # Hit counts cover every matching document, not just the top results
+            matched = set()
+            for _, plist, _, _ in bm25.term_lists(query, allowed, fuzzy):
+                matched.update(idx for idx, _ in plist)
+            hits = defaultdict(list)
+            for idx in matched:
+                hits[bisect_right(starts, idx) - 1].append(idx)
+
+            response = {
+                "domain": "all",
+                "query": query,
+                "count": len(results),
+                "results": results,
+                "hits": {parts[i][1]: len(hits[i]) for i in sorted(hits)},
+            }
+            if filters:
+                response["filters"] = list(filters)
+                response["facets"] = _merge_facet_counts(
+                    parts[i][4].counts(_bitset((idx - parts[i][0] for idx in hits[i]), parts[i][4].n))
+                    for i in sorted(hits))
+            responses.append(response)
+        return responses
+
+    def search_all(self, query, max_results=MAX_RESULTS, filters=None, fuzzy=False):
+        """Search every domain and stack at once: merged top results plus hit counts per source"""
+        fingerprint = tuple(_fingerprint(self.data_dir / filename)
+                            for _, filename, *_ in _all_sources() if (self.data_dir / filename).exists())
+        try:
+            return self._cached(("search_all", str(self.data_dir), query, max_results, _filter_key(filters), fuzzy),
+                                fingerprint, lambda: self._search_all([query], max_results, filters, fuzzy)[0])
+        except FilterError as e:
+            return {"error": str(e), "domain": "all"}
+
+    def search(self, query, domain=None, max_results=MAX_RESULTS, filters=None, sort_by=None, fuzzy=False):
+        """
+        Main search function with auto-domain detection ("all" searches every domain and stack).
+
+        filters ("Column=Value" or "Column~words" strings on the domain's
+        facet_cols, "Column<Value" style ranges on its numeric_cols) restrict
+        the rows searched; the response then also counts the values of every
+        facet among the matching rows. sort_by ("Column", or "-Column" for
+        descending) orders the matches by a numeric column instead of by score.
+        A full page of results comes with a "cursor" for search_page().
+        With fuzzy, a query none of whose words is indexed matches their
+        nearest spellings instead of nothing (see FUZZY_MIN_LENGTH).
+        An unknown domain searches "style"; its cursor names "style".
+        """
+        if domain == "all":
+            if sort_by:
+                return {"error": "sort_by needs a single domain", "domain": "all"}
+            return self.search_all(query, max_results, filters, fuzzy)
+        if domain is None:
+            domain = detect_domain(query)
+
+        config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+        filepath = self.data_dir / config["file"]
+        facet_cols = config.get("facet_cols", ())
+        numeric_cols = config.get("numeric_cols")
+
+        if not filepath.exists():
+            return {"error": f"File not found: {filepath}", "domain": domain}
+
+        def compute():
+            if filters or sort_by:
+                results, facets = self._search_filtered(filepath, config["search_cols"], config["output_cols"], facet_cols,
+                                                        numeric_cols, query, max_results, filters, sort_by, fuzzy)
+            else:
+                results = self._search_file(filepath, config["search_cols"], config["output_cols"], [query], max_results,
+                                            facet_cols, numeric_cols, fuzzy)[0]
+            response = {
+                "domain": domain,
+                "query": query,
+                "file": config["file"],
+                "count": len(results),
+                "results": results
+            }
+            if filters:
+                response["filters"] = list(filters)
+            if sort_by:
+                response["sort_by"] = sort_by
+            if filters or sort_by:
+                response["facets"] = facets
+            if max_results > 0 and len(results) == max_results:
+                searched = domain if domain in CSV_CONFIG else "style"
+                response["cursor"] = _search_cursor("search", searched, query, filters, sort_by, max_results, max_results,
+                                                    _fingerprint(filepath), fuzzy)
+            return response
+
+        try:
+            return self._cached(("search", str(filepath), domain, query, max_results, _filter_key(filters), sort_by, fuzzy),
+                                _fingerprint(filepath), compute)
+        except FilterError as e:
+            return {"error": str(e), "domain": domain}
+
+    def search_batch(self, queries, domain=None, max_results=MAX_RESULTS, fuzzy=False):
+        """Run many searches, scoring each domain's queries as one batch"""
+        if domain == "all":
+            return self._search_all(list(queries), max_results, fuzzy=fuzzy)
+        domains = [domain or detect_domain(query) for query in queries]
+        responses = [None] * len(queries)
+
+        for name in dict.fromkeys(domains):
+            positions = [i for i, d in enumerate(domains) if d == name]
+            config = CSV_CONFIG.get(name, CSV_CONFIG["style"])
+            filepath = self.data_dir / config["file"]
+            if not filepath.exists():
+                for i in positions:
+                    responses[i] = {"error": f"File not found: {filepath}", "domain": name}
+                continue
+
+            batch = self._search_file(filepath, config["search_cols"], config["output_cols"],
+                                      [queries[i] for i in positions], max_results, config.get("facet_cols", ()),
+                                      config.get("numeric_cols"), fuzzy)
+            fingerprint = _fingerprint(filepath)
+            for i, results in zip(positions, batch):
+                responses[i] = {
+                    "domain": name,
+                    "query": queries[i],
+                    "file": config["file"],
+                    "count": len(results),
+                    "results": results
+                }
+                if max_results > 0 and len(results) == max_results:
+                    responses[i]["cursor"] = _search_cursor("search", name if name in CSV_CONFIG else "style",
+                                                            queries[i], None, None, max_results, max_results,
+                                                            fingerprint, fuzzy)
+
+        return responses
+
+    def search_stack(self, query, stack, max_results=MAX_RESULTS, filters=None, fuzzy=False):
+        """Search stack-specific guidelines, optionally filtered like search()"""
+        if stack not in STACK_CONFIG:
+            return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
+
+        filepath = self.data_dir / STACK_CONFIG[stack]["file"]
+
+        if not filepath.exists():
+            return {"error": f"Stack file not found: {filepath}", "stack": stack}
+
+        def compute():
+            if filters:
+                results, facets = self._search_filtered(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"],
+                                                        _STACK_COLS["facet_cols"], None, query, max_results, filters,
+                                                        fuzzy=fuzzy)
+            else:
+                results = self._search_file(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], [query],
+                                            max_results, _STACK_COLS["facet_cols"], fuzzy=fuzzy)[0]
+            response = {
+                "domain": "stack",
+                "stack": stack,
+                "query": query,
+                "file": STACK_CONFIG[stack]["file"],
+                "count": len(results),
+                "results": results
+            }
+            if filters:
+                response["filters"] = list(filters)
+                response["facets"] = facets
+            if max_results > 0 and len(results) == max_results:
+                response["cursor"] = _search_cursor("search_stack", stack, query, filters, None, max_results, max_results,
+                                                    _fingerprint(filepath), fuzzy)
+            return response
+
+        try:
+            return self._cached(("search_stack", str(filepath), stack, query, max_results, _filter_key(filters), fuzzy),
+                                _fingerprint(filepath), compute)
+        except FilterError as e:
+            return {"error": str(e), "stack": stack}
+
+    def search_page(self, cursor):
+        """
+        The next page of the search() or search_stack() call that issued cursor.
+
+        Issuing a cursor costs nothing beyond the first page's bounded top-k:
+        the first page request ranks every matching row once and keeps that
+        list in ranked_lists, and later pages are slices of it with no
+        rescoring (it is ranked again only after expiring). A cursor stops
+        working once its CSV changes; each full page carries the cursor of the
+        page after it.
+        """
+        try:
+            return self._search_page(_decode_cursor(cursor))
+        except (CursorError, FilterError) as e:
+            return {"error": str(e)}
+
+    def _search_page(self, state):
+        """search_page() response for a decoded cursor state"""
+        op, name = state.get("op"), state["name"]
+        if op == "search" and name in CSV_CONFIG:
+            config = CSV_CONFIG[name]
+            filename = config["file"]
+            columns = (config["search_cols"], config["output_cols"], config.get("facet_cols", ()),
+                       config.get("numeric_cols"))
+            response = {"domain": name}
+        elif op == "search_stack" and name in STACK_CONFIG:
+            filename = STACK_CONFIG[name]["file"]
+            columns = (_STACK_COLS["search_cols"], _STACK_COLS["output_cols"], _STACK_COLS["facet_cols"], None)
+            response = {"domain": "stack", "stack": name}
+        else:
+            raise CursorError(f"Bad cursor: unknown {op} target {name!r}")
+
+        filepath = self.data_dir / filename
+        fingerprint = _fingerprint(filepath) if filepath.exists() else None
+        if fingerprint is None or list(fingerprint) != state["fingerprint"]:
+            raise CursorError(f"Cursor expired: {filename} changed since the search; run it again")
+
+        query, filters, sort_by = state["query"], state["filters"], state["sort_by"]
+        entry = self._ranking(filepath, columns, query, filters, sort_by, fingerprint, state.get("fuzzy", False))
+        if entry is None:
+            raise CursorError(f"Cursor expired: {filename} changed since the search; run it again")
+        rows, ranked, sort, counts = entry
+
+        size, offset = state["size"], state["offset"]
+        results = _ranked_rows(rows, ranked[offset:offset + size], sort)
+        response.update({"query": query, "file": filename, "offset": offset, "count": len(results), "results": results})
+        if filters:
+            response["filters"] = list(filters)
+        if sort_by:
+            response["sort_by"] = sort_by
+        if counts is not None:
+            response["facets"] = {column: dict(values) for column, values in counts.items()}
+        if offset + size < len(ranked):
+            response["cursor"] = _encode_cursor({**state, "offset": offset + size})
+        return response
+
+    def _ranking(self, filepath, columns, query, filters, sort_by, fingerprint, fuzzy=False):
+        """
+        (rows, ranked, sort, counts) of every row matching a cursor's search, from
+        ranked_lists or ranked once and stored there; None when the CSV no longer
+        has fingerprint. columns: (search, output, facet, numeric) columns.
+        """
+        key = (str(filepath), *(tuple(cols or ()) for cols in columns), query, _filter_key(filters), sort_by, fuzzy)
+        entry = self.ranked_lists.get(key, fingerprint)
+        if entry is not None:
+            return entry
+        loaded = self._load(filepath, *columns)
+        if loaded["fingerprint"] != fingerprint:
+            return None
+        saved = self.ranked_lists.load(key, fingerprint)
+        if saved is not None:
+            ranked, counts = saved
+            sort = loaded["facets"].sorted_column(sort_by)[:2] if sort_by else None
+        else:
+            ranked, sort, matched = self._rank(loaded, query, filters, sort_by, fuzzy=fuzzy)
+            counts = loaded["facets"].counts(matched) if filters or sort_by else None
+            self.ranked_lists.save(key, fingerprint, ranked, counts)
+        entry = (loaded["rows"], ranked, sort, counts)
+        self.ranked_lists.put(key, fingerprint, entry)
+        return entry
+
+
+def _ranked_rows(rows, ranked, sort):
+    """Result rows for (row id, sort key) pairs, with the sort column's value when sorted"""
+    with span("search.rows"):
+        if sort is None:
+            return [dict(rows[idx]) for idx, _ in ranked]
+        column, numbers = sort
+        return [{**rows[idx], column: numbers.format(key)} for idx, key in ranked]
+
+
+def _search_cursor(op, name, query, filters, sort_by, size, offset, fingerprint, fuzzy=False):
+    """Cursor continuing a search() ("search") or search_stack() ("search_stack") call at offset"""
+    return _encode_cursor({"v": CURSOR_VERSION, "op": op, "name": name, "query": query,
+                           "filters": list(filters) if filters else None, "sort_by": sort_by, "fuzzy": fuzzy,
+                           "size": size, "offset": offset, "fingerprint": list(fingerprint)})
+
+
+def _filter_key(filters):
+    """Hashable result cache key part for a filter list"""
+    return tuple(filters) if filters else None
+
+
+def _merge_facet_counts(counts_list):
+    """Sum {column: {value: count}} dicts, most frequent values first"""
+    merged = {}
+    for counts in counts_list:
+        for column, values in counts.items():
+            column_counts = merged.setdefault(column, {})
+            for value, count in values.items():
+                column_counts[value] = column_counts.get(value, 0) + count
+    return {column: dict(sorted(values.items(), key=lambda item: (-item[1], item[0])))
+            for column, values in merged.items()}
+
+
+_default_kb = None
+_default_kb_lock = _thread.allocate_lock()
+
+
+def get_knowledge_base():
+    """The shared KnowledgeBase behind the module-level search functions"""
+    global _default_kb
+    if _default_kb is None:
+        with _default_kb_lock:
+            if _default_kb is None:
+                _default_kb = KnowledgeBase()
+    return _default_kb
+
+
+def configure_result_cache(max_entries=None, max_bytes=None):
+    """Resize the default search result cache (max_entries=0 disables it)"""
+    get_knowledge_base().result_cache.resize(max_entries, max_bytes)
+
+
+def result_cache_info():
+    """Hit/miss counters and usage of the default search result cache"""
+    return get_knowledge_base().result_cache.info()
+
+
+def memory_report():
+    """Per-domain row storage of the default knowledge base (see KnowledgeBase.memory_report)"""
+    return get_knowledge_base().memory_report()
+
+
+def clear_result_cache():
+    """Empty the default search result cache and the ranked lists behind cursors"""
+    kb = get_knowledge_base()
+    kb.result_cache.clear()
+    kb.ranked_lists.clear()
+
+
+# ============ KEYWORD CLASSIFIER ============
+def _is_word_char(ch):
+    """Same notion of a word character as re's \\w"""
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword list.
+
+    find() reports every keyword occurring in a text in one pass over it,
+    overlapping matches included, so classification cost no longer grows
+    with the number of keywords. With word_boundary=True an occurrence only
+    counts where re.search(r'\\b' + re.escape(kw) + r'\\b') would match.
+    """
+
+    def __init__(self, keywords, word_boundary=False):
+        self.word_boundary = word_boundary
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for keyword in dict.fromkeys(keywords):
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = self._out[state] + (keyword,)
+
+        # Breadth-first failure links; each state also emits its suffixes' keywords
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def find(self, text):
+        """Set of keywords occurring in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for keyword in out[state]:
+                if self.word_boundary:
+                    start = i - len(keyword) + 1
+                    before = start > 0 and _is_word_char(text[start - 1])
+                    after = i < last and _is_word_char(text[i + 1])
+                    if before == _is_word_char(keyword[0]) or after == _is_word_char(keyword[-1]):
+                        continue
+                found.add(keyword)
+        return found
+
+
+DOMAIN_KEYWORDS = {
+    "color": ["color", "palette", "hex", "#", "rgb", "token", "semantic", "accent", "destructive", "muted", "foreground"],
+    "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
+    "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
+    "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard", "fitness", "restaurant", "hotel", "travel", "music", "education", "learning", "legal", "insurance", "medical", "beauty", "pharmacy", "dental", "pet", "dating", "wedding", "recipe", "delivery", "ride", "booking", "calendar", "timer", "tracker", "diary", "note", "chat", "messenger", "crm", "invoice", "parking", "transit", "vpn", "alarm", "weather", "sleep", "meditation", "fasting", "habit", "grocery", "meme", "wardrobe", "plant care", "reading", "flashcard", "puzzle", "trivia", "arcade", "photography", "streaming", "podcast", "newsletter", "marketplace", "freelancer", "coworking", "airline", "museum", "theater", "church", "non-profit", "charity", "kindergarten", "daycare", "senior care", "veterinary", "florist", "bakery", "brewery", "construction", "automotive", "real estate", "logistics", "agriculture", "coding bootcamp"],
+    "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora", "prompt", "css", "implementation", "variable", "checklist", "tailwind"],
+    "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
+    "typography": ["font pairing", "typography pairing", "heading font", "body font"],
+    "google-fonts": ["google font", "font family", "font weight", "font style", "variable font", "noto", "font for", "find font", "font subset", "font language", "monospace font", "serif font", "sans serif font", "display font", "handwriting font", "font", "typography", "serif", "sans"],
+    "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
+    "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
+    "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
+}
+
+_domain_matcher = None
+
+
+def _keyword_domains():
+    """(KeywordMatcher over DOMAIN_KEYWORDS, keyword -> domains listing it), built on first use"""
+    global _domain_matcher
+    if _domain_matcher is None:
+        keyword_domains = defaultdict(list)  # a repeat in one list counts twice
+        for domain, keywords in DOMAIN_KEYWORDS.items():
+            for keyword in keywords:
+                keyword_domains[keyword].append(domain)
+        _domain_matcher = (KeywordMatcher(keyword_domains, word_boundary=True), keyword_domains)
+    return _domain_matcher
 
 
 # ============ SEARCH FUNCTIONS ============
@@ -170,93 +2975,58 @@ def _load_csv(filepath):
         return list(csv.DictReader(f))
 
 
+def _load_index(filepath, search_cols, output_cols):
+    """(bm25, rows) for a CSV from the default knowledge base"""
+    return get_knowledge_base().load(filepath, search_cols, output_cols)
+
+
 def _search_csv(filepath, search_cols, output_cols, query, max_results):
     """Core search function using BM25"""
-    if not filepath.exists():
-        return []
+    return get_knowledge_base()._search_file(filepath, search_cols, output_cols, [query], max_results)[0]
 
-    data = _load_csv(filepath)
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+def _search_csv_batch(filepath, search_cols, output_cols, queries, max_results):
+    """Search one CSV with many queries, loading and scoring its index once"""
+    return get_knowledge_base()._search_file(filepath, search_cols, output_cols, queries, max_results)
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
-
-    return results
+def preload():
+    """Load every domain and stack index so later searches start warm"""
+    get_knowledge_base().preload()
 
 
 def detect_domain(query):
     """Auto-detect the most relevant domain from query"""
-    query_lower = query.lower()
-
-    domain_keywords = {
-        "color": ["color", "palette", "hex", "#", "rgb", "token", "semantic", "accent", "destructive", "muted", "foreground"],
-        "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
-        "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
-        "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard", "fitness", "restaurant", "hotel", "travel", "music", "education", "learning", "legal", "insurance", "medical", "beauty", "pharmacy", "dental", "pet", "dating", "wedding", "recipe", "delivery", "ride", "booking", "calendar", "timer", "tracker", "diary", "note", "chat", "messenger", "crm", "invoice", "parking", "transit", "vpn", "alarm", "weather", "sleep", "meditation", "fasting", "habit", "grocery", "meme", "wardrobe", "plant care", "reading", "flashcard", "puzzle", "trivia", "arcade", "photography", "streaming", "podcast", "newsletter", "marketplace", "freelancer", "coworking", "airline", "museum", "theater", "church", "non-profit", "charity", "kindergarten", "daycare", "senior care", "veterinary", "florist", "bakery", "brewery", "construction", "automotive", "real estate", "logistics", "agriculture", "coding bootcamp"],
-        "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora", "prompt", "css", "implementation", "variable", "checklist", "tailwind"],
-        "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
-        "typography": ["font pairing", "typography pairing", "heading font", "body font"],
-        "google-fonts": ["google font", "font family", "font weight", "font style", "variable font", "noto", "font for", "find font", "font subset", "font language", "monospace font", "serif font", "sans serif font", "display font", "handwriting font", "font", "typography", "serif", "sans"],
-        "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
-        "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
-        "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
-    }
-
-    scores = {domain: sum(1 for kw in keywords if re.search(r'\b' + re.escape(kw) + r'\b', query_lower)) for domain, keywords in domain_keywords.items()}
+    scores = dict.fromkeys(DOMAIN_KEYWORDS, 0)
+    with span("detect_domain"):
+        matcher, keyword_domains = _keyword_domains()
+        for keyword in matcher.find(query.lower()):
+            for domain in keyword_domains[keyword]:
+                scores[domain] += 1
     best = max(scores, key=scores.get)
     return best if scores[best] > 0 else "style"
 
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
-    if domain is None:
-        domain = detect_domain(query)
+def search(query, domain=None, max_results=MAX_RESULTS, filters=None, sort_by=None, fuzzy=False):
+    """Main search function with auto-domain detection (filters, sort_by, fuzzy: see KnowledgeBase.search)"""
+    return get_knowledge_base().search(query, domain, max_results, filters, sort_by, fuzzy)
 
-    config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
-    filepath = DATA_DIR / config["file"]
 
-    if not filepath.exists():
-        return {"error": f"File not found: {filepath}", "domain": domain}
+def search_all(query, max_results=MAX_RESULTS, filters=None, fuzzy=False):
+    """Search every domain and stack in one pass (see KnowledgeBase.search_all)"""
+    return get_knowledge_base().search_all(query, max_results, filters, fuzzy)
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
 
-    return {
-        "domain": domain,
-        "query": query,
-        "file": config["file"],
-        "count": len(results),
-        "results": results
-    }
+def search_batch(queries, domain=None, max_results=MAX_RESULTS, fuzzy=False):
+    """Run many searches, scoring each domain's queries as one batch"""
+    return get_knowledge_base().search_batch(queries, domain, max_results, fuzzy)
 
 
-def search_stack(query, stack, max_results=MAX_RESULTS):
+def search_stack(query, stack, max_results=MAX_RESULTS, filters=None, fuzzy=False):
     """Search stack-specific guidelines"""
-    if stack not in STACK_CONFIG:
-        return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
-
-    filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
+    return get_knowledge_base().search_stack(query, stack, max_results, filters, fuzzy)
 
-    if not filepath.exists():
-        return {"error": f"Stack file not found: {filepath}", "stack": stack}
 
-    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
-
-    return {
-        "domain": "stack",
-        "stack": stack,
-        "query": query,
-        "file": STACK_CONFIG[stack]["file"],
-        "count": len(results),
-        "results": results
-    }
+def search_page(cursor):
+    """Next page of results for a cursor returned by search() or search_stack()"""
+    return get_knowledge_base().search_page(cursor)
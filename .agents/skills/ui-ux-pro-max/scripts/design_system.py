@@ -13,17 +13,17 @@ Usage:
     result = generate_design_system("SaaS dashboard", "My Project", persist=True, page="dashboard")
 """
 
-import csv
+import _thread
+import gc
 import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
-from core import search, DATA_DIR
+from core import KeywordMatcher, KnowledgeBase, get_knowledge_base, span
 
 
 # ============ CONFIGURATION ============
-REASONING_FILE = "ui-reasoning.csv"
-
 SEARCH_CONFIG = {
     "product": {"max_results": 1},
     "style": {"max_results": 3},
@@ -32,33 +32,99 @@ SEARCH_CONFIG = {
     "typography": {"max_results": 2}
 }
 
+# Threads for the domain searches that do not wait on the product search
+# (1 runs every search serially). Scoring is pure Python, so threads only
+# overlap searches on a free-threaded build; with the GIL they would add
+# hand-off cost, so the default is serial there.
+SEARCH_WORKERS = 1 if getattr(sys, "_is_gil_enabled", lambda: True)() else 3
+
+# Page type keywords, checked in order (substring match, first hit wins)
+PAGE_PATTERNS = [
+    (["dashboard", "admin", "analytics", "data", "metrics", "stats", "monitor", "overview"], "Dashboard / Data View"),
+    (["checkout", "payment", "cart", "purchase", "order", "billing"], "Checkout / Payment"),
+    (["settings", "profile", "account", "preferences", "config"], "Settings / Profile"),
+    (["landing", "marketing", "homepage", "hero", "home", "promo"], "Landing / Marketing"),
+    (["login", "signin", "signup", "register", "auth", "password"], "Authentication"),
+    (["pricing", "plans", "subscription", "tiers", "packages"], "Pricing / Plans"),
+    (["blog", "article", "post", "news", "content", "story"], "Blog / Article"),
+    (["product", "item", "detail", "pdp", "shop", "store"], "Product Detail"),
+    (["search", "results", "browse", "filter", "catalog", "list"], "Search Results"),
+    (["empty", "404", "error", "not found", "zero"], "Empty State"),
+]
+_page_matcher = None
+
+
+def _page_keywords():
+    """KeywordMatcher over every PAGE_PATTERNS keyword, built on first use"""
+    global _page_matcher
+    if _page_matcher is None:
+        _page_matcher = KeywordMatcher(kw for keywords, _ in PAGE_PATTERNS for kw in keywords)
+    return _page_matcher
+
+
+# ============ SEARCH FAN-OUT ============
+_pools = {}
+_pools_lock = _thread.allocate_lock()
+
+
+def _reset_pools():
+    """A forked child inherits the pool objects but not their threads."""
+    global _pools_lock
+    _pools.clear()
+    _pools_lock = _thread.allocate_lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools)
+
+
+def _start_searches(kb: KnowledgeBase, workers: int, searches) -> dict:
+    """
+    Start kb.search(*args) for each (key, args) on the shared search pool and
+    return {key: Future}; {} when workers <= 1, leaving every search to the caller.
+    """
+    if workers <= 1:
+        return {}
+    from concurrent.futures import ThreadPoolExecutor
+
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="design-system-search")
+            _pools[workers] = pool
+    return {key: pool.submit(kb.search, *args) for key, args in searches}
+
 
 # ============ DESIGN SYSTEM GENERATOR ============
 class DesignSystemGenerator:
     """Generates design system recommendations from aggregated searches."""
 
-    def __init__(self):
+    def __init__(self, kb: KnowledgeBase = None, workers: int = SEARCH_WORKERS):
+        self.kb = kb or get_knowledge_base()
+        self.workers = workers
         self.reasoning_data = self._load_reasoning()
 
     def _load_reasoning(self) -> list:
-        """Load reasoning rules from CSV."""
-        filepath = DATA_DIR / REASONING_FILE
-        if not filepath.exists():
-            return []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return list(csv.DictReader(f))
+        """Load reasoning rules (cached by the knowledge base)."""
+        return self.kb.reasoning()
 
-    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
-        """Execute searches across multiple domains."""
+    def _multi_domain_search(self, query: str, style_priority: list = None, product_result: dict = None,
+                             started: dict = None) -> dict:
+        """Execute searches across multiple domains (reusing product_result and the searches in started)."""
+        started = started or {}
         results = {}
         for domain, config in SEARCH_CONFIG.items():
-            if domain == "style" and style_priority:
+            if domain == "product" and product_result is not None:
+                results[domain] = product_result
+            elif domain in started:
+                results[domain] = started[domain].result()
+            elif domain == "style" and style_priority:
                 # For style, also search with priority keywords
                 priority_query = " ".join(style_priority[:2]) if style_priority else query
                 combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
+                results[domain] = self.kb.search(combined_query, domain, config["max_results"])
             else:
-                results[domain] = search(query, domain, config["max_results"])
+                results[domain] = self.kb.search(query, domain, config["max_results"])
         return results
 
     def _find_reasoning_rule(self, category: str) -> dict:
@@ -162,20 +228,26 @@ class DesignSystemGenerator:
 
     def generate(self, query: str, project_name: str = None) -> dict:
         """Generate complete design system recommendation."""
+        # Domains that do not depend on the product category start right away
+        started = _start_searches(self.kb, self.workers,
+                                  [(domain, (query, domain, config["max_results"]))
+                                   for domain, config in SEARCH_CONFIG.items() if domain not in ("product", "style")])
+
         # Step 1: First search product to get category
-        product_result = search(query, "product", 1)
+        product_result = self.kb.search(query, "product", 1)
         product_results = product_result.get("results", [])
         category = "General"
         if product_results:
             category = product_results[0].get("Product Type", "General")
 
         # Step 2: Get reasoning rules for this category
-        reasoning = self._apply_reasoning(category, {})
+        with span("reasoning"):
+            reasoning = self._apply_reasoning(category, {})
         style_priority = reasoning.get("style_priority", [])
 
         # Step 3: Multi-domain search with style priority hints
-        search_results = self._multi_domain_search(query, style_priority)
-        search_results["product"] = product_result  # Reuse product search
+        with span("design.search"):
+            search_results = self._multi_domain_search(query, style_priority, product_result, started)
 
         # Step 4: Select best matches from each domain using priority
         style_results = self._extract_results(search_results.get("style", {}))
@@ -530,7 +602,8 @@ def format_markdown(design_system: dict) -> str:
 
 # ============ MAIN ENTRY POINT ============
 def generate_design_system(query: str, project_name: str = None, output_format: str = "ascii", 
-                           persist: bool = False, page: str = None, output_dir: str = None) -> str:
+                           persist: bool = False, page: str = None, output_dir: str = None,
+                           kb: KnowledgeBase = None, workers: int = SEARCH_WORKERS) -> str:
     """
     Main entry point for design system generation.
 
@@ -541,24 +614,30 @@ def generate_design_system(query: str, project_name: str = None, output_format:
         persist: If True, save design system to design-system/ folder
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
+        kb: Optional KnowledgeBase to reuse (defaults to the shared one)
+        workers: Threads for concurrent domain searches (1 runs them serially)
 
     Returns:
         Formatted design system string
     """
-    generator = DesignSystemGenerator()
-    design_system = generator.generate(query, project_name)
+    generator = DesignSystemGenerator(kb, workers)
+    with span("generate"):
+        design_system = generator.generate(query, project_name)
     
     # Persist to files if requested
     if persist:
-        persist_design_system(design_system, page, output_dir, query)
+        persist_design_system(design_system, page, output_dir, query, kb, workers)
 
     if output_format == "markdown":
-        return format_markdown(design_system)
-    return format_ascii_box(design_system)
+        with span("format.markdown"):
+            return format_markdown(design_system)
+    with span("format.ascii"):
+        return format_ascii_box(design_system)
 
 
 # ============ PERSISTENCE FUNCTIONS ============
-def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None) -> dict:
+def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None,
+                          kb: KnowledgeBase = None, workers: int = SEARCH_WORKERS) -> dict:
     """
     Persist design system to design-system/<project>/ folder using Master + Overrides pattern.
     
@@ -567,6 +646,8 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
         page_query: Optional query string for intelligent page override generation
+        kb: Optional KnowledgeBase to reuse for page override searches
+        workers: Threads for the concurrent page override searches
     
     Returns:
         dict with created file paths and status
@@ -589,16 +670,18 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
     master_file = design_system_dir / "MASTER.md"
     
     # Generate and write MASTER.md
-    master_content = format_master_md(design_system)
-    with open(master_file, 'w', encoding='utf-8') as f:
+    with span("format.master_md"):
+        master_content = format_master_md(design_system)
+    with span("persist.write"), open(master_file, 'w', encoding='utf-8') as f:
         f.write(master_content)
     created_files.append(str(master_file))
     
     # If page is specified, create page override file with intelligent content
     if page:
         page_file = pages_dir / f"{page.lower().replace(' ', '-')}.md"
-        page_content = format_page_override_md(design_system, page, page_query)
-        with open(page_file, 'w', encoding='utf-8') as f:
+        with span("format.page_override"):
+            page_content = format_page_override_md(design_system, page, page_query, kb, workers)
+        with span("persist.write"), open(page_file, 'w', encoding='utf-8') as f:
             f.write(page_content)
         created_files.append(str(page_file))
     
@@ -883,14 +966,15 @@ def format_master_md(design_system: dict) -> str:
     return "\n".join(lines)
 
 
-def format_page_override_md(design_system: dict, page_name: str, page_query: str = None) -> str:
+def format_page_override_md(design_system: dict, page_name: str, page_query: str = None,
+                            kb: KnowledgeBase = None, workers: int = SEARCH_WORKERS) -> str:
     """Format a page-specific override file with intelligent AI-generated content."""
     project = design_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     page_title = page_name.replace("-", " ").replace("_", " ").title()
     
     # Detect page type and generate intelligent overrides
-    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system)
+    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system, kb, workers)
     
     lines = []
     
@@ -992,23 +1076,26 @@ def format_page_override_md(design_system: dict, page_name: str, page_query: str
     return "\n".join(lines)
 
 
-def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict) -> dict:
+def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict,
+                                    kb: KnowledgeBase = None, workers: int = SEARCH_WORKERS) -> dict:
     """
     Generate intelligent overrides based on page type using layered search.
     
     Uses the existing search infrastructure to find relevant style, UX, and layout
     data instead of hardcoded page types.
     """
-    from core import search
+    kb = kb or get_knowledge_base()
     
     page_lower = page_name.lower()
     query_lower = (page_query or "").lower()
     combined_context = f"{page_lower} {query_lower}"
     
-    # Search across multiple domains for page-specific guidance
-    style_search = search(combined_context, "style", max_results=1)
-    ux_search = search(combined_context, "ux", max_results=3)
-    landing_search = search(combined_context, "landing", max_results=1)
+    # Search across multiple domains for page-specific guidance (concurrently when workers > 1)
+    started = _start_searches(kb, workers, [("ux", (combined_context, "ux", 3)),
+                                            ("landing", (combined_context, "landing", 1))])
+    style_search = kb.search(combined_context, "style", max_results=1)
+    ux_search = started["ux"].result() if started else kb.search(combined_context, "ux", max_results=3)
+    landing_search = started["landing"].result() if started else kb.search(combined_context, "landing", max_results=1)
     
     # Extract results from search response
     style_results = style_search.get("results", [])
@@ -1103,22 +1190,11 @@ def _detect_page_type(context: str, style_results: list) -> str:
     context_lower = context.lower()
     
     # Check for common page type patterns
-    page_patterns = [
-        (["dashboard", "admin", "analytics", "data", "metrics", "stats", "monitor", "overview"], "Dashboard / Data View"),
-        (["checkout", "payment", "cart", "purchase", "order", "billing"], "Checkout / Payment"),
-        (["settings", "profile", "account", "preferences", "config"], "Settings / Profile"),
-        (["landing", "marketing", "homepage", "hero", "home", "promo"], "Landing / Marketing"),
-        (["login", "signin", "signup", "register", "auth", "password"], "Authentication"),
-        (["pricing", "plans", "subscription", "tiers", "packages"], "Pricing / Plans"),
-        (["blog", "article", "post", "news", "content", "story"], "Blog / Article"),
-        (["product", "item", "detail", "pdp", "shop", "store"], "Product Detail"),
-        (["search", "results", "browse", "filter", "catalog", "list"], "Search Results"),
-        (["empty", "404", "error", "not found", "zero"], "Empty State"),
-    ]
-    
-    for keywords, page_type in page_patterns:
-        if any(kw in context_lower for kw in keywords):
-            return page_type
+    found = _page_keywords().find(context_lower)
+    if found:
+        for keywords, page_type in PAGE_PATTERNS:
+            if not found.isdisjoint(keywords):
+                return page_type
     
     # Fallback: try to infer from style results
     if style_results:
@@ -1133,16 +1209,146 @@ def _detect_page_type(context: str, style_results: list) -> str:
     return "General"
 
 
+# ============ BULK GENERATION ============
+_bulk_kb = None
+
+
+def read_briefs(lines) -> list:
+    """
+    Parse bulk briefs: one per line as "query" or "query<TAB>project name".
+    Blank lines and lines starting with '#' are skipped.
+    """
+    briefs = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        query, _, project_name = line.partition("\t")
+        briefs.append((query.strip(), project_name.strip() or None))
+    return briefs
+
+
+def product_briefs(kb: KnowledgeBase = None) -> list:
+    """One brief per product type in products.csv."""
+    _, rows = (kb or get_knowledge_base()).domain_index("product")
+    return [(row["Product Type"], None) for row in rows if row.get("Product Type")]
+
+
+def _bulk_init(data_dir):
+    """Worker initializer when the pool cannot fork: load the indexes once per worker."""
+    global _bulk_kb
+    _bulk_kb = KnowledgeBase(data_dir)
+    _bulk_kb.preload(domains=list(SEARCH_CONFIG), stacks=[])
+
+
+def _bulk_generate(task) -> dict:
+    """Generate one brief inside a worker; errors are reported, not raised."""
+    index, (query, project_name) = task
+    record = {"index": index, "query": query, "project_name": project_name}
+    try:
+        # Bulk mode already runs one process per CPU
+        design_system = DesignSystemGenerator(_bulk_kb, workers=1).generate(query, project_name)
+    except Exception as e:
+        record.update(ok=False, error=f"{type(e).__name__}: {e}")
+    else:
+        record.update(ok=True, design_system=design_system)
+    return record
+
+
+def generate_bulk(briefs, workers: int = None, persist: bool = False, output_dir: str = None,
+                  kb: KnowledgeBase = None):
+    """
+    Generate design systems for many briefs across a process pool.
+
+    Indexes are loaded once in this process; on platforms with fork() workers
+    inherit them copy-on-write instead of reloading the CSVs. Records are
+    yielded in input order, so output does not depend on the worker count.
+
+    Args:
+        briefs: Iterable of (query, project_name or None)
+        workers: Worker processes (default: CPU count; 1 runs in this process)
+        persist: Also write each design system to design-system/<slug>/MASTER.md
+        output_dir: Base directory for persisted folders (default: cwd)
+        kb: Optional KnowledgeBase to generate from
+
+    Yields:
+        {"index", "query", "project_name", "ok", "design_system" | "error"}
+        plus "created_files" when persisting
+    """
+    import multiprocessing
+
+    global _bulk_kb
+    briefs = list(briefs)
+    workers = workers or os.cpu_count() or 1
+    kb = kb or get_knowledge_base()
+    kb.preload(domains=list(SEARCH_CONFIG), stacks=[])
+    _bulk_kb = kb
+
+    tasks = list(enumerate(briefs))
+    pool = None
+    frozen = False
+    try:
+        if workers <= 1 or len(tasks) <= 1:
+            records = map(_bulk_generate, tasks)
+        else:
+            if "fork" in multiprocessing.get_all_start_methods():
+                # Keep the preloaded indexes out of the collector so pages stay shared
+                gc.freeze()
+                frozen = True
+                pool = multiprocessing.get_context("fork").Pool(min(workers, len(tasks)))
+            else:
+                pool = multiprocessing.Pool(min(workers, len(tasks)), initializer=_bulk_init, initargs=(kb.data_dir,))
+            chunksize = max(1, len(tasks) // (workers * 8))
+            records = pool.imap(_bulk_generate, tasks, chunksize)
+
+        for record in records:
+            # Persist here, in input order, so duplicate slugs resolve as a serial run would
+            if persist and record["ok"]:
+                record["created_files"] = persist_design_system(record["design_system"], None, output_dir,
+                                                                record["query"], kb, workers=1)["created_files"]
+            yield record
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if frozen:
+            gc.unfreeze()
+
+
 # ============ CLI SUPPORT ============
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Generate Design System")
-    parser.add_argument("query", help="Search query (e.g., 'SaaS dashboard')")
+    parser.add_argument("query", nargs="?", help="Search query (e.g., 'SaaS dashboard')")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name")
     parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help=f"Concurrent domain searches (default: {SEARCH_WORKERS}); with --bulk, worker processes (default: CPU count)")
+    # Bulk mode
+    parser.add_argument("--bulk", type=str, default=None, metavar="FILE",
+                        help="Generate one design system per brief in FILE ('-' for stdin; 'query' or 'query<TAB>project name' per line), streaming JSON Lines")
+    parser.add_argument("--all-products", action="store_true", help="Bulk-generate one design system per product type in products.csv")
+    parser.add_argument("--persist", action="store_true", help="With --bulk/--all-products, also write design-system/<slug>/MASTER.md for each brief")
+    parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory for persisted files (default: current directory)")
 
     args = parser.parse_args()
 
-    result = generate_design_system(args.query, args.project_name, args.format)
+    if args.bulk is not None or args.all_products:
+        briefs = product_briefs() if args.all_products else []
+        if args.bulk == "-":
+            briefs += read_briefs(sys.stdin)
+        elif args.bulk is not None:
+            with open(args.bulk, 'r', encoding='utf-8') as f:
+                briefs += read_briefs(f)
+        failures = 0
+        for record in generate_bulk(briefs, args.workers, args.persist, args.output_dir):
+            failures += not record["ok"]
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+        sys.exit(1 if failures else 0)
+
+    if args.query is None:
+        parser.error("the following arguments are required: query (or --bulk FILE / --all-products)")
+    workers = args.workers if args.workers is not None else SEARCH_WORKERS
+    result = generate_design_system(args.query, args.project_name, args.format, workers=workers)
     print(result)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Command line behind search.py (see its docstring for usage). It lives in a
+module because a script run directly is compiled from source on every call,
+while an imported module's bytecode is cached in __pycache__.
+"""
+
+# Imports are kept to what every path needs; the server client, batch
+# executor and design system generator load only on the paths that use them.
+import argparse
+import os
+import sys
+import time
+from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS
+
+
+def utf8_stdio():
+    """Force UTF-8 for stdout/stderr to handle emojis on Windows (cp1252 default)"""
+    import io
+    if sys.stdout.encoding and sys.stdout.encoding.lower() != 'utf-8':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    if sys.stderr.encoding and sys.stderr.encoding.lower() != 'utf-8':
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+
+# Facet values listed per column in text output (JSON output has them all)
+FACET_VALUES_SHOWN = 8
+
+
+def run_op(op, address=None, use_server=True):
+    """Run one batch.py operation on a listening server, else in this process"""
+    from server import run
+    return run(op, address, use_server)
+
+
+def format_output(result):
+    """Format results for Claude consumption (token-optimized)"""
+    if "error" in result:
+        return f"Error: {result['error']}"
+
+    output = []
+    if result.get("stack"):
+        output.append(f"## UI Pro Max Stack Guidelines")
+        output.append(f"**Stack:** {result['stack']} | **Query:** {result['query']}")
+    else:
+        output.append(f"## UI Pro Max Search Results")
+        output.append(f"**Domain:** {result['domain']} | **Query:** {result['query']}")
+    if result.get("domain") == "all":
+        hits = ", ".join(f"{name} {count}" for name, count in result["hits"].items()) or "none"
+        output.append(f"**Hits per source:** {hits} | **Found:** {result['count']} results\n")
+    else:
+        output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
+    if "facets" in result:
+        if result.get("filters"):
+            output.append(f"**Filters:** {', '.join(result['filters'])}")
+        if result.get("sort_by"):
+            output.append(f"**Sorted by:** {result['sort_by']}")
+        for column, counts in result["facets"].items():
+            values = ", ".join(f"{value} ({count})" for value, count in list(counts.items())[:FACET_VALUES_SHOWN])
+            more = len(counts) - FACET_VALUES_SHOWN
+            output.append(f"- **{column}:** {values or 'none'}" + (f", +{more} more" if more > 0 else ""))
+        output.append("")
+
+    for i, row in enumerate(result['results'], result.get("offset", 0) + 1):
+        output.append(f"### Result {i}")
+        for key, value in row.items():
+            value_str = str(value)
+            if len(value_str) > 300:
+                value_str = value_str[:300] + "..."
+            output.append(f"- **{key}:** {value_str}")
+        output.append("")
+
+    if result.get("cursor"):
+        output.append(f"**Next page:** --cursor {result['cursor']}")
+
+    return "\n".join(output)
+
+
+def format_profile(profile):
+    """Per-stage timing table for --profile (stage times include nested stages)"""
+    output = ["", "## Profile", f"{'Stage':<24}{'Calls':>7}{'ms':>12}"]
+    for stage, timing in profile["stages"].items():
+        output.append(f"{stage:<24}{timing['calls']:>7}{timing['ms']:>12.3f}")
+    output.append(f"{'Total':<24}{'':>7}{profile['total_ms']:>12.3f}")
+    return "\n".join(output)
+
+
+def main():
+    """Parse the command line and run it"""
+    utf8_stdio()
+    parser = argparse.ArgumentParser(description="UI Pro Max Search")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()) + ["all"], help="Search domain ('all' searches every domain and stack at once)")
+    parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help=f"Stack-specific search. Available: {', '.join(AVAILABLE_STACKS)}")
+    parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
+    parser.add_argument("--filter", "-F", action="append", default=None, metavar="COLUMN=VALUE",
+                        help="Facet filter, Column=Value, Column~words or a numeric range like Column<200 (repeatable)")
+    parser.add_argument("--sort", type=str, default=None, metavar="COLUMN",
+                        help="Order domain results by a numeric or date column ('-Column' for descending)")
+    parser.add_argument("--cursor", type=str, default=None, help="Fetch the next page of an earlier search from its cursor")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="When no query word is indexed, match the nearest spellings of words of 5+ letters")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    # Design system generation
+    parser.add_argument("--design-system", "-ds", action="store_true", help="Generate complete design system recommendation")
+    parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name for design system output")
+    parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format for design system")
+    # Persistence (Master + Overrides pattern)
+    parser.add_argument("--persist", action="store_true", help="Save design system to design-system/MASTER.md (creates hierarchical structure)")
+    parser.add_argument("--page", type=str, default=None, help="Create page-specific override file in design-system/pages/")
+    parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory for persisted files (default: current directory)")
+    # Batch mode
+    parser.add_argument("--batch", type=str, default=None, metavar="FILE", help="Run JSON Lines operations from FILE ('-' for stdin), streaming JSON Lines results")
+    # Resident server
+    parser.add_argument("--serve", action="store_true", help="Run a resident search server with all indexes loaded")
+    parser.add_argument("--socket", type=str, default=None, help="Server socket path or host:port (default: $UI_PRO_MAX_SOCKET or a per-user temp socket)")
+    parser.add_argument("--no-server", action="store_true", help="Do not forward requests to a running search server")
+    # Diagnostics
+    parser.add_argument("--memory", action="store_true", help="Load every index and report row storage bytes per domain")
+    parser.add_argument("--compile", action="store_true", help="Compile every domain and stack CSV into the memory-mapped index.bin")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage timing breakdown (included in --json output); runs in-process")
+
+    args = parser.parse_args()
+    if args.socket:
+        from server import parse_address
+        try:
+            address = parse_address(args.socket)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        address = None
+
+    if args.batch is None and args.query is None and not (args.serve or args.memory or args.compile or args.cursor):
+        parser.error("the following arguments are required: query")
+    if args.sort and (args.stack or args.domain in (None, "all")):
+        parser.error("--sort needs a --domain with numeric columns")
+
+    # Spans are only recorded in this process, so profiling bypasses the server
+    use_server = not (args.no_server or args.profile)
+    if args.batch is None and not args.serve:
+        # One request per process can never hit the result cache, so skip sizing and copying responses into it
+        from core import configure_result_cache
+        configure_result_cache(max_entries=0)
+    if args.cursor and not args.serve:
+        # This process exits after one page, so keep the ranked list it builds for the next --cursor call
+        from core import CURSOR_CACHE_DIR, get_knowledge_base
+        get_knowledge_base().ranked_lists.directory = CURSOR_CACHE_DIR
+    profiler = None
+    if args.profile:
+        from core import Profile, add_profile_hook
+        profiler = Profile()
+        add_profile_hook(profiler.add)
+        started = time.perf_counter()
+
+    def profile_summary():
+        return {"total_ms": round((time.perf_counter() - started) * 1000, 3), "stages": profiler.report()}
+
+    if args.compile:
+        from core import CompileError, compile_index
+        try:
+            summary = compile_index()
+        except CompileError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Compiled {len(summary['sources'])} sources ({sum(summary['sources'].values())} rows, "
+              f"{summary['bytes']:,} bytes) into {summary['file']}")
+    elif args.memory:
+        from core import memory_report, preload
+        preload()
+        report = memory_report()
+        if args.json:
+            import json
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"{'Domain':<24}{'Rows':>7}{'Row store':>12}{'Dict rows':>12}")
+            for name, usage in report.items():
+                print(f"{name:<24}{usage['rows']:>7}{usage['row_bytes']:>12,}{usage['dict_rows_bytes']:>12,}")
+            print(f"{'Total':<24}{sum(u['rows'] for u in report.values()):>7}"
+                  f"{sum(u['row_bytes'] for u in report.values()):>12,}"
+                  f"{sum(u['dict_rows_bytes'] for u in report.values()):>12,}")
+    elif args.serve:
+        from server import serve
+        serve(address, ready=lambda bound: print(f"UI Pro Max search server listening on {bound}", file=sys.stderr, flush=True))
+    # Batch mode runs every operation in this process
+    elif args.batch is not None:
+        from batch import run_batch
+        if args.batch == "-":
+            failures = run_batch(sys.stdin)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                failures = run_batch(f)
+        sys.exit(1 if failures else 0)
+    # Design system takes priority
+    elif args.design_system:
+        response = run_op({
+            "op": "generate_design_system",
+            "query": args.query,
+            "project_name": args.project_name,
+            "format": args.format,
+            "persist": args.persist,
+            "page": args.page,
+            # A server resolves relative paths against its own cwd
+            "output_dir": os.path.abspath(args.output_dir or os.getcwd())
+        }, address, use_server)
+        if not response["ok"]:
+            print(f"Error: {response['error']}")
+            sys.exit(1)
+        print(response["result"])
+        if profiler:
+            print(format_profile(profile_summary()))
+        
+        # Print persistence confirmation
+        if args.persist:
+            project_slug = args.project_name.lower().replace(' ', '-') if args.project_name else "default"
+            print("\n" + "=" * 60)
+            print(f"✅ Design system persisted to design-system/{project_slug}/")
+            print(f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)")
+            if args.page:
+                page_filename = args.page.lower().replace(' ', '-')
+                print(f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)")
+            print("")
+            print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.")
+            print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.")
+            print("=" * 60)
+    # Next page of an earlier search
+    elif args.cursor:
+        response = run_op({"op": "search_page", "cursor": args.cursor}, address, use_server)
+        result = response.get("result", {"error": response.get("error")})
+        if args.json:
+            import json
+            if profiler:
+                result = {**result, "profile": profile_summary()}
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        else:
+            print(format_output(result))
+            if profiler:
+                print(format_profile(profile_summary()))
+    # Stack search
+    elif args.stack:
+        response = run_op({"op": "search_stack", "query": args.query, "stack": args.stack, "max_results": args.max_results,
+                           "filters": args.filter, "fuzzy": args.fuzzy}, address, use_server)
+        result = response.get("result", {"error": response.get("error")})
+        if args.json:
+            import json
+            if profiler:
+                result = {**result, "profile": profile_summary()}
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        else:
+            print(format_output(result))
+            if profiler:
+                print(format_profile(profile_summary()))
+    # Domain search
+    else:
+        response = run_op({"op": "search", "query": args.query, "domain": args.domain, "max_results": args.max_results,
+                           "filters": args.filter, "sort_by": args.sort, "fuzzy": args.fuzzy}, address, use_server)
+        result = response.get("result", {"error": response.get("error")})
+        if args.json:
+            import json
+            if profiler:
+                result = {**result, "profile": profile_summary()}
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        else:
+            print(format_output(result))
+            if profiler:
+                print(format_profile(profile_summary()))
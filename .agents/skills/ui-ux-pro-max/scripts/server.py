@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Search Server - keeps every domain and stack index loaded in one resident
+process and answers requests over a local socket.
+
+Protocol: newline-delimited JSON over a Unix domain socket (or loopback TCP
+where Unix sockets are unavailable). Each request line is a batch.py
+operation; each response line is the matching batch.py envelope:
+    -> {"op": "search", "query": "glassmorphism", "domain": "style"}
+    <- {"op": "search", "ok": true, "result": {...}}
+A connection may carry any number of requests. Two extra ops exist:
+"ping" (health check) and "shutdown" (stop the server).
+
+The server has no authentication, so it only listens on a private Unix
+socket or a loopback TCP port, and writes files (persist) only for clients
+on the Unix socket, which is owned by and private to the user who started it.
+
+Usage:
+    python search.py --serve [--socket PATH]
+    python search.py "glassmorphism" --domain style   # uses the server when one is listening
+"""
+
+# socket, socketserver and tempfile cost more to import than a cold search,
+# so they load only where a server is started or contacted; the check for a
+# listening server (server_may_be_listening) needs none of them.
+import _socket
+import ipaddress
+import json
+import os
+import sys
+
+from batch import execute
+
+
+# ============ CONFIGURATION ============
+MAX_REQUEST_BYTES = 64 * 1024
+CLIENT_TIMEOUT = 30.0
+TCP_HOST = "127.0.0.1"
+TCP_PORT = 47153
+
+UNIX_SOCKETS = hasattr(_socket, "AF_UNIX")  # what socketserver's Unix stream servers need
+
+
+class ServerUnavailable(ConnectionError):
+    """No trusted server accepted the connection, so the request was never sent"""
+
+
+def default_address():
+    """Server address: $UI_PRO_MAX_SOCKET, else a per-user socket in $XDG_RUNTIME_DIR or the temp dir."""
+    configured = os.environ.get("UI_PRO_MAX_SOCKET")
+    if configured:
+        return parse_address(configured)
+    if UNIX_SOCKETS:
+        directory = os.environ.get("XDG_RUNTIME_DIR")
+        if not directory:
+            import tempfile
+            directory = tempfile.gettempdir()
+        return os.path.join(directory, _socket_name())
+    return (TCP_HOST, TCP_PORT)
+
+
+def _socket_name() -> str:
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return f"ui-pro-max-{uid}.sock"
+
+
+def _socket_dirs() -> list:
+    """Where default_address() may put the socket: $XDG_RUNTIME_DIR, else tempfile.gettempdir()'s candidates."""
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return [os.environ["XDG_RUNTIME_DIR"]]
+    return [os.environ[env] for env in ("TMPDIR", "TEMP", "TMP") if os.environ.get(env)] \
+        + ["/tmp", "/var/tmp", "/usr/tmp", os.getcwd()]
+
+
+def parse_address(value: str):
+    """
+    'host:port' selects TCP, anything else is a Unix socket path.
+
+    Raises ValueError for a host that is not a loopback address.
+    """
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit() and os.sep not in host:
+        host = host or TCP_HOST
+        _require_loopback(host)
+        return (host, int(port))
+    return value
+
+
+def _require_loopback(host: str):
+    """Raise ValueError unless host only reaches this machine."""
+    try:
+        loopback = host == "localhost" or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"Search server host must be a loopback address, not {host!r}")
+
+
+def _owned_by_user(path: str) -> bool:
+    """True when path belongs to the current user (always true where uids do not exist)."""
+    if not hasattr(os, "getuid"):
+        return True
+    return os.stat(path).st_uid == os.getuid()
+
+
+def _writes_files(op) -> bool:
+    """True for operations that write into output_dir."""
+    if not isinstance(op, dict):
+        return False
+    return op.get("op") == "persist" or (op.get("op") == "generate_design_system" and bool(op.get("persist")))
+
+
+# ============ SERVER ============
+def _claim_socket_path(path: str):
+    """Remove a stale socket file, refusing to replace a live server."""
+    if not os.path.exists(path):
+        return
+    if not _owned_by_user(path):
+        raise RuntimeError(f"{path} belongs to another user; pass a different --socket")
+    try:
+        request({"op": "ping"}, path, timeout=1.0)
+    except ServerUnavailable:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"A search server is already listening on {path}")
+
+
+def serve(address=None, preload: bool = True, ready=None):
+    """
+    Run the search server until it receives SIGINT/SIGTERM or a shutdown op.
+
+    Args:
+        address: Unix socket path or (host, port); defaults to default_address()
+        preload: Load every domain and stack index before accepting clients
+        ready: Optional callback invoked with the bound address once listening
+    """
+    import signal
+    import threading
+    from core import preload as preload_indexes
+    import server_handler
+
+    address = address or default_address()
+    if preload:
+        preload_indexes()
+
+    if isinstance(address, str):
+        _claim_socket_path(address)
+        old_umask = os.umask(0o177)  # socket is private to this user
+        try:
+            server = server_handler.UnixServer(address, server_handler.RequestHandler)
+        finally:
+            os.umask(old_umask)
+    else:
+        _require_loopback(address[0])
+        server = server_handler.TCPServer(address, server_handler.RequestHandler)
+
+    def _on_signal(signum, frame):
+        server.request_shutdown()
+
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous[sig] = signal.signal(sig, _on_signal)
+
+    try:
+        if ready:
+            ready(server.server_address)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        if isinstance(address, str):
+            try:
+                os.unlink(address)
+            except OSError:
+                pass
+
+
+# ============ CLIENT ============
+def request(op: dict, address=None, timeout: float = CLIENT_TIMEOUT) -> dict:
+    """
+    Send one operation to a running server and return its response envelope.
+
+    Raises ServerUnavailable when no server (or a socket owned by another
+    user) is at address, before anything is sent, so callers can fall back to
+    running in-process. Any later OSError (e.g. a read timeout) or ValueError
+    means the server may already have run the operation.
+    """
+    import socket
+
+    address = address or default_address()
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            if isinstance(address, str) and not _owned_by_user(address):
+                raise ServerUnavailable(f"{address} belongs to another user")
+            sock.connect(address)
+        except ServerUnavailable:
+            raise
+        except OSError as e:
+            raise ServerUnavailable(f"No search server at {address}: {e}") from e
+        sock.sendall((json.dumps(op, ensure_ascii=False) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("Search server closed the connection")
+    return json.loads(line.decode("utf-8"))
+
+
+def server_may_be_listening(address=None) -> bool:
+    """
+    Cheap check whether run() could reach a server: always for an explicit
+    address or $UI_PRO_MAX_SOCKET, else only when the default socket file
+    exists in one of the directories default_address() picks from.
+    """
+    if address is not None or os.environ.get("UI_PRO_MAX_SOCKET"):
+        return True
+    return UNIX_SOCKETS and any(os.path.exists(os.path.join(d, _socket_name())) for d in _socket_dirs())
+
+
+def run(op: dict, address=None, use_server: bool = True) -> dict:
+    """
+    Run an operation on the server when one is listening, else in this process.
+
+    An explicit address is always tried; the default one only when its socket
+    file exists (or $UI_PRO_MAX_SOCKET names a TCP server). Operations that
+    write files never go to a TCP server. Only a failed connect falls back to
+    this process: once the request is sent, a failure is reported instead of
+    running the operation a second time.
+    """
+    if use_server and server_may_be_listening(address):
+        target = address or default_address()
+        if isinstance(target, str) or not _writes_files(op):
+            try:
+                return request(op, target)
+            except ServerUnavailable:
+                pass
+            except (OSError, ValueError) as e:
+                response = {"op": op.get("op"), "ok": False, "error": f"Search server failed: {e}"}
+                return {"id": op["id"], **response} if "id" in op else response
+    return execute(op)
+
+
+if __name__ == "__main__":
+    def _announce(bound):
+        print(f"UI Pro Max search server listening on {bound}", file=sys.stderr, flush=True)
+
+    serve(parse_address(sys.argv[1]) if len(sys.argv) > 1 else None, ready=_announce)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Socket server side of server.py: the request handler and the Unix and TCP
+servers serve() runs. It lives in a module of its own so that clients, which
+only import server.py, never pay for socketserver.
+"""
+
+import json
+import socket
+import socketserver
+import threading
+
+from batch import execute
+from server import CLIENT_TIMEOUT, MAX_REQUEST_BYTES, UNIX_SOCKETS, _writes_files
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Answers newline-delimited JSON requests until the client disconnects."""
+
+    timeout = CLIENT_TIMEOUT
+
+    def handle(self):
+        while True:
+            try:
+                line = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+            except (OSError, socket.timeout):
+                return
+            if not line:
+                return
+            if len(line) > MAX_REQUEST_BYTES and not line.endswith(b"\n"):
+                self._reply({"ok": False, "error": f"Request exceeds {MAX_REQUEST_BYTES} bytes"})
+                return
+            if not line.strip():
+                continue
+
+            try:
+                op = json.loads(line.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                response = {"ok": False, "error": f"Invalid JSON: {e}"}
+            else:
+                response = self._dispatch(op)
+
+            if not self._reply(response):
+                return
+
+    def _dispatch(self, op) -> dict:
+        name = op.get("op") if isinstance(op, dict) else None
+        if name == "ping":
+            response = {"op": "ping", "ok": True, "result": "pong"}
+        elif name == "shutdown":
+            response = {"op": "shutdown", "ok": True, "result": "shutting down"}
+            self.server.request_shutdown()
+        elif isinstance(self.server, TCPServer) and _writes_files(op):
+            # Any local user can reach a TCP port, so never write files for one
+            response = {"op": name, "ok": False, "error": "persist is only served over a Unix socket; run it in-process"}
+        else:
+            try:
+                response = execute(op)
+            except Exception as e:  # one bad request must not drop the connection
+                response = {"op": name, "ok": False, "error": f"Internal error: {type(e).__name__}: {e}"}
+        if isinstance(op, dict) and "id" in op:
+            response = {"id": op["id"], **response}
+        return response
+
+    def _reply(self, response: dict) -> bool:
+        try:
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            return True
+        except OSError:
+            return False
+
+
+class _ServerMixin:
+    """Shared shutdown handling for the Unix and TCP servers."""
+
+    daemon_threads = False
+    block_on_close = True  # let in-flight requests finish on shutdown
+    request_queue_size = 128  # many agents connect at once
+
+    def request_shutdown(self):
+        # shutdown() blocks until serve_forever() returns, so never call it on the serving thread
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+if UNIX_SOCKETS:
+    class UnixServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+        pass
+
+
+class TCPServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
@@ -0,0 +1,96 @@
+"""Asyncio API (aio.py): coalescing of identical reads, cancellation and writes."""
+
+import asyncio
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import aio
+
+
+class _BlockingKB:
+    """Stands in for a KnowledgeBase whose searches wait until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def search(self, query, *args):
+        self.calls.append(query)
+        self.release.wait(10)
+        return {"query": query, "results": [{"n": len(self.calls)}]}
+
+
+class AioTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        aio.set_executor(executor)
+        self.addCleanup(aio.set_executor, None)
+        self.kb = _BlockingKB()
+
+    async def _settle(self):
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    async def test_identical_reads_share_one_computation(self):
+        first = asyncio.ensure_future(aio.asearch("minimal", "style", kb=self.kb))
+        second = asyncio.ensure_future(aio.asearch("minimal", "style", kb=self.kb))
+        other = asyncio.ensure_future(aio.asearch("minimal", "color", kb=self.kb))
+        await self._settle()
+        self.kb.release.set()
+        a, b, _ = await asyncio.gather(first, second, other)
+        self.assertEqual(self.kb.calls, ["minimal", "minimal"])  # style once, color once
+        self.assertEqual(a, b)
+        a["results"].clear()
+        self.assertTrue(b["results"])  # every caller gets its own copy
+
+    async def test_cancelling_one_caller_keeps_the_shared_computation(self):
+        first = asyncio.ensure_future(aio.asearch("minimal", "style", kb=self.kb))
+        second = asyncio.ensure_future(aio.asearch("minimal", "style", kb=self.kb))
+        await self._settle()
+        first.cancel()
+        await self._settle()
+        self.kb.release.set()
+        self.assertEqual((await second)["query"], "minimal")
+        self.assertTrue(first.cancelled())
+        self.assertEqual(self.kb.calls, ["minimal"])
+
+    async def test_work_is_dropped_when_every_caller_cancels_before_it_starts(self):
+        busy = asyncio.ensure_future(aio.asearch("busy", "style", kb=self.kb))  # holds the only worker
+        waiting = [asyncio.ensure_future(aio.asearch("minimal", "style", kb=self.kb)) for _ in range(2)]
+        await self._settle()
+        for task in waiting:
+            task.cancel()
+        await self._settle()
+        self.kb.release.set()
+        await busy
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.kb.calls, ["busy"])
+
+    async def test_writes_are_never_shared(self):
+        calls = []
+
+        def persist(design_system, *args):
+            calls.append(design_system["project_name"])
+            self.kb.release.wait(10)
+            return {"status": "success", "created_files": [str(len(calls))]}
+
+        design = {"project_name": "Acme"}
+        with mock.patch("design_system.persist_design_system", persist):
+            tasks = [asyncio.ensure_future(aio.apersist_design_system(design, None, "out", kb=self.kb))
+                     for _ in range(2)]
+            await self._settle()
+            self.kb.release.set()
+            results = await asyncio.gather(*tasks)
+        self.assertEqual(calls, ["Acme", "Acme"])
+        self.assertEqual([r["created_files"] for r in results], [["1"], ["2"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Operation validation in batch.py and the search server, and the cheap listening-server check."""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+import server
+from batch import execute, run_batch
+
+
+def setUpModule():
+    # Keep the index cache files these tests build out of the skill directory
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(setattr, core, "INDEX_CACHE_DIR", core.INDEX_CACHE_DIR)
+    core.INDEX_CACHE_DIR = Path(tmp.name)
+
+
+class BatchValidationTest(unittest.TestCase):
+    def _error(self, op):
+        response = execute(op)
+        self.assertFalse(response["ok"], response)
+        return response["error"]
+
+    def test_max_results_below_one_returns_no_results(self):
+        for n in (0, -1):
+            response = execute({"op": "search", "query": "minimal", "domain": "style", "max_results": n})
+            self.assertTrue(response["ok"], response)
+            self.assertEqual(response["result"]["count"], 0)
+            self.assertNotIn("cursor", response["result"])
+
+    def test_max_results_must_be_an_integer(self):
+        for value in ("3", 2.5, True, None):
+            self.assertIn("'max_results' must be an integer",
+                          self._error({"op": "search", "query": "minimal", "domain": "style", "max_results": value}))
+
+    def test_malformed_operations_are_rejected(self):
+        self.assertIn("Unknown op", self._error({"op": "explode"}))
+        self.assertIn("Unknown domain", self._error({"op": "search", "query": "minimal", "domain": "nope"}))
+        self.assertIn("'query' must be a string", self._error({"op": "search", "query": 3}))
+        self.assertIn("'fuzzy' must be true or false", self._error({"op": "search", "query": "x", "fuzzy": "yes"}))
+        self.assertIn("'filters'", self._error({"op": "search", "query": "x", "domain": "style", "filters": "Type"}))
+        self.assertIn("JSON object", self._error(["search"]))
+
+    def test_persist_must_be_a_boolean(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for value in ("no", 0, 1, None):
+                self.assertIn("'persist' must be true or false",
+                              self._error({"op": "generate_design_system", "query": "fintech", "persist": value,
+                                           "output_dir": tmp}))
+            self.assertEqual(os.listdir(tmp), [])
+            response = execute({"op": "generate_design_system", "query": "fintech", "persist": False, "output_dir": tmp})
+            self.assertTrue(response["ok"], response)
+            self.assertEqual(os.listdir(tmp), [])
+
+    def test_run_batch_echoes_ids_and_counts_failures(self):
+        out = io.StringIO()
+        failures = run_batch(['{"id": 1, "op": "search", "query": "minimal", "domain": "style", "max_results": 0}',
+                              "", "{not json", '{"id": 2, "op": "search", "query": "minimal", "max_results": "3"}'], out)
+        responses = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(failures, 2)
+        self.assertEqual([r.get("id") for r in responses], [1, None, 2])
+        self.assertEqual([r["ok"] for r in responses], [True, False, False])
+        self.assertEqual(responses[1]["line"], 3)
+
+
+@unittest.skipUnless(server.UNIX_SOCKETS, "needs Unix domain sockets")
+class ServerValidationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.address = os.path.join(cls.tmp.name, "s.sock")
+        listening = threading.Event()
+        cls.thread = threading.Thread(target=server.serve, args=(cls.address, False, lambda bound: listening.set()))
+        cls.thread.start()
+        if not listening.wait(10):
+            raise RuntimeError("search server did not start")
+
+    @classmethod
+    def tearDownClass(cls):
+        server.request({"op": "shutdown"}, cls.address)
+        cls.thread.join(10)
+        cls.tmp.cleanup()
+
+    def test_server_validates_like_batch(self):
+        for op in ({"id": 7, "op": "search", "query": "minimal", "domain": "style", "max_results": 0},
+                   {"id": 8, "op": "search", "query": "minimal", "domain": "style", "max_results": "3"},
+                   {"op": "explode"}):
+            self.assertEqual(server.request(op, self.address), execute(op))
+
+    def test_ping(self):
+        self.assertEqual(server.request({"op": "ping", "id": "a"}, self.address),
+                         {"id": "a", "op": "ping", "ok": True, "result": "pong"})
+
+    def test_run_falls_back_to_this_process_without_a_server(self):
+        op = {"op": "search", "query": "minimal", "domain": "style", "max_results": -1}
+        missing = os.path.join(self.tmp.name, "missing.sock")
+        self.assertEqual(server.run(op, missing), execute(op))
+        self.assertEqual(server.run(op, self.address), execute(op))
+
+
+class ServerMayBeListeningTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.runtime_dir = tmp.name
+
+    def _env(self, **values):
+        env = {k: v for k, v in os.environ.items() if k != "UI_PRO_MAX_SOCKET"}
+        return mock.patch.dict(os.environ, {**env, "XDG_RUNTIME_DIR": self.runtime_dir, **values}, clear=True)
+
+    def test_explicit_address_or_configured_socket(self):
+        with self._env():
+            self.assertTrue(server.server_may_be_listening("/nowhere.sock"))
+        with self._env(UI_PRO_MAX_SOCKET="127.0.0.1:1"):
+            self.assertTrue(server.server_may_be_listening())
+
+    @unittest.skipUnless(server.UNIX_SOCKETS, "needs Unix domain sockets")
+    def test_matches_the_default_socket_path(self):
+        with self._env():
+            self.assertFalse(server.server_may_be_listening())
+            open(server.default_address(), "w").close()
+            self.assertTrue(server.server_may_be_listening())
+
+
+if __name__ == "__main__":
+    unittest.main()
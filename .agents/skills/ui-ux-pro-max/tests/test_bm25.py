@@ -0,0 +1,87 @@
+"""BM25 scoring: incremental updates rank like fit(), and the NumPy engine like the pure-Python one."""
+
+import csv
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+from core import BM25
+
+QUERIES = ["minimal clean", "dark mode oled", "glassmorphism", "saas dashboard analytics", "bold bold typography",
+           "accessible contrast", "zzzunknown", "", '"dark mode" contrast']
+
+
+def _documents(domain):
+    config = core.CSV_CONFIG[domain]
+    with open(core.DATA_DIR / config["file"], encoding="utf-8") as f:
+        return [" ".join(row.get(col, "") for col in config["search_cols"]) for row in csv.DictReader(f)]
+
+
+def _ranking(bm25, query, ids=None):
+    """score() as (doc id, rounded score) pairs, doc ids mapped through ids"""
+    return [(idx if ids is None else ids[idx], round(score, 9)) for idx, score in bm25.score(query)]
+
+
+class IncrementalUpdateTest(unittest.TestCase):
+    def test_updates_rank_like_fit(self):
+        rng = random.Random(12)
+        pool = _documents("style") + _documents("product")
+        vocabulary = [word for doc in pool for word in doc.split()]
+        queries = QUERIES + [" ".join(rng.choices(vocabulary, k=3)) for _ in range(20)]
+        for positions in (False, True):
+            docs = {idx: doc for idx, doc in enumerate(pool[:40])}
+            bm25 = BM25(positions=positions)
+            bm25.fit(list(docs.values()))
+            for step in range(60):
+                action = rng.choice(("add", "remove", "update"))
+                if action == "add":
+                    added = rng.sample(pool, rng.randint(1, 3))
+                    docs.update(zip(bm25.add_documents(added), added))
+                elif action == "remove" and len(docs) > 5:
+                    idx = rng.choice(sorted(docs))
+                    bm25.remove_document(idx)
+                    del docs[idx]
+                else:
+                    idx = rng.choice(sorted(docs))
+                    docs[idx] = rng.choice(pool)
+                    bm25.update_document(idx, docs[idx])
+
+                # fit() over the live documents numbers them densely; map back to the updated index's ids
+                ids = sorted(docs)
+                fitted = BM25(positions=positions)
+                fitted.fit([docs[idx] for idx in ids])
+                self.assertEqual(set(bm25.removed), set(range(len(bm25.doc_lengths))) - set(ids))
+                for query in queries:
+                    expected = _ranking(fitted, query, ids)
+                    self.assertEqual(_ranking(bm25, query), expected, f"step {step} {action}: {query!r}")
+                    self.assertEqual([(idx, round(score, 9)) for idx, score in bm25.top_k(query, 5)], expected[:5])
+
+    def test_removed_documents_are_tombstones(self):
+        bm25 = BM25()
+        bm25.fit(["minimal clean", "dark neon", "minimal dark"])
+        bm25.remove_document(0)
+        self.assertEqual([idx for idx, _ in bm25.score("minimal")], [2])
+        self.assertEqual(bm25.add_documents(["minimal"]), [3])
+        with self.assertRaises(IndexError):
+            bm25.update_document(0, "minimal")
+
+
+@unittest.skipIf(core._numpy() is None, "numpy is not installed")
+class NumpyBM25Test(unittest.TestCase):
+    def test_ranks_like_python_top_k(self):
+        for domain in ("style", "product", "color"):
+            bm25 = BM25()
+            bm25.fit(_documents(domain))
+            engine = core.NumpyBM25(bm25)
+            for k in (1, 3, 10):
+                expected = [bm25.top_k(query, k) for query in QUERIES]
+                self.assertEqual(engine.top_k_batch(QUERIES, k), expected, f"{domain} k={k}")
+                self.assertEqual([engine.top_k(query, k) for query in QUERIES], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
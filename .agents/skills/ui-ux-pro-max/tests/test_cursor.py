@@ -0,0 +1,102 @@
+"""Cursor pagination over ranked result lists (core.KnowledgeBase.search_page)."""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+from core import KnowledgeBase, ResultCache
+
+
+def setUpModule():
+    # Keep the index cache files these tests build out of the skill directory
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(setattr, core, "INDEX_CACHE_DIR", core.INDEX_CACHE_DIR)
+    core.INDEX_CACHE_DIR = Path(tmp.name)
+
+
+class CursorPagingTest(unittest.TestCase):
+    def setUp(self):
+        self.kb = KnowledgeBase(result_cache=ResultCache(max_entries=0))
+
+    def _pages(self, response):
+        pages = [response]
+        while "cursor" in pages[-1]:
+            pages.append(self.kb.search_page(pages[-1]["cursor"]))
+        return pages
+
+    def test_pages_continue_the_full_ranking(self):
+        full = self.kb.search("minimal clean", "style", max_results=1000)["results"]
+        pages = self._pages(self.kb.search("minimal clean", "style", max_results=4))
+        self.assertEqual([row for page in pages for row in page["results"]], full)
+        self.assertEqual([page.get("offset", 0) for page in pages], list(range(0, 4 * len(pages), 4)))
+
+    def test_issuing_a_cursor_does_not_rank_the_full_list(self):
+        response = self.kb.search("minimal clean", "style", max_results=2)
+        self.assertIn("cursor", response)
+        self.assertEqual(len(self.kb.ranked_lists), 0)
+        self.kb.search_page(response["cursor"])
+        self.assertEqual(len(self.kb.ranked_lists), 1)
+
+    def test_partial_page_has_no_cursor(self):
+        response = self.kb.search("glassmorphism", "style", max_results=1000)
+        self.assertLess(response["count"], 1000)
+        self.assertNotIn("cursor", response)
+
+    def test_filtered_and_sorted_pages(self):
+        filters, sort_by = ["Category=Sans Serif"], "Popularity Rank"
+        full = self.kb.search("", "google-fonts", 30, filters, sort_by)["results"]
+        pages = self._pages(self.kb.search("", "google-fonts", 10, filters, sort_by))[:3]
+        self.assertEqual([row for page in pages for row in page["results"]], full)
+        self.assertEqual(pages[1]["facets"], self.kb.search("", "google-fonts", 10, filters, sort_by)["facets"])
+
+    def test_stack_pages(self):
+        full = self.kb.search_stack("state performance", "react", max_results=1000)["results"]
+        pages = self._pages(self.kb.search_stack("state performance", "react", max_results=3))
+        self.assertEqual([row for page in pages for row in page["results"]], full)
+        self.assertEqual(pages[1]["stack"], "react")
+
+    def test_unknown_domain_is_echoed_and_pages_through_style(self):
+        full = self.kb.search("minimal clean", "style", max_results=1000)["results"]
+        for response in (self.kb.search("minimal clean", "nope", max_results=4),
+                         self.kb.search_batch(["minimal clean"], "nope", max_results=4)[0]):
+            self.assertEqual(response["domain"], "nope")
+            pages = self._pages(response)
+            self.assertEqual([row for page in pages for row in page["results"]], full)
+
+    def test_bad_cursor(self):
+        self.assertIn("error", self.kb.search_page("not-a-cursor"))
+
+    def test_cursor_expires_when_the_csv_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp)
+            source = core.DATA_DIR / core.CSV_CONFIG["style"]["file"]
+            target = data_dir / core.CSV_CONFIG["style"]["file"]
+            target.write_bytes(source.read_bytes())
+            kb = KnowledgeBase(data_dir, ResultCache(max_entries=0))
+            cursor = kb.search("minimal", "style", max_results=2)["cursor"]
+            with open(target, "ab") as f:
+                f.write(b"\n")
+            self.assertIn("Cursor expired", kb.search_page(cursor)["error"])
+
+    def test_saved_ranked_list_serves_another_process(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = KnowledgeBase(result_cache=ResultCache(max_entries=0))
+            first.ranked_lists.directory = tmp
+            cursor = first.search("minimal clean", "style", max_results=3)["cursor"]
+            self.assertEqual(os.listdir(tmp), [])
+            page = first.search_page(cursor)
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+            second = KnowledgeBase(result_cache=ResultCache(max_entries=0))
+            second.ranked_lists.directory = tmp
+            self.assertEqual(second.search_page(cursor), page)
+
+
+if __name__ == "__main__":
+    unittest.main()
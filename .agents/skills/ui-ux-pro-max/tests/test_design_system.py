@@ -0,0 +1,84 @@
+"""Design system generation: concurrent domain searches and bulk worker processes give the serial result."""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+import design_system
+from core import KnowledgeBase, ResultCache
+from design_system import DesignSystemGenerator, _generate_intelligent_overrides, generate_design_system
+
+BRIEFS = ["SaaS dashboard", "fintech crypto dark", "e-commerce luxury", "healthcare calm", "kids education game"]
+
+
+def setUpModule():
+    # Keep the index cache files these tests build out of the skill directory
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(setattr, core, "INDEX_CACHE_DIR", core.INDEX_CACHE_DIR)
+    core.INDEX_CACHE_DIR = Path(tmp.name)
+
+
+class SearchFanOutTest(unittest.TestCase):
+    def setUp(self):
+        self.kb = KnowledgeBase(result_cache=ResultCache(max_entries=0))
+
+    def test_concurrent_searches_match_serial(self):
+        for brief in BRIEFS:
+            serial = DesignSystemGenerator(self.kb, workers=1).generate(brief, "Acme")
+            self.assertEqual(DesignSystemGenerator(self.kb, workers=3).generate(brief, "Acme"), serial, brief)
+            self.assertEqual(_generate_intelligent_overrides("checkout", brief, serial, self.kb, 3),
+                             _generate_intelligent_overrides("checkout", brief, serial, self.kb, 1), brief)
+
+    def test_formatted_output_does_not_depend_on_workers(self):
+        self.assertEqual(generate_design_system("SaaS dashboard", "Acme", "markdown", kb=self.kb, workers=4),
+                         generate_design_system("SaaS dashboard", "Acme", "markdown", kb=self.kb, workers=1))
+
+
+class _InlinePool:
+    """multiprocessing.Pool stand-in that runs tasks in this process."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def imap(self, fn, tasks, chunksize=1):
+        return map(fn, tasks)
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class BulkTest(unittest.TestCase):
+    def _bulk(self, workers):
+        briefs = [(brief, None) for brief in BRIEFS]
+        return [record["design_system"] for record in design_system.generate_bulk(briefs, workers)]
+
+    def test_worker_processes_match_a_serial_run(self):
+        serial = self._bulk(1)
+        with mock.patch.object(design_system.gc, "freeze") as freeze, \
+                mock.patch.object(design_system.gc, "unfreeze") as unfreeze:
+            self.assertEqual(self._bulk(2), serial)
+        self.assertEqual(freeze.call_count, unfreeze.call_count)
+
+    def test_spawn_start_method_does_not_unfreeze(self):
+        import multiprocessing
+        with mock.patch.object(multiprocessing, "get_all_start_methods", return_value=["spawn"]), \
+                mock.patch.object(multiprocessing, "Pool", _InlinePool), \
+                mock.patch.object(design_system.gc, "freeze") as freeze, \
+                mock.patch.object(design_system.gc, "unfreeze") as unfreeze:
+            self.assertEqual(len(self._bulk(2)), len(BRIEFS))
+        freeze.assert_not_called()
+        unfreeze.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
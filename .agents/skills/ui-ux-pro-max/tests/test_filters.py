@@ -0,0 +1,131 @@
+"""Numeric and date range filters, sort_by, and how filter errors reach batch.py and the CLI."""
+
+import contextlib
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+import search_cli
+from batch import execute
+from core import KnowledgeBase, ResultCache
+
+
+def setUpModule():
+    # Keep the index cache files these tests build out of the skill directory
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(setattr, core, "INDEX_CACHE_DIR", core.INDEX_CACHE_DIR)
+    core.INDEX_CACHE_DIR = Path(tmp.name)
+
+
+# Family, Category, Popularity Rank, Date Added; D and E have no usable rank
+FONTS = [
+    ("Alpha", "Serif", "3", "2022-11-30"),
+    ("Bravo", "Sans Serif", "10", "2023-01-15"),
+    ("Charlie", "Serif", "1", "2023-05-02"),
+    ("Delta", "Sans Serif", "", "2024"),
+    ("Echo", "Serif", "n/a", ""),
+    ("Foxtrot", "Display", "25", "2023-05-31"),
+]
+
+
+class RangeFilterTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with open(Path(tmp.name) / core.CSV_CONFIG["google-fonts"]["file"], "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Family", "Category", "Popularity Rank", "Date Added"])
+            writer.writerows(FONTS)
+        self.kb = KnowledgeBase(tmp.name, ResultCache(max_entries=0), compiled_index=None)
+
+    def _search(self, filters=None, sort_by=None):
+        response = self.kb.search("", "google-fonts", 20, filters, sort_by)
+        self.assertNotIn("error", response)
+        return response
+
+    def _families(self, *filters):
+        # An empty query only lists rows when sorted
+        return sorted(row["Family"] for row in self._search(list(filters), "Popularity Rank")["results"])
+
+    def test_open_ranges(self):
+        self.assertEqual(self._families("Popularity Rank>3"), ["Bravo", "Foxtrot"])
+        self.assertEqual(self._families("Popularity Rank>=3"), ["Alpha", "Bravo", "Foxtrot"])
+        self.assertEqual(self._families("Popularity Rank<3"), ["Charlie"])
+        self.assertEqual(self._families("Popularity Rank <= 3"), ["Alpha", "Charlie"])
+        self.assertEqual(self._families("Popularity Rank>25"), [])
+
+    def test_closed_ranges(self):
+        self.assertEqual(self._families("Popularity Rank>=3", "Popularity Rank<=10"), ["Alpha", "Bravo"])
+        self.assertEqual(self._families("Popularity Rank>3", "Popularity Rank<10"), [])
+        self.assertEqual(self._families("Popularity Rank=10"), ["Bravo"])
+        self.assertEqual(self._families("Popularity Rank>1", "Category=Serif"), ["Alpha"])
+
+    def test_date_ranges_cover_whole_years_and_months(self):
+        self.assertEqual(self._families("Date Added>=2023"), ["Bravo", "Charlie", "Delta", "Foxtrot"])
+        self.assertEqual(self._families("Date Added<2023"), ["Alpha"])
+        self.assertEqual(self._families("Date Added=2023-05"), ["Charlie", "Foxtrot"])
+        self.assertEqual(self._families("Date Added>2023-01", "Date Added<2024"), ["Charlie", "Foxtrot"])
+        self.assertEqual(self._families("Date Added>2023-05-02", "Date Added<=2023-05-31"), ["Foxtrot"])
+
+    def test_non_numeric_cells_match_no_range_and_sort_last(self):
+        self.assertEqual(self._families("Popularity Rank>=-1000000"), ["Alpha", "Bravo", "Charlie", "Foxtrot"])
+        for sort_by, expected in (("Popularity Rank", ["Charlie", "Alpha", "Bravo", "Foxtrot", "Delta", "Echo"]),
+                                  ("-Popularity Rank", ["Foxtrot", "Bravo", "Alpha", "Charlie", "Delta", "Echo"])):
+            results = self._search(sort_by=sort_by)["results"]
+            self.assertEqual([row["Family"] for row in results], expected)
+            self.assertEqual([row["Popularity Rank"] for row in results[-2:]], ["", ""])
+        dates = self._search(["Date Added>=2023"], "-Date Added")["results"]
+        self.assertEqual([row["Date Added"] for row in dates], ["2024-01-01", "2023-05-31", "2023-05-02", "2023-01-15"])
+
+    def test_invalid_filters(self):
+        for filters, message in ((["Popularity Rank"], "Bad filter 'Popularity Rank'"),
+                                 (["Popularity Rank>="], "Bad filter"),
+                                 (["Popularity Rank>=high"], "Bad int value 'high'"),
+                                 (["Date Added>2023-13"], "Bad date value '2023-13': expected YYYY[-MM[-DD]]"),
+                                 (["Category>3"], "needs a numeric column"),
+                                 (["Weight>=400"], "No facet 'Weight'")):
+            response = self.kb.search("", "google-fonts", 20, filters)
+            self.assertIn(message, response.get("error", ""), filters)
+        self.assertIn("Cannot sort by 'Category'", self.kb.search("", "google-fonts", 20, sort_by="Category")["error"])
+
+
+class FilterErrorReportingTest(unittest.TestCase):
+    def test_batch_reports_the_error(self):
+        op = {"op": "search", "query": "", "domain": "google-fonts", "filters": ["Date Added"]}
+        response = execute(op)
+        self.assertFalse(response["ok"], response)
+        self.assertIn("Bad filter 'Date Added'", response["error"])
+        response = execute({**op, "filters": ["Date Added>=2023"], "sort_by": "Category"})
+        self.assertFalse(response["ok"], response)
+        self.assertIn("Cannot sort by 'Category'", response["error"])
+
+    def _cli(self, *args):
+        out = io.StringIO()
+        # The CLI sizes the process-wide result cache for one request; leave it alone
+        with mock.patch.object(sys, "argv", ["search.py", *args, "--no-server"]), \
+                mock.patch("core.configure_result_cache"), contextlib.redirect_stdout(out):
+            search_cli.main()
+        return out.getvalue()
+
+    def test_cli_prints_the_error(self):
+        self.assertIn("Error: Bad filter 'Date Added'", self._cli("", "-d", "google-fonts", "--filter", "Date Added"))
+        self.assertIn("Error: Bad date value 'soon'",
+                      self._cli("", "-d", "google-fonts", "--filter", "Date Added>=soon"))
+        output = self._cli("", "-d", "google-fonts", "--filter", "Date Added>=2024", "--sort", "-Date Added", "-n", "1")
+        self.assertNotIn("Error", output)
+        self.assertIn("**Found:** 1 results", output)
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self._cli("", "--sort", "Date Added")  # --sort needs a domain
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Typo-tolerant search: expansion is opt-in and only rescues queries with no indexed term."""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+from core import BM25, KnowledgeBase, ResultCache, TrigramIndex
+
+
+def setUpModule():
+    # Keep the index cache files these tests build out of the skill directory
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(setattr, core, "INDEX_CACHE_DIR", core.INDEX_CACHE_DIR)
+    core.INDEX_CACHE_DIR = Path(tmp.name)
+
+
+DOCUMENTS = [
+    "glassmorphism frosted glass blur",
+    "neumorphism soft shadows",
+    "minimalism clean whitespace",
+    "law firm trust authority",
+    "lead magnet form",
+]
+
+
+class FuzzyExpansionTest(unittest.TestCase):
+    def setUp(self):
+        self.bm25 = BM25()
+        self.bm25.fit(DOCUMENTS)
+
+    def test_off_by_default(self):
+        self.assertEqual(self.bm25.query_terms("glasmorphism"), [])
+        self.assertEqual(self.bm25.score("glasmorphism"), [])
+
+    def test_expands_a_query_with_no_indexed_term(self):
+        self.assertEqual(self.bm25.query_terms("glasmorphism", fuzzy=True), [("glassmorphism", core.FUZZY_WEIGHT)])
+        self.assertEqual([idx for idx, _ in self.bm25.score("glasmorphism", fuzzy=True)], [0])
+
+    def test_no_expansion_when_any_term_is_indexed(self):
+        query = "glasmorphism clean"
+        self.assertEqual(self.bm25.query_terms(query, fuzzy=True), [("clean", 1)])
+        self.assertEqual(self.bm25.score(query, fuzzy=True), self.bm25.score(query))
+        self.assertEqual(self.bm25.top_k(query, 3, fuzzy=True), self.bm25.top_k(query, 3))
+
+    def test_short_words_are_not_corrected(self):
+        # "firm" and "form" are both real words one edit apart
+        self.assertEqual(self.bm25.query_terms("farm", fuzzy=True), [])
+        index = TrigramIndex([("form", 1), ("forms", 1)])
+        self.assertEqual([index.terms[tid] for tid in index.nearest("formz", 1)[0]], ["forms"])
+
+    def test_long_words_allow_two_edits(self):
+        self.assertEqual(self.bm25.query_terms("neumorfism", fuzzy=True), [("neumorphism", core.FUZZY_WEIGHT ** 2)])
+
+
+class FuzzySearchTest(unittest.TestCase):
+    def setUp(self):
+        self.kb = KnowledgeBase(result_cache=ResultCache(max_entries=0))
+
+    def test_search_is_exact_unless_asked(self):
+        self.assertEqual(self.kb.search("glasmorphism", "style")["count"], 0)
+        fuzzy = self.kb.search("glasmorphism", "style", fuzzy=True)
+        self.assertEqual(fuzzy["results"][0]["Style Category"], "Glassmorphism")
+
+    def test_fuzzy_flag_is_part_of_the_cache_key(self):
+        kb = KnowledgeBase()
+        self.assertEqual(kb.search("glasmorphism", "style")["count"], 0)
+        self.assertGreater(kb.search("glasmorphism", "style", fuzzy=True)["count"], 0)
+        self.assertEqual(kb.search("glasmorphism", "style")["count"], 0)
+
+    def test_exact_queries_rank_the_same_with_fuzzy(self):
+        for domain in ("style", "product", "landing", "google-fonts"):
+            for query in ("legal law firm", "dark mode gaming", "saas fintech", "minimal clean dashboard"):
+                self.assertEqual(self.kb.search(query, domain, 5, fuzzy=True)["results"],
+                                 self.kb.search(query, domain, 5)["results"])
+
+    def test_cursor_keeps_fuzzy(self):
+        first = self.kb.search("glasmorphism", "style", max_results=1, fuzzy=True)
+        page = self.kb.search_page(first["cursor"])
+        self.assertNotIn("error", page)
+        self.assertEqual(page["offset"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""On-disk index cache (core._load_entry), stored in the compiled index format."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+from core import KnowledgeBase, MappedIndex, ResultCache
+
+
+class IndexCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.data_dir = Path(tmp.name) / "data"
+        self.data_dir.mkdir()
+        config = core.CSV_CONFIG["style"]
+        self.csv = self.data_dir / config["file"]
+        shutil.copyfile(core.DATA_DIR / config["file"], self.csv)
+        self.cols = (config["search_cols"], config["output_cols"], config.get("facet_cols", ()),
+                     config.get("numeric_cols"))
+
+        cache_dir = core.INDEX_CACHE_DIR
+        core.INDEX_CACHE_DIR = Path(tmp.name) / "cache"
+        self.addCleanup(setattr, core, "INDEX_CACHE_DIR", cache_dir)
+
+    def _kb(self):
+        return KnowledgeBase(self.data_dir, ResultCache(max_entries=0), compiled_index=None)
+
+    def _cache_files(self):
+        return sorted(core.INDEX_CACHE_DIR.iterdir())
+
+    def test_cache_file_is_a_compiled_index(self):
+        built = self._kb().search("minimal clean", "style", max_results=5)
+        [cache_file] = self._cache_files()
+        self.assertEqual(cache_file.suffix, ".idx")
+        self.assertTrue(cache_file.read_bytes().startswith(core.COMPILED_INDEX_MAGIC))
+
+        entry = core._load_entry(self.csv, *self.cols)
+        self.assertIsInstance(entry["bm25"], MappedIndex)
+        self.assertEqual(self._kb().search("minimal clean", "style", max_results=5), built)
+
+    def test_foreign_cache_file_is_rebuilt(self):
+        self._kb().search("minimal", "style")
+        [cache_file] = self._cache_files()
+        cache_file.write_bytes(b"\x80\x04not an index")
+        self.assertIn("results", self._kb().search("minimal", "style"))
+        self.assertTrue(cache_file.read_bytes().startswith(core.COMPILED_INDEX_MAGIC))
+
+    def test_touched_csv_keeps_its_cache(self):
+        self._kb().search("minimal", "style")
+        stat = self.csv.stat()
+        os.utime(self.csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        entry = core._load_entry(self.csv, *self.cols)
+        self.assertIsInstance(entry["bm25"], MappedIndex)
+        self.assertEqual(entry["mtime_ns"], self.csv.stat().st_mtime_ns)
+        self.assertIsInstance(core._load_entry(self.csv, *self.cols)["bm25"], MappedIndex)
+
+    def test_writing_a_cache_file_removes_older_ones_for_the_same_csv_name(self):
+        core.INDEX_CACHE_DIR.mkdir()
+        stale = core.INDEX_CACHE_DIR / "styles-0123456789abcdef.idx"
+        other = core.INDEX_CACHE_DIR / "styles-extra-01234567.idx"
+        for path in (stale, other):
+            path.write_bytes(b"old")
+        self._kb().search("minimal", "style")
+        [cache_file] = [path for path in self._cache_files() if path != other]
+        self.assertNotEqual(cache_file, stale)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            shutil.copyfile(self.csv, Path(tmp) / self.csv.name)
+            KnowledgeBase(tmp, ResultCache(max_entries=0), compiled_index=None).search("minimal", "style")
+        [moved] = [path for path in self._cache_files() if path != other]
+        self.assertNotEqual(moved, cache_file)
+        self.assertTrue(other.exists())
+
+    def test_edited_csv_updates_a_cached_index(self):
+        self._kb().search("minimal", "style")
+        kb = self._kb()
+        kb.search("minimal", "style")  # mapped from the cache file
+        with open(self.csv, "a", encoding="utf-8") as f:
+            f.write("999,Zyzzyva Style,General,zyzzyva" + "," * 18 + "\n")
+        self.assertEqual(kb.search("zyzzyva", "style")["count"], 1)
+        self.assertEqual(self._kb().search("zyzzyva", "style")["count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
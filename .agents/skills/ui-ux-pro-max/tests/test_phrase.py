@@ -0,0 +1,105 @@
+"""Phrase search: a "quoted phrase" scores only where its words occur in sequence."""
+
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+from core import BM25, KnowledgeBase, ResultCache
+
+
+def setUpModule():
+    # Keep the index cache files these tests build out of the skill directory
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(setattr, core, "INDEX_CACHE_DIR", core.INDEX_CACHE_DIR)
+    core.INDEX_CACHE_DIR = Path(tmp.name)
+
+
+# The same words in the first three documents, so only word order separates
+# their scores; ties rank by document order, so the phrases are not in the first
+DOCUMENTS = [
+    "dark screen mode toggle",
+    "mode dark screen toggle",
+    "dark mode screen toggle",
+    "glassmorphism gradient overlay panel",
+]
+
+
+def _scores(bm25, query, fuzzy=False):
+    return {idx: round(score, 9) for idx, score in bm25.score(query, fuzzy)}
+
+
+class PhraseScoringTest(unittest.TestCase):
+    def setUp(self):
+        self.bm25 = BM25(positions=True)
+        self.bm25.fit(DOCUMENTS)
+
+    def test_exact_phrase_ranks_first(self):
+        words = _scores(self.bm25, "dark mode")
+        self.assertEqual(words[0], words[2])
+        phrase = _scores(self.bm25, '"dark mode"')
+        self.assertEqual([idx for idx, _ in self.bm25.score('"dark mode"')], [2, 0, 1])
+        self.assertGreater(phrase[2], words[2])
+        self.assertEqual(self.bm25.top_k('"dark mode"', 1), self.bm25.score('"dark mode"')[:1])
+
+    def test_same_words_out_of_order_do_not_match(self):
+        words = _scores(self.bm25, "dark mode")
+        phrase = _scores(self.bm25, '"dark mode"')
+        self.assertEqual((phrase[0], phrase[1]), (words[0], words[1]))
+        self.assertEqual([idx for idx, _ in self.bm25.score('"mode dark"')], [1, 0, 2])
+        self.assertEqual(_scores(self.bm25, '"toggle dark"'), _scores(self.bm25, "toggle dark"))
+
+    def test_phrase_with_fuzzy(self):
+        # Indexed words: fuzzy changes nothing and the phrase still counts
+        self.assertEqual(self.bm25.score('"dark mode"', fuzzy=True), self.bm25.score('"dark mode"'))
+        # Misspelt words: fuzzy finds their documents, but a phrase only matches exact words
+        self.assertEqual(self.bm25.score('"glasmorphism gradiant"'), [])
+        fuzzy = self.bm25.score('"glasmorphism gradiant"', fuzzy=True)
+        self.assertEqual([idx for idx, _ in fuzzy], [3])
+        self.assertEqual(fuzzy, self.bm25.score("glasmorphism gradiant", fuzzy=True))
+        self.assertEqual(self.bm25.top_k('"glasmorphism gradiant"', 2, fuzzy=True), fuzzy)
+
+    def test_off_without_positions(self):
+        bm25 = BM25()
+        bm25.fit(DOCUMENTS)
+        self.assertEqual(bm25.query_phrases('"dark mode"'), [])
+        self.assertEqual(bm25.score('"dark mode"'), bm25.score("dark mode"))
+
+
+class PhraseSearchTest(unittest.TestCase):
+    """The same through KnowledgeBase.search(), which scores a cached (memory-mapped) index."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config = core.CSV_CONFIG["style"]
+        with open(Path(tmp.name) / config["file"], "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, ["No"] + config["search_cols"])
+            writer.writeheader()
+            for no, document in enumerate(DOCUMENTS, 1):
+                writer.writerow({"No": no, "Style Category": document, "Type": "General"})
+        self.data_dir = tmp.name
+
+    def _categories(self, kb, query, fuzzy=False):
+        return [row["Style Category"] for row in kb.search(query, "style", fuzzy=fuzzy)["results"]]
+
+    def test_search(self):
+        for _ in range(2):  # builds the cache file, then maps it
+            kb = KnowledgeBase(self.data_dir, ResultCache(max_entries=0), compiled_index=None)
+            self.assertEqual(self._categories(kb, '"dark mode"'), [DOCUMENTS[2], DOCUMENTS[0], DOCUMENTS[1]])
+            self.assertEqual(self._categories(kb, '"mode dark"'), [DOCUMENTS[1], DOCUMENTS[0], DOCUMENTS[2]])
+            self.assertEqual(self._categories(kb, '"glasmorphism gradiant"', fuzzy=True), DOCUMENTS[3:])
+        config = core.CSV_CONFIG["style"]
+        entry = core._load_entry(Path(self.data_dir) / config["file"], config["search_cols"], config["output_cols"],
+                                 config.get("facet_cols", ()), config.get("numeric_cols"))
+        self.assertIsInstance(entry["bm25"], core.MappedIndex)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Search result cache (core.ResultCache): callers get copies of cached responses."""
+
+import copy
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import core
+from core import KnowledgeBase, ResultCache
+
+
+def setUpModule():
+    # Keep the index cache files these tests build out of the skill directory
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(setattr, core, "INDEX_CACHE_DIR", core.INDEX_CACHE_DIR)
+    core.INDEX_CACHE_DIR = Path(tmp.name)
+
+
+def _mutate(response):
+    response["count"] = -1
+    response["results"][0].clear()
+    response["results"].append({"bogus": "row"})
+    response["filters"].append("Bogus=Value")
+    for counts in response["facets"].values():
+        counts.clear()
+    response["facets"]["Bogus"] = {"value": 1}
+
+
+class ResultCacheCopyTest(unittest.TestCase):
+    def setUp(self):
+        self.kb = KnowledgeBase(result_cache=ResultCache())
+
+    def _assert_cached_copies(self, search):
+        first = search()
+        expected = copy.deepcopy(first)
+        self.assertTrue(expected["results"] and expected["facets"], expected)
+
+        _mutate(first)  # the response that filled the cache
+        second = search()
+        self.assertEqual(second, expected)
+        _mutate(second)  # a response served from the cache
+        self.assertEqual(search(), expected)
+        self.assertEqual(self.kb.result_cache.info()["hits"], 2)
+
+    def test_search_responses_are_copies(self):
+        self._assert_cached_copies(lambda: self.kb.search("minimal", "style", 3, filters=["Type=General"]))
+
+    def test_search_stack_responses_are_copies(self):
+        self._assert_cached_copies(lambda: self.kb.search_stack("state", "react", 3, filters=["Severity=High"]))
+
+
+if __name__ == "__main__":
+    unittest.main()